@@ -45,6 +45,7 @@ INSTALLED_APPS = [
     ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -132,3 +133,114 @@ MEDIA_ROOT = 'vol/web/media'
 STATIC_ROOT = 'vol/web/static'
 
 AUTH_USER_MODEL = 'core.User'
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'recipe.pagination.RecipeCursorPagination',
+    'PAGE_SIZE': 25,
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Authenticated tokens kept in process for TTL seconds, so other processes
+# may accept a revoked token until then. Set CACHE_ALIAS to a cache shared
+# by every process to keep them there instead and revoke them at once.
+TOKEN_AUTH_CACHE = {
+    'MAX_ENTRIES': 10000,
+    'TTL': 60,
+    'CACHE_ALIAS': None,
+}
+
+# Password hashing work factor: PBKDF2 iterations per tier.
+PASSWORD_HASHERS = [
+    'user.hashers.TieredPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+PASSWORD_HASHER_TIERS = {
+    'fast': 60000,
+    'standard': 180000,
+    'strong': 360000,
+}
+PASSWORD_HASHER_TIER = os.environ.get('PASSWORD_HASHER_TIER', 'standard')
+
+# Token endpoint: failed logins allowed per email and, far more as many
+# users may share one, per IP within WINDOW seconds, and the size of the
+# pool that runs password hashing. Behind reverse proxies, set NUM_PROXIES
+# to how many of them append to X-Forwarded-For; the client IP is read
+# that many entries from the right. With 0 only REMOTE_ADDR is used.
+LOGIN_THROTTLE = {
+    'MAX_FAILURES': 5,
+    'MAX_IP_FAILURES': 100,
+    'WINDOW': 300,
+    'NUM_PROXIES': int(os.environ.get('LOGIN_THROTTLE_NUM_PROXIES', 0)),
+    'HASH_WORKERS': 4,
+    'HASH_QUEUE': 32,
+    'HASH_TIMEOUT': 10,
+}
+
+# Work handed to core.tasks.run_in_background (image processing, ...)
+BACKGROUND_TASK_WORKERS = 2
+BACKGROUND_TASKS_EAGER = False
+
+# Largest recipe image accepted by upload-image, enforced while streaming
+RECIPE_IMAGE_MAX_UPLOAD_SIZE = 10 * 2 ** 20
+# Unreferenced images saved more recently than this are not deleted when
+# released, in case an upload reusing them has not committed yet;
+# gc_recipe_images collects them later
+RECIPE_IMAGE_RELEASE_GRACE = 3600
+
+# Let the web server send media files: None, 'x-sendfile' (Apache, lighttpd)
+# or 'x-accel-redirect' (nginx, with an internal location at the prefix).
+MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE') or None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+# Per-request SQL, auth and serializer timings (core.middleware): the
+# fraction of requests sampled, whether sampled staff requests get a
+# Server-Timing header, how often one statement may repeat in a request
+# before it is reported as a likely N+1, and how many routes are tracked
+# before the rest are pooled. Aggregates are served to staff at
+# /api/metrics/.
+REQUEST_METRICS = {
+    'SAMPLE_RATE': float(os.environ.get('REQUEST_METRICS_SAMPLE_RATE', 0.01)),
+    'SERVER_TIMING': os.environ.get('REQUEST_METRICS_SERVER_TIMING') == '1',
+    'DUPLICATE_QUERY_THRESHOLD': 5,
+    'MAX_ROUTES': 200,
+}
+
+# Opt-in profiling of viewset actions (core.profiling). ACTIONS are
+# <ViewClass>.<action> patterns; a request is profiled when sampled, or
+# when it carries HEADER set to HEADER_TOKEN. MODE is 'cprofile' (pstats
+# files) or 'sampler' (collapsed stacks for flamegraphs).
+PROFILING = {
+    'ENABLED': os.environ.get('PROFILING_ENABLED') == '1',
+    'MODE': os.environ.get('PROFILING_MODE', 'cprofile'),
+    'ACTIONS': [
+        'RecipeViewSet.*', 'TagViewSet.*', 'IngredientViewSet.*',
+        'SyncView.*',
+    ],
+    'SAMPLE_RATE': 0.01,
+    'HEADER': 'X-Profile',
+    'HEADER_TOKEN': os.environ.get('PROFILING_HEADER_TOKEN') or None,
+    'SAMPLER_INTERVAL': 0.005,
+    'OUTPUT_DIR': os.environ.get(
+        'PROFILING_OUTPUT_DIR', os.path.join(BASE_DIR, 'profiles')
+    ),
+    'FLUSH_EVERY': 50,
+}
+
+# Cached list/retrieve responses of the recipe API (recipe.caching), keyed
+# by a per-user version that any write to the user's data replaces. Off
+# unless CACHE_ALIAS names a cache shared by every process (Memcached,
+# Redis, ...); process-local backends such as locmem are refused unless
+# ALLOW_PROCESS_LOCAL is set, which only suits a single process.
+RESPONSE_CACHE = {
+    'ENABLED': os.environ.get('RESPONSE_CACHE_ENABLED') == '1',
+    'CACHE_ALIAS': os.environ.get('RESPONSE_CACHE_ALIAS', 'default'),
+    'TIMEOUT': 300,
+    'ALLOW_PROCESS_LOCAL': False,
+}
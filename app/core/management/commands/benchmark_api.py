@@ -0,0 +1,198 @@
+import json
+import math
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+from io import BytesIO
+
+from PIL import Image
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.seeding import seed_email
+
+ENDPOINTS = (
+    'recipes', 'recipes_by_tags', 'recipe_detail', 'tags_assigned',
+    'ingredients_assigned', 'upload_image', 'token',
+)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def sample_jpeg(index):
+    buffer = BytesIO()
+    color = (index * 37 % 256, index * 91 % 256, index * 53 % 256)
+    Image.new('RGB', (1024, 768), color).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the API end to end on a seeded dataset"""
+
+    help = ('Drive the API endpoints through the test client and report '
+            'latency percentiles, throughput and query counts as JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='Prefix the dataset was seeded with (see seed_dataset)'
+        )
+        parser.add_argument('--password', default='benchmark')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Timed requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--endpoint', action='append', choices=ENDPOINTS,
+            help='Endpoint to run (repeatable); all by default'
+        )
+        parser.add_argument('--output', help='Write the JSON report here')
+        parser.add_argument(
+            '--response-cache', action='store_true',
+            help='Serve repeated reads from the response cache, which is '
+                 'otherwise disabled to time the endpoints themselves'
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests must be at least 1')
+        try:
+            user = get_user_model().objects.get(
+                email=seed_email(options['prefix'], 0)
+            )
+        except get_user_model().DoesNotExist:
+            raise CommandError(
+                f'No dataset with prefix "{options["prefix"]}"; '
+                'run seed_dataset first'
+            )
+
+        media_root = tempfile.mkdtemp()
+        response_cache = dict(
+            getattr(settings, 'RESPONSE_CACHE', {}),
+            ENABLED=options['response_cache'],
+        )
+        try:
+            # Writes made by the endpoints are rolled back afterwards
+            with override_settings(MEDIA_ROOT=media_root,
+                                   RESPONSE_CACHE=response_cache), \
+                    transaction.atomic():
+                results = self.run_endpoints(user, options)
+                transaction.set_rollback(True)
+        finally:
+            shutil.rmtree(media_root)
+
+        report = json.dumps({
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'database': connection.vendor,
+            'dataset': {
+                'prefix': options['prefix'],
+                'recipes_per_user': Recipe.objects.filter(user=user).count(),
+            },
+            'requests': options['requests'],
+            'warmup': options['warmup'],
+            'response_cache': options['response_cache'],
+            'endpoints': results,
+        }, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(report + '\n')
+            self.stdout.write(self.style.SUCCESS(
+                f'Wrote {options["output"]}'
+            ))
+        else:
+            self.stdout.write(report)
+
+    def run_endpoints(self, user, options):
+        client = APIClient(HTTP_HOST='localhost')
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        anonymous = APIClient(HTTP_HOST='localhost')
+        total = options['warmup'] + options['requests']
+
+        tag_ids = ','.join(
+            str(pk) for pk in user.tag_set.values_list('id', flat=True)[:3]
+        )
+        recipe_id = Recipe.objects.filter(user=user).values_list(
+            'id', flat=True
+        ).first()
+        if recipe_id is None:
+            raise CommandError('The seeded user has no recipes')
+        recipes_url = reverse('recipe:recipe-list')
+        upload_url = reverse('recipe:recipe-upload-image', args=[recipe_id])
+        images = []
+        if 'upload_image' in (options['endpoint'] or ENDPOINTS):
+            images = [sample_jpeg(i) for i in range(total)]
+        credentials = {'email': user.email, 'password': options['password']}
+
+        calls = {
+            'recipes': lambda i: client.get(recipes_url),
+            'recipes_by_tags': lambda i: client.get(
+                recipes_url, {'tags': tag_ids}
+            ),
+            'recipe_detail': lambda i: client.get(
+                reverse('recipe:recipe-detail', args=[recipe_id])
+            ),
+            'tags_assigned': lambda i: client.get(
+                reverse('recipe:tag-list'), {'assigned_only': 1}
+            ),
+            'ingredients_assigned': lambda i: client.get(
+                reverse('recipe:ingredient-list'), {'assigned_only': 1}
+            ),
+            'upload_image': lambda i: client.post(
+                upload_url,
+                {'image': SimpleUploadedFile('photo.jpg', images[i])},
+                format='multipart'
+            ),
+            'token': lambda i: anonymous.post(
+                reverse('user:token'), credentials
+            ),
+        }
+
+        results = {}
+        for name in options['endpoint'] or ENDPOINTS:
+            self.stderr.write(f'{name}...')
+            results[name] = self.measure(
+                calls[name], options['warmup'], options['requests']
+            )
+        return results
+
+    def measure(self, call, warmup, requests):
+        for i in range(warmup):
+            call(i)
+
+        latencies, queries, statuses = [], [], {}
+        start = time.perf_counter()
+        for i in range(warmup, warmup + requests):
+            with CaptureQueriesContext(connection) as captured:
+                began = time.perf_counter()
+                res = call(i)
+                latencies.append(time.perf_counter() - began)
+            queries.append(len(captured))
+            statuses[res.status_code] = statuses.get(res.status_code, 0) + 1
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        return {
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+            'mean_ms': round(sum(latencies) / requests * 1000, 3),
+            'throughput_rps': round(requests / elapsed, 1),
+            'queries_mean': round(sum(queries) / requests, 2),
+            'queries_max': max(queries),
+            'status_codes': {
+                str(code): count for code, count in sorted(statuses.items())
+            },
+        }
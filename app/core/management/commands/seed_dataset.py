@@ -0,0 +1,64 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.seeding import seed_dataset, seed_email, seed_users
+
+
+class Command(BaseCommand):
+    """Django command to fill the database with a reproducible dataset"""
+
+    help = 'Bulk insert users, each with seeded recipes, tags and ingredients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--recipes', type=int, default=1000,
+                            help='Recipes per user')
+        parser.add_argument('--tags', type=int, default=50,
+                            help='Tags per user')
+        parser.add_argument('--ingredients', type=int, default=300,
+                            help='Ingredients per user')
+        parser.add_argument('--tags-per-recipe', type=int, default=5)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='Users are named <prefix>-<n>@example.com'
+        )
+        parser.add_argument('--password', default='benchmark')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if get_user_model().objects.filter(
+            email=seed_email(prefix, 0)
+        ).exists():
+            raise CommandError(
+                f'A dataset with prefix "{prefix}" already exists'
+            )
+
+        start = time.perf_counter()
+        with transaction.atomic():
+            users = seed_users(
+                options['users'], options['password'], prefix=prefix,
+                batch_size=options['batch_size']
+            )
+            tag_links, ingredient_links = seed_dataset(
+                users,
+                recipes=options['recipes'],
+                tags=options['tags'],
+                ingredients=options['ingredients'],
+                tags_per_recipe=options['tags_per_recipe'],
+                ingredients_per_recipe=options['ingredients_per_recipe'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(users)} users with '
+            f'{len(users) * options["recipes"]} recipes, '
+            f'{tag_links} recipe-tag and {ingredient_links} '
+            f'recipe-ingredient links in {time.perf_counter() - start:.1f}s'
+        ))
@@ -0,0 +1,172 @@
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse, Http404, HttpResponse, StreamingHttpResponse
+)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags
+from django.views.decorators.http import require_safe
+
+# Files named after the SHA-256 of their content never change
+CONTENT_NAME = re.compile(r'^(?P<digest>[0-9a-f]{64})\.\w+$')
+RANGE = re.compile(r'^bytes=(?P<start>\d*)-(?P<end>\d*)$')
+
+# Only raster images are served inline; anything else, including SVG,
+# which can carry scripts, is sent as a download
+INLINE_TYPES = (
+    'image/jpeg', 'image/png', 'image/gif', 'image/webp',
+)
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE = 'public, max-age=3600'
+CHUNK_SIZE = 64 * 2 ** 10
+
+
+def _resolve(path):
+    """Absolute path and stat of a media file, 404 for anything else"""
+    if any(part.startswith('.') for part in path.split('/')):
+        raise Http404
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat_result = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise Http404
+    return full_path, stat_result
+
+
+def _validators(path, stat_result):
+    """Strong ETag and Cache-Control for a media file"""
+    match = CONTENT_NAME.match(os.path.basename(path))
+    if match:
+        return f'"{match.group("digest")}"', IMMUTABLE_CACHE
+    key = f'{path}:{stat_result.st_size}:{stat_result.st_mtime_ns}'
+    digest = hashlib.md5(key.encode()).hexdigest()
+    return f'"{digest}"', DEFAULT_CACHE
+
+
+def _parse_range(request, etag, size):
+    """(start, end) of a satisfiable single byte range, None for all bytes
+
+    Multiple ranges are answered with the whole file, which RFC 7233
+    allows. Raises ValueError for unsatisfiable ranges.
+    """
+    header = request.META.get('HTTP_RANGE', '')
+    match = RANGE.match(header.replace(' ', ''))
+    if not match or not (match.group('start') or match.group('end')):
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and etag not in parse_etags(if_range):
+        return None
+
+    start, end = match.group('start'), match.group('end')
+    if start:
+        start, end = int(start), min(int(end) if end else size - 1, size - 1)
+    else:
+        start, end = max(size - int(end), 0), size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def _content_headers(path):
+    """Content-Type and disposition that keep the browser from running it"""
+    content_type, encoding = mimetypes.guess_type(path)
+    headers = {'X-Content-Type-Options': 'nosniff'}
+    if content_type in INLINE_TYPES and not encoding:
+        headers['Content-Type'] = content_type
+    else:
+        headers['Content-Type'] = 'application/octet-stream'
+        headers['Content-Disposition'] = 'attachment'
+    return headers
+
+
+def _offload(path):
+    """Response asking the front server to send the file itself"""
+    mode = getattr(settings, 'MEDIA_SENDFILE', None)
+    response = HttpResponse()
+    if mode == 'x-sendfile':
+        response['X-Sendfile'] = path
+    elif mode == 'x-accel-redirect':
+        prefix = getattr(
+            settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected/'
+        )
+        relative = os.path.relpath(path, settings.MEDIA_ROOT)
+        response['X-Accel-Redirect'] = prefix + relative.replace(os.sep, '/')
+    else:
+        return None
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve a file from MEDIA_ROOT with HTTP caching and byte ranges
+
+    With MEDIA_SENDFILE set to 'x-sendfile' or 'x-accel-redirect' only the
+    headers are produced here and the web server sends the bytes;
+    otherwise FileResponse hands the open file to the WSGI server's
+    file_wrapper, which uses sendfile() where available.
+    """
+    full_path, stat_result = _resolve(path)
+    etag, cache_control = _validators(full_path, stat_result)
+    headers = HttpResponse()
+    headers['ETag'] = etag
+    headers['Last-Modified'] = http_date(stat_result.st_mtime)
+    headers['Cache-Control'] = cache_control
+
+    conditional = get_conditional_response(
+        request, etag=etag, last_modified=int(stat_result.st_mtime),
+        response=headers
+    )
+    if conditional is not headers:
+        return conditional
+
+    response = _offload(full_path)
+    size = stat_result.st_size
+    if response is None:
+        try:
+            byte_range = _parse_range(request, etag, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        if byte_range is None:
+            response = FileResponse(open(full_path, 'rb'))
+        else:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                _read_range(full_path, start, length), status=206
+            )
+            response['Content-Length'] = length
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        if 'Content-Length' not in response:
+            response['Content-Length'] = size
+        response['Accept-Ranges'] = 'bytes'
+
+    # Also set on offloaded responses, which the web server passes on
+    for header, value in _content_headers(full_path).items():
+        response[header] = value
+    for header in ('ETag', 'Last-Modified', 'Cache-Control'):
+        response[header] = headers[header]
+    return response
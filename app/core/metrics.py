@@ -0,0 +1,253 @@
+import bisect
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'SAMPLE_RATE': 0.01,
+    'SERVER_TIMING': False,
+    'DUPLICATE_QUERY_THRESHOLD': 5,
+    'MAX_ROUTES': 200,
+}
+
+# Upper bounds of the histogram buckets, in milliseconds
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Timed request phases, as named in Server-Timing and the snapshot
+PHASES = ('total', 'db', 'auth', 'serializer')
+
+_current = ContextVar('request_metrics', default=None)
+
+
+def get_options():
+    return dict(DEFAULTS, **getattr(settings, 'REQUEST_METRICS', {}))
+
+
+class RequestMetrics:
+    """Where the time of one sampled request went"""
+
+    def __init__(self):
+        self.queries = 0
+        self.statements = Counter()
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.depth = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        """``connection.execute_wrapper`` hook counting and timing SQL"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds['db'] += time.perf_counter() - start
+            self.queries += 1
+            # The statement before parameters are bound: repeats of one
+            # shape within a request are the signature of an N+1 loop.
+            self.statements[sql] += 1
+
+    def duplicates(self, threshold):
+        return [
+            (sql, count) for sql, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+    def server_timing(self):
+        parts = [
+            f'{phase};dur={self.seconds[phase] * 1000:.1f}'
+            for phase in PHASES[1:]
+        ]
+        parts[0] += f';desc="{self.queries} queries"'
+        parts.append(f'total;dur={self.seconds["total"] * 1000:.1f}')
+        return ', '.join(parts)
+
+
+def current_metrics():
+    """The metrics of the request being handled, if it was sampled"""
+    return _current.get()
+
+
+@contextmanager
+def collecting(metrics):
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed(phase):
+    """Add the time spent in the block to the current request's ``phase``
+
+    Nested blocks of the same request are only counted once, so nested
+    serializers do not add their time twice.
+    """
+    metrics = _current.get()
+    if metrics is None or metrics.depth:
+        yield
+        return
+    metrics.depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.seconds[phase] += time.perf_counter() - start
+        metrics.depth -= 1
+
+
+class Histogram:
+    """Counts of observations per latency bucket"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding the ``fraction`` quantile"""
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        buckets = {
+            f'le_{bound}': count for bound, count in zip(
+                BUCKETS_MS, self.counts
+            )
+        }
+        buckets['le_inf'] = self.counts[-1]
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count, 3) if self.count else 0,
+            'p50_ms': self.quantile(0.50),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99),
+            'max_ms': round(self.max, 3),
+            'buckets': buckets,
+        }
+
+
+class RouteStats:
+
+    def __init__(self):
+        self.timings = {phase: Histogram() for phase in PHASES}
+        self.queries = 0
+        self.max_queries = 0
+        self.duplicates = {}
+
+    def record(self, metrics, duplicates):
+        for phase, histogram in self.timings.items():
+            histogram.observe(metrics.seconds[phase] * 1000)
+        self.queries += metrics.queries
+        self.max_queries = max(self.max_queries, metrics.queries)
+        for sql, count in duplicates:
+            if sql in self.duplicates or len(self.duplicates) < 10:
+                self.duplicates[sql] = max(self.duplicates.get(sql, 0), count)
+
+    def snapshot(self):
+        requests = self.timings['total'].count
+        return {
+            'requests': requests,
+            'timings': {
+                phase: histogram.snapshot()
+                for phase, histogram in self.timings.items()
+            },
+            'queries': {
+                'mean': round(self.queries / requests, 2) if requests else 0,
+                'max': self.max_queries,
+            },
+            'duplicate_queries': [
+                {'sql': sql, 'count': count}
+                for sql, count in sorted(
+                    self.duplicates.items(), key=lambda item: -item[1]
+                )
+            ],
+        }
+
+
+class MetricsRegistry:
+    """Per-route aggregates of the sampled requests of this process"""
+
+    OTHER = '(other)'
+
+    def __init__(self, max_routes):
+        self.max_routes = max_routes
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, metrics, duplicates=()):
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                if len(self._routes) >= self.max_routes:
+                    route = self.OTHER
+                stats = self._routes.setdefault(route, RouteStats())
+            stats.record(metrics, duplicates)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                route: stats.snapshot()
+                for route, stats in sorted(self._routes.items())
+            }
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+
+_registry = None
+
+
+def get_registry():
+    """Return the process wide registry configured by REQUEST_METRICS"""
+    global _registry
+    if _registry is None:
+        _registry = MetricsRegistry(get_options()['MAX_ROUTES'])
+    return _registry
+
+
+@receiver(setting_changed)
+def reset_registry(setting, **kwargs):
+    global _registry
+    if setting == 'REQUEST_METRICS':
+        _registry = None
+
+
+class TimedAuthenticationMixin:
+    """Charge DRF authentication to the request's ``auth`` phase"""
+
+    def perform_authentication(self, request):
+        with timed('auth'):
+            super().perform_authentication(request)
+
+
+class TimedSerializerMixin:
+    """Charge validation and rendering to the ``serializer`` phase"""
+
+    def run_validation(self, *args, **kwargs):
+        with timed('serializer'):
+            return super().run_validation(*args, **kwargs)
+
+    def to_representation(self, *args, **kwargs):
+        with timed('serializer'):
+            return super().to_representation(*args, **kwargs)
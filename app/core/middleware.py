@@ -0,0 +1,57 @@
+import random
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from core.metrics import (
+    RequestMetrics, collecting, get_options, get_registry, logger
+)
+
+
+class RequestMetricsMiddleware:
+    """Time a sample of requests and aggregate the results per route
+
+    With SERVER_TIMING set, sampled requests of staff users get a
+    ``Server-Timing`` header breaking the total down into SQL,
+    authentication and serializer time. Requests repeating one SQL
+    statement many times are logged as likely N+1 queries.
+    Requests outside the sample only pay for one random number.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        options = get_options()
+        if random.random() >= options['SAMPLE_RATE']:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        start = time.perf_counter()
+        with collecting(metrics), ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(metrics.record_query)
+                )
+            response = self.get_response(request)
+        metrics.seconds['total'] = time.perf_counter() - start
+
+        route = self.route(request)
+        duplicates = metrics.duplicates(options['DUPLICATE_QUERY_THRESHOLD'])
+        for sql, count in duplicates:
+            logger.warning(
+                'Possible N+1 in %s: statement ran %d times: %s',
+                route, count, sql
+            )
+        get_registry().record(route, metrics, duplicates)
+        user = getattr(request, 'user', None)
+        if options['SERVER_TIMING'] and getattr(user, 'is_staff', False):
+            # Timings and query counts tell outsiders too much
+            response['Server-Timing'] = metrics.server_timing()
+        return response
+
+    def route(self, request):
+        match = getattr(request, 'resolver_match', None)
+        name = match.view_name if match else '(unresolved)'
+        return f'{request.method} {name}'
@@ -0,0 +1,29 @@
+# Generated by Django 3.0.14 on 2026-10-17 04:12
+
+import core.models
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_tag_ingredient_user_name_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeImageVariant',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(choices=[('thumbnail', 'Thumbnail'), ('medium', 'Medium'), ('full', 'Full'), ('webp', 'WebP')], max_length=20)),
+                ('image', models.ImageField(upload_to=core.models.recipe_image_variant_file_path)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_variants', to='core.Recipe')),
+            ],
+            options={
+                'unique_together': {('recipe', 'name')},
+            },
+        ),
+    ]
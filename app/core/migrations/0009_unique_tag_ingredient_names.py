@@ -0,0 +1,63 @@
+# Generated by Django 3.0.14 on 2026-10-17 04:21
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Fold same-named tags and ingredients of a user into the oldest one"""
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, relation in (('Tag', 'tags'), ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, relation).through
+        column = model_name.lower() + '_id'
+        duplicates = model.objects.values('user_id', 'name').annotate(
+            keep=Min('id'), total=Count('id')
+        ).filter(total__gt=1)
+        for group in duplicates:
+            extra = list(model.objects.filter(
+                user_id=group['user_id'], name=group['name']
+            ).exclude(id=group['keep']).values_list('id', flat=True))
+            linked = set(through.objects.filter(
+                **{column: group['keep']}
+            ).values_list('recipe_id', flat=True))
+            moved = through.objects.filter(**{column + '__in': extra})
+            through.objects.bulk_create([
+                through(**{'recipe_id': recipe_id, column: group['keep']})
+                for recipe_id in set(
+                    moved.values_list('recipe_id', flat=True)
+                ) - linked
+            ])
+            moved.delete()
+            model.objects.filter(id__in=extra).delete()
+    if schema_editor.connection.vendor == 'postgresql':
+        # Fire the foreign key checks the deletes deferred, as PostgreSQL
+        # refuses to alter a table with pending trigger events
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='core_ingredient_user_name_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='core_tag_user_name_uniq'),
+        ),
+        migrations.RemoveIndex(
+            model_name='ingredient',
+            name='core_ingredient_user_name_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='tag',
+            name='core_tag_user_name_idx',
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 3.0.14 on 2026-10-17 04:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def log_existing_objects(apps, schema_editor):
+    """Give every existing object an entry, so a first sync returns it"""
+    User = apps.get_model('core', 'User')
+    ChangeLogEntry = apps.get_model('core', 'ChangeLogEntry')
+    kinds = (
+        ('recipe', apps.get_model('core', 'Recipe')),
+        ('tag', apps.get_model('core', 'Tag')),
+        ('ingredient', apps.get_model('core', 'Ingredient')),
+    )
+    for user_id in User.objects.values_list('id', flat=True).iterator():
+        sequence = 0
+        for kind, model in kinds:
+            ids = model.objects.filter(user_id=user_id).order_by('id') \
+                .values_list('id', flat=True)
+            entries = []
+            for object_id in ids.iterator():
+                sequence += 1
+                entries.append(ChangeLogEntry(
+                    user_id=user_id, kind=kind, object_id=object_id,
+                    sequence=sequence
+                ))
+            ChangeLogEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+        User.objects.filter(id=user_id).update(change_sequence=sequence)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='change_sequence',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('recipe', 'Recipe'), ('tag', 'Tag'), ('ingredient', 'Ingredient')], max_length=20)),
+                ('object_id', models.IntegerField()),
+                ('sequence', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='changelogentry',
+            index=models.Index(fields=['user', 'sequence'], name='core_changelog_user_seq_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='changelogentry',
+            constraint=models.UniqueConstraint(fields=('user', 'kind', 'object_id'), name='core_changelog_user_object_uniq'),
+        ),
+        migrations.RunPython(log_existing_objects, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 3.0.14 on 2026-10-17 04:45
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+# The columns are only indexed and maintained on PostgreSQL; other
+# databases use recipe.search's in-memory backend.
+CREATE_SEARCH_INDEXES = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    """
+    UPDATE core_recipe AS recipe SET
+        search_text = recipe.title || ' ' || names.tags || ' ' ||
+            names.ingredients,
+        search_vector =
+            setweight(to_tsvector('english', recipe.title), 'A') ||
+            setweight(to_tsvector(
+                'english', names.tags || ' ' || names.ingredients
+            ), 'B')
+    FROM (
+        SELECT
+            r.id,
+            coalesce((
+                SELECT string_agg(t.name, ' ') FROM core_tag t
+                JOIN core_recipe_tags rt ON rt.tag_id = t.id
+                WHERE rt.recipe_id = r.id
+            ), '') AS tags,
+            coalesce((
+                SELECT string_agg(i.name, ' ') FROM core_ingredient i
+                JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+                WHERE ri.recipe_id = r.id
+            ), '') AS ingredients
+        FROM core_recipe r
+    ) AS names
+    WHERE names.id = recipe.id
+    """,
+    'CREATE INDEX core_recipe_search_vector_idx ON core_recipe '
+    'USING gin (search_vector)',
+    'CREATE INDEX core_recipe_search_text_trgm_idx ON core_recipe '
+    'USING gin (search_text gin_trgm_ops)',
+]
+DROP_SEARCH_INDEXES = [
+    'DROP INDEX IF EXISTS core_recipe_search_text_trgm_idx',
+    'DROP INDEX IF EXISTS core_recipe_search_vector_idx',
+]
+
+
+def run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_changelog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(
+            run_on_postgresql(CREATE_SEARCH_INDEXES),
+            run_on_postgresql(DROP_SEARCH_INDEXES),
+        ),
+    ]
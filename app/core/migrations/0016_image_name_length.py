@@ -0,0 +1,25 @@
+# Generated by Django 3.0.14 on 2026-10-17 05:46
+
+import core.models
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_recipe_similarity'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(db_index=True, max_length=255, null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.recipe_image_file_path),
+        ),
+        migrations.AlterField(
+            model_name='recipeimagevariant',
+            name='image',
+            field=models.ImageField(db_index=True, max_length=255, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.recipe_image_variant_file_path),
+        ),
+    ]
@@ -1,16 +1,37 @@
 import uuid
 import os
-from django.db import models
+from django.db import connections, models, transaction
+from django.dispatch import Signal
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
                                        PermissionsMixin
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
+
+from core.storage import content_digest, content_storage
 
 def recipe_image_file_path(instance, filename):
-    ext = filename.split('.')[-1]
-    filename = f'{uuid.uuid4()}.{ext}'
+    """Name images after their content so duplicates share one file"""
+    ext = filename.split('.')[-1].lower()
+    if instance is not None and instance.image:
+        filename = f'{content_digest(instance.image.file)}.{ext}'
+    else:
+        filename = f'{uuid.uuid4()}.{ext}'
 
     return os.path.join('uploads/recipe/', filename)
 
+
+def recipe_image_variant_prefix(recipe):
+    """Variants are named after their source image, so they are shared too"""
+    source = os.path.splitext(os.path.basename(recipe.image.name))[0]
+    return os.path.join('uploads/recipe/variants/', f'{source}-')
+
+
+def recipe_image_variant_file_path(instance, filename):
+    ext = filename.split('.')[-1]
+    prefix = recipe_image_variant_prefix(instance.recipe)
+
+    return f'{prefix}{instance.name}.{ext}'
+
 class UserManager(BaseUserManager):
 
     def create_user(self, email, password=None, **extra_field):
@@ -38,6 +59,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Last sequence number handed out to the user's ChangeLogEntry rows
+    change_sequence = models.BigIntegerField(default=0, editable=False)
 
     objects = UserManager()
 
@@ -47,8 +70,20 @@ class Tag(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        # Led by the (user, name) constraint
+        db_index=False
     )
+    # Also touched when the recipes linked to it change (recipe.conditional)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_tag_user_name_uniq'
+            ),
+        ]
 
     def __str__(self):
         return self.name 
@@ -58,8 +93,20 @@ class Ingredient(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        # Led by the (user, name) constraint
+        db_index=False
     )
+    # Also touched when the recipes linked to it change (recipe.conditional)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_ingredient_user_name_uniq'
+            ),
+        ]
 
     def __str__(self):
         return self.name 
@@ -67,7 +114,9 @@ class Ingredient(models.Model):
 class Recipe(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        # Led by the (user, -id) index
+        db_index=False
     )
     title = models.CharField(max_length=255)
     time_minutes = models.IntegerField()
@@ -75,8 +124,206 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = models.ImageField(
+        null=True,
+        db_index=True,
+        # Named after a 64 character digest; variant names pass the default
+        # length of 100
+        max_length=255,
+        upload_to=recipe_image_file_path,
+        storage=content_storage
+    )
+    # Also touched when its tags, ingredients or image variants change
+    updated_at = models.DateTimeField(auto_now=True)
+    # Title, tag and ingredient names for ?search=, kept up to date by
+    # recipe.search on PostgreSQL where both columns are GIN indexed
+    search_text = models.TextField(blank=True, default='', editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # The recipe list: one user's recipes, newest first
+            models.Index(
+                fields=['user', '-id'],
+                name='core_recipe_user_id_idx'
+            ),
+            # ?ordering= and the range filters on time and price; scanned
+            # backwards for descending orders
+            models.Index(
+                fields=['user', 'time_minutes', 'id'],
+                name='core_recipe_user_time_idx'
+            ),
+            models.Index(
+                fields=['user', 'price', 'id'],
+                name='core_recipe_user_price_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+
+class RecipeImageVariant(models.Model):
+    """Resized or re-encoded copy of a recipe image"""
+    THUMBNAIL = 'thumbnail'
+    MEDIUM = 'medium'
+    FULL = 'full'
+    WEBP = 'webp'
+    NAME_CHOICES = (
+        (THUMBNAIL, 'Thumbnail'),
+        (MEDIUM, 'Medium'),
+        (FULL, 'Full'),
+        (WEBP, 'WebP'),
+    )
+
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        related_name='image_variants'
+    )
+    name = models.CharField(max_length=20, choices=NAME_CHOICES)
+    image = models.ImageField(
+        db_index=True,
+        max_length=255,
+        upload_to=recipe_image_variant_file_path,
+        storage=content_storage
+    )
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('recipe', 'name')
+
+    def __str__(self):
+        return f'{self.recipe} ({self.name})'
+
+
+class RecipeSimilarity(models.Model):
+    """One of the recipes most similar to another of its user's recipes
+
+    Kept by recipe.similarity. A deleted recipe's rows in other recipes'
+    lists stay until the next refresh finds and replaces them.
+    """
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        related_name='similarities'
+    )
+    similar = models.ForeignKey(
+        'Recipe',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='core_recipesimilarity_pair_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} ~ {self.similar_id} ({self.score:.3f})'
+
+
+# Sent by ChangeLogManager.record with the user_id, kind, object_ids and
+# whether the objects were deleted
+changes_recorded = Signal()
+
+
+class ChangeLogManager(models.Manager):
+    BATCH_SIZE = 1000
+
+    def record(self, user_id, kind, object_ids, deleted=False):
+        """Log a change of the objects under the user's next sequence numbers
+
+        Each object keeps a single entry, its latest change. The user row
+        stays locked until the transaction commits, so a user's sequence
+        numbers become visible in order and a client never steps past a
+        change that is still being written.
+        """
+        object_ids = list(dict.fromkeys(object_ids))
+        if not object_ids:
+            return
+        with transaction.atomic(using=self.db):
+            users = User.objects.filter(pk=user_id)
+            users.update(
+                change_sequence=models.F('change_sequence') + len(object_ids)
+            )
+            last = users.values_list('change_sequence', flat=True).first()
+            if last is None:
+                return
+            for start in range(0, len(object_ids), self.BATCH_SIZE):
+                self.filter(
+                    user_id=user_id, kind=kind,
+                    object_id__in=object_ids[start:start + self.BATCH_SIZE]
+                ).delete()
+            first = last - len(object_ids)
+            entries = [
+                self.model(
+                    user_id=user_id, kind=kind, object_id=object_id,
+                    sequence=first + offset, deleted=deleted
+                )
+                for offset, object_id in enumerate(object_ids, 1)
+            ]
+            # Django 3.0 lets an explicit batch size exceed SQLite's limits
+            ops = connections[self.db].ops
+            batch_size = min(
+                self.BATCH_SIZE,
+                ops.bulk_batch_size(self.model._meta.fields, entries)
+            )
+            self.bulk_create(entries, batch_size=batch_size)
+        changes_recorded.send(
+            sender=self.model, user_id=user_id, kind=kind,
+            object_ids=object_ids, deleted=deleted
+        )
+
+
+class ChangeLogEntry(models.Model):
+    """Latest change of one of a user's recipes, tags or ingredients"""
+    RECIPE = 'recipe'
+    TAG = 'tag'
+    INGREDIENT = 'ingredient'
+    KIND_CHOICES = (
+        (RECIPE, 'Recipe'),
+        (TAG, 'Tag'),
+        (INGREDIENT, 'Ingredient'),
+    )
+
+    # Entries are also written while a user's objects are deleted along
+    # with the user, so there is no constraint; recipe.signals drops them
+    # once the user is gone.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name='+'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.IntegerField()
+    sequence = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+
+    objects = ChangeLogManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'kind', 'object_id'],
+                name='core_changelog_user_object_uniq'
+            ),
+        ]
+        indexes = [
+            # Sync: one user's changes after a cursor, in order
+            models.Index(
+                fields=['user', 'sequence'],
+                name='core_changelog_user_seq_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id} @ {self.sequence}'
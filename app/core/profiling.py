@@ -0,0 +1,236 @@
+import atexit
+import cProfile
+import fnmatch
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+DEFAULTS = {
+    'ENABLED': False,
+    'MODE': 'cprofile',
+    'ACTIONS': ['*'],
+    'SAMPLE_RATE': 0.01,
+    'HEADER': 'X-Profile',
+    'HEADER_TOKEN': None,
+    'SAMPLER_INTERVAL': 0.005,
+    'OUTPUT_DIR': 'profiles',
+    'FLUSH_EVERY': 50,
+}
+
+MODES = ('cprofile', 'sampler')
+
+
+def collapse(frame):
+    """One flamegraph line for a stack: ``root;...;leaf`` function names"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(
+            f'{os.path.basename(code.co_filename)}:{code.co_name}'
+        )
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Periodically record the stacks of the threads being watched
+
+    A single daemon thread samples every watched thread and stops itself
+    once nothing is watched.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = {}
+        self._watched = {}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def watch(self, thread_id, key):
+        with self._lock:
+            self._watched[thread_id] = key
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='stack-sampler', daemon=True
+                )
+                self._thread.start()
+
+    def unwatch(self, thread_id):
+        with self._lock:
+            self._watched.pop(thread_id, None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._watched:
+                    self._thread = None
+                    return
+                watched = dict(self._watched)
+            frames = sys._current_frames()
+            samples = [
+                (key, collapse(frames[thread_id]))
+                for thread_id, key in watched.items() if thread_id in frames
+            ]
+            with self._lock:
+                for key, stack in samples:
+                    self.stacks.setdefault(key, Counter())[stack] += 1
+
+
+class Profiler:
+    """Profile selected actions and aggregate the results per action
+
+    ``cprofile`` mode merges one cProfile run per request into a pstats
+    file per action. ``sampler`` mode counts sampled stacks into a
+    collapsed-stack file per action, ready for flamegraph tools.  Files are
+    rewritten every ``flush_every`` profiled requests and at exit.
+    """
+
+    def __init__(self, mode, actions, sample_rate, header, header_token,
+                 sampler_interval, output_dir, flush_every):
+        if mode not in MODES:
+            raise ValueError(f'Unknown profiling mode {mode!r}')
+        self.mode = mode
+        self.actions = actions
+        self.sample_rate = sample_rate
+        self.header = 'HTTP_' + header.upper().replace('-', '_')
+        self.header_token = header_token
+        self.output_dir = output_dir
+        self.flush_every = flush_every
+        self.sampler = (
+            StackSampler(sampler_interval) if mode == 'sampler' else None
+        )
+        self._stats = {}
+        self._pending = Counter()
+        self._lock = threading.Lock()
+
+    def selects(self, key, request):
+        """Whether this request to action ``key`` should be profiled"""
+        if not any(fnmatch.fnmatchcase(key, p) for p in self.actions):
+            return False
+        if self.header_token and \
+                request.META.get(self.header) == self.header_token:
+            return True
+        return random.random() < self.sample_rate
+
+    @contextmanager
+    def profile(self, key):
+        if self.sampler is not None:
+            thread_id = threading.get_ident()
+            self.sampler.watch(thread_id, key)
+            try:
+                yield
+            finally:
+                self.sampler.unwatch(thread_id)
+                self._profiled(key)
+        else:
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+                self._add(key, profile)
+                self._profiled(key)
+
+    def _add(self, key, profile):
+        with self._lock:
+            if key in self._stats:
+                self._stats[key].add(profile)
+            else:
+                self._stats[key] = pstats.Stats(profile)
+
+    def _profiled(self, key):
+        with self._lock:
+            self._pending[key] += 1
+            due = self._pending[key] >= self.flush_every
+        if due:
+            self.dump(key)
+
+    def dump(self, key=None):
+        """Write the aggregates of ``key``, or of every action"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        with self._lock:
+            keys = [key] if key is not None else list(self._pending)
+            for name in keys:
+                self._pending[name] = 0
+                if self.sampler is not None:
+                    self._write_stacks(name)
+                elif name in self._stats:
+                    self._stats[name].dump_stats(
+                        os.path.join(self.output_dir, f'{name}.pstats')
+                    )
+
+    def _write_stacks(self, key):
+        with self.sampler._lock:
+            stacks = dict(self.sampler.stacks.get(key, {}))
+        path = os.path.join(self.output_dir, f'{key}.collapsed')
+        with open(path, 'w') as file:
+            for stack, count in sorted(stacks.items()):
+                file.write(f'{stack} {count}\n')
+
+
+_UNSET = object()
+_profiler = _UNSET
+
+
+def get_profiler():
+    """The profiler configured by PROFILING, or None while it is disabled"""
+    global _profiler
+    if _profiler is _UNSET:
+        options = dict(DEFAULTS, **getattr(settings, 'PROFILING', {}))
+        _profiler = None
+        if options['ENABLED']:
+            _profiler = Profiler(
+                mode=options['MODE'],
+                actions=options['ACTIONS'],
+                sample_rate=options['SAMPLE_RATE'],
+                header=options['HEADER'],
+                header_token=options['HEADER_TOKEN'],
+                sampler_interval=options['SAMPLER_INTERVAL'],
+                output_dir=options['OUTPUT_DIR'],
+                flush_every=options['FLUSH_EVERY'],
+            )
+    return _profiler
+
+
+@atexit.register
+def _dump_at_exit():
+    if _profiler is not _UNSET and _profiler is not None:
+        _profiler.dump()
+
+
+@receiver(setting_changed)
+def reset_profiler(setting, **kwargs):
+    global _profiler
+    if setting == 'PROFILING':
+        _profiler = _UNSET
+
+
+class ProfiledViewMixin:
+    """Profile the view's actions as configured by PROFILING
+
+    Actions are named ``<ViewClass>.<action>``, e.g. ``RecipeViewSet.list``.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        profiler = get_profiler()
+        if profiler is None:
+            return super().dispatch(request, *args, **kwargs)
+
+        method = request.method.lower()
+        action = getattr(self, 'action_map', {}).get(method, method)
+        key = f'{type(self).__name__}.{action}'
+        if not profiler.selects(key, request):
+            return super().dispatch(request, *args, **kwargs)
+        with profiler.profile(key):
+            return super().dispatch(request, *args, **kwargs)
@@ -0,0 +1,108 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+
+from core.models import ChangeLogEntry, Tag, Ingredient, Recipe
+
+
+def seed_email(prefix, index):
+    return f'{prefix}-{index}@example.com'
+
+
+def seed_users(count, password, prefix='seed', batch_size=5000):
+    """Bulk insert users that share one password, hashed a single time"""
+    User = get_user_model()
+    encoded = make_password(password)
+    emails = [seed_email(prefix, i) for i in range(count)]
+    User.objects.bulk_create([
+        User(email=email, name=email.split('@')[0], password=encoded)
+        for email in emails
+    ], batch_size=batch_size)
+    return list(User.objects.filter(email__in=emails).order_by('id'))
+
+
+def seed_dataset(users, recipes, tags, ingredients, tags_per_recipe=5,
+                 ingredients_per_recipe=8, seed=0, batch_size=5000):
+    """Seed every user's collection, each from its own derived seed
+
+    Returns the total number of recipe-tag and recipe-ingredient links.
+    """
+    tag_links = ingredient_links = 0
+    for offset, user in enumerate(users):
+        links = seed_user_dataset(
+            user, recipes, tags, ingredients,
+            tags_per_recipe=tags_per_recipe,
+            ingredients_per_recipe=ingredients_per_recipe,
+            seed=seed + offset,
+            batch_size=batch_size,
+        )
+        tag_links += links[0]
+        ingredient_links += links[1]
+    return tag_links, ingredient_links
+
+
+def _bulk_ids(model, user, objects, batch_size):
+    """Insert objects in batches and return the user's ids for the model"""
+    model.objects.bulk_create(objects, batch_size=batch_size)
+    return list(
+        model.objects.filter(user=user).order_by('id')
+        .values_list('id', flat=True)
+    )
+
+
+def seed_user_dataset(user, recipes, tags, ingredients, tags_per_recipe=5,
+                      ingredients_per_recipe=8, seed=0, batch_size=5000):
+    """Fill a user's collection with random recipes using bulk inserts
+
+    The same arguments always produce the same dataset. Returns the number
+    of recipe-tag and recipe-ingredient links created.
+    """
+    rng = random.Random(seed)
+    tag_ids = _bulk_ids(Tag, user, [
+        Tag(user=user, name=f'tag {i}') for i in range(tags)
+    ], batch_size)
+    ingredient_ids = _bulk_ids(Ingredient, user, [
+        Ingredient(user=user, name=f'ingredient {i}')
+        for i in range(ingredients)
+    ], batch_size)
+    recipe_ids = _bulk_ids(Recipe, user, [
+        Recipe(
+            user=user,
+            title=f'recipe {i}',
+            time_minutes=rng.randint(5, 240),
+            price=rng.randint(100, 99999) / 100,
+        )
+        for i in range(recipes)
+    ], batch_size)
+
+    tag_links = _link(
+        Recipe.tags.through, 'tag_id', recipe_ids, tag_ids,
+        tags_per_recipe, rng, batch_size
+    )
+    ingredient_links = _link(
+        Recipe.ingredients.through, 'ingredient_id', recipe_ids,
+        ingredient_ids, ingredients_per_recipe, rng, batch_size
+    )
+    for kind, ids in ((ChangeLogEntry.TAG, tag_ids),
+                      (ChangeLogEntry.INGREDIENT, ingredient_ids),
+                      (ChangeLogEntry.RECIPE, recipe_ids)):
+        ChangeLogEntry.objects.record(user.pk, kind, ids)
+    return tag_links, ingredient_links
+
+
+def _link(through, column, recipe_ids, related_ids, per_recipe, rng,
+          batch_size):
+    """Link every recipe to a random sample of related ids"""
+    per_recipe = min(per_recipe, len(related_ids))
+    batch = []
+    total = 0
+    for recipe_id in recipe_ids:
+        for related_id in rng.sample(related_ids, per_recipe):
+            batch.append(through(recipe_id=recipe_id, **{column: related_id}))
+        if len(batch) >= batch_size:
+            through.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    through.objects.bulk_create(batch)
+    return total + len(batch)
@@ -0,0 +1,91 @@
+import hashlib
+import os
+import tempfile
+import time
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+def content_digest(file):
+    """SHA-256 of a file, reusing the digest computed while it streamed in"""
+    digest = getattr(file, 'sha256', None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        hasher.update(chunk)
+    file.seek(0)
+    return hasher.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File storage where a name always stands for the same content
+
+    Names are derived from a hash of the content, so a name that already
+    exists is returned as is and the write is skipped. Files are shared by
+    every row pointing at them; recipe.images.release_image_files removes
+    them once nothing refers to them.
+
+    A skipped write still refreshes the file's mtime, and release() only
+    deletes files older than a grace period, so an upload whose row is not
+    committed yet keeps the file it reuses.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        full_path = self.path(name)
+        try:
+            os.utime(full_path)
+            return name
+        except FileNotFoundError:
+            pass
+
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        if hasattr(content, 'temporary_file_path'):
+            # Same filesystem upload: a rename, no copy
+            os.replace(content.temporary_file_path(), full_path)
+        else:
+            fd, tmp_path = tempfile.mkstemp(prefix='.save-', dir=directory)
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in content.chunks():
+                    tmp.write(chunk)
+            # Concurrent writers of one name hold identical bytes, so
+            # whichever replace lands last is as good as the first.
+            os.replace(tmp_path, full_path)
+
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        return name
+
+    def release(self, name, min_age):
+        """Delete name unless it was saved in the last min_age seconds
+
+        The file is first renamed out of the way, so a save of the same
+        name either refreshed the mtime checked here, and the file is put
+        back, or finds no file and writes it again. Returns whether the
+        file was deleted.
+        """
+        full_path = self.path(name)
+        released = os.path.join(
+            os.path.dirname(full_path), f'.release-{uuid.uuid4().hex}'
+        )
+        try:
+            os.rename(full_path, released)
+        except FileNotFoundError:
+            return False
+        if time.time() - os.stat(released).st_mtime < min_age:
+            # Any copy written meanwhile holds the same bytes
+            os.replace(released, full_path)
+            return False
+        os.remove(released)
+        return True
+
+
+content_storage = ContentAddressedStorage()
@@ -0,0 +1,40 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'BACKGROUND_TASK_WORKERS', 2),
+            thread_name_prefix='background-task'
+        )
+    return _executor
+
+
+def _run(func, args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Background task %s failed', func.__name__)
+    finally:
+        connections.close_all()
+
+
+def run_in_background(func, *args):
+    """Run func(*args) in a worker thread once the transaction commits
+
+    With BACKGROUND_TASKS_EAGER set the call runs inline instead, which
+    keeps tests deterministic.
+    """
+    if getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+        func(*args)
+        return
+    transaction.on_commit(lambda: get_executor().submit(_run, func, args))
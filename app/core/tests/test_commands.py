@@ -1,8 +1,16 @@
+import json
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
-from django.test import TestCase
+from django.test import TestCase, override_settings
+
+from core.models import Recipe
 
 
 class CommandsTestCase(TestCase):
@@ -22,4 +30,68 @@ class CommandsTestCase(TestCase):
         with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
             gi.side_effect = [OperationalError] * 5 + [True]
             call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
\ No newline at end of file
+            self.assertEqual(gi.call_count, 6)
+
+
+@override_settings(ALLOWED_HOSTS=['localhost'])
+class DatasetCommandsTests(TestCase):
+
+    def seed(self, **options):
+        call_command(
+            'seed_dataset', users=2, recipes=6, tags=4, ingredients=5,
+            stdout=StringIO(), **options
+        )
+
+    def test_seed_dataset(self):
+        """Test seeding creates users and their recipes reproducibly"""
+        self.seed(prefix='one')
+        self.seed(prefix='two')
+
+        first = get_user_model().objects.get(email='one-0@example.com')
+        second = get_user_model().objects.get(email='two-0@example.com')
+        self.assertTrue(first.check_password('benchmark'))
+        self.assertEqual(Recipe.objects.filter(user=first).count(), 6)
+        self.assertEqual(
+            list(first.recipe_set.order_by('id')
+                 .values_list('time_minutes', flat=True)),
+            list(second.recipe_set.order_by('id')
+                 .values_list('time_minutes', flat=True)),
+        )
+
+    def test_seed_dataset_refuses_existing_prefix(self):
+        self.seed()
+
+        with self.assertRaises(CommandError):
+            self.seed()
+
+    def test_benchmark_api_writes_report(self):
+        self.seed()
+        handle, path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+
+        call_command(
+            'benchmark_api', requests=3, warmup=1, output=path,
+            endpoint=['recipes', 'tags_assigned', 'upload_image'],
+            stdout=StringIO(), stderr=StringIO()
+        )
+
+        with open(path) as file:
+            report = json.load(file)
+        self.assertEqual(
+            set(report['endpoints']),
+            {'recipes', 'tags_assigned', 'upload_image'}
+        )
+        recipes = report['endpoints']['recipes']
+        self.assertEqual(recipes['status_codes'], {'200': 3})
+        self.assertLessEqual(recipes['p50_ms'], recipes['p99_ms'])
+        self.assertGreater(recipes['queries_mean'], 0)
+        self.assertEqual(
+            report['endpoints']['upload_image']['status_codes'], {'200': 3}
+        )
+        # Writes made while benchmarking are rolled back
+        self.assertFalse(Recipe.objects.exclude(image='').exists())
+
+    def test_benchmark_api_requires_dataset(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark_api', stdout=StringIO())
@@ -0,0 +1,156 @@
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, Client, override_settings
+from django.utils.http import http_date
+
+DIGEST = 'ab' * 32
+CONTENT = bytes(range(256)) * 4
+
+
+class MediaViewTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        os.makedirs(os.path.join(self.media_root, 'uploads/recipe'))
+        self.write(f'uploads/recipe/{DIGEST}.jpg', CONTENT)
+        self.write('uploads/recipe/other.png', CONTENT)
+        self.client = Client()
+
+    def write(self, name, content):
+        with open(os.path.join(self.media_root, name), 'wb') as file:
+            file.write(content)
+
+    def get(self, name, **headers):
+        res = self.client.get(f'/media/{name}', **headers)
+        self.addCleanup(res.close)
+        return res
+
+    def test_serve_content_named_file(self):
+        """Test content-named files are cached forever under their digest"""
+        res = self.get(f'uploads/recipe/{DIGEST}.jpg')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT)
+        self.assertEqual(res['ETag'], f'"{DIGEST}"')
+        self.assertIn('immutable', res['Cache-Control'])
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['X-Content-Type-Options'], 'nosniff')
+        self.assertNotIn('attachment', res.get('Content-Disposition', ''))
+        self.assertEqual(res['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+
+    def test_non_images_downloaded(self):
+        """Test files that are not raster images are never rendered"""
+        for name in (f'{DIGEST[:-1]}c.html', 'drawing.svg', 'notes.txt.gz'):
+            self.write(f'uploads/recipe/{name}', b'<script>alert(1)</script>')
+
+            res = self.get(f'uploads/recipe/{name}')
+
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(res['Content-Type'], 'application/octet-stream')
+            self.assertEqual(res['Content-Disposition'], 'attachment')
+            self.assertEqual(res['X-Content-Type-Options'], 'nosniff')
+            self.assertNotIn('Content-Encoding', res)
+
+    def test_other_files_revalidated(self):
+        res = self.get('uploads/recipe/other.png')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn('immutable', res['Cache-Control'])
+        self.assertTrue(res['ETag'].startswith('"'))
+
+    def test_if_none_match_not_modified(self):
+        res = self.get(
+            f'uploads/recipe/{DIGEST}.jpg', HTTP_IF_NONE_MATCH=f'"{DIGEST}"'
+        )
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res['ETag'], f'"{DIGEST}"')
+        self.assertEqual(res.content, b'')
+
+    def test_if_modified_since_not_modified(self):
+        res = self.get(
+            'uploads/recipe/other.png',
+            HTTP_IF_MODIFIED_SINCE=http_date(),
+        )
+
+        self.assertEqual(res.status_code, 304)
+
+    def test_byte_range(self):
+        res = self.get(
+            f'uploads/recipe/{DIGEST}.jpg', HTTP_RANGE='bytes=10-19'
+        )
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT[10:20])
+        self.assertEqual(res['Content-Range'], f'bytes 10-19/{len(CONTENT)}')
+        self.assertEqual(res['Content-Length'], '10')
+
+    def test_suffix_byte_range(self):
+        res = self.get(f'uploads/recipe/{DIGEST}.jpg', HTTP_RANGE='bytes=-5')
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT[-5:])
+
+    def test_stale_if_range_returns_whole_file(self):
+        res = self.get(
+            f'uploads/recipe/{DIGEST}.jpg',
+            HTTP_RANGE='bytes=10-19',
+            HTTP_IF_RANGE='"stale"',
+        )
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_unsatisfiable_range(self):
+        res = self.get(
+            f'uploads/recipe/{DIGEST}.jpg', HTTP_RANGE='bytes=5000-'
+        )
+
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_missing_hidden_and_outside_files_not_found(self):
+        self.write('uploads/recipe/.upload-partial.jpg', b'x')
+
+        for name in ('uploads/recipe/missing.jpg', 'uploads/recipe',
+                     'uploads/recipe/.upload-partial.jpg', '../etc/passwd'):
+            self.assertEqual(self.get(name).status_code, 404)
+
+    def test_post_not_allowed(self):
+        res = self.client.post(f'/media/uploads/recipe/{DIGEST}.jpg')
+
+        self.assertEqual(res.status_code, 405)
+
+    @override_settings(
+        MEDIA_SENDFILE='x-accel-redirect',
+        MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/'
+    )
+    def test_accel_redirect_offload(self):
+        """Test the web server is told to send the bytes itself"""
+        res = self.get(f'uploads/recipe/{DIGEST}.jpg')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(
+            res['X-Accel-Redirect'],
+            f'/protected-media/uploads/recipe/{DIGEST}.jpg'
+        )
+        self.assertEqual(res['ETag'], f'"{DIGEST}"')
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['X-Content-Type-Options'], 'nosniff')
+
+    @override_settings(MEDIA_SENDFILE='x-sendfile')
+    def test_x_sendfile_offload(self):
+        res = self.get('uploads/recipe/other.png')
+
+        self.assertEqual(
+            res['X-Sendfile'],
+            os.path.join(self.media_root, 'uploads/recipe/other.png')
+        )
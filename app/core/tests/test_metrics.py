@@ -0,0 +1,154 @@
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.metrics import Histogram, get_registry, timed
+from core.middleware import RequestMetricsMiddleware
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse('recipe:recipe-list')
+METRICS_URL = reverse('metrics')
+
+METRICS = {
+    'SAMPLE_RATE': 1.0,
+    'SERVER_TIMING': True,
+    'DUPLICATE_QUERY_THRESHOLD': 3,
+    'MAX_ROUTES': 3,
+}
+
+
+class RequestMetricsTests(TestCase):
+
+    def setUp(self):
+        # A fresh registry for every test
+        metrics = override_settings(REQUEST_METRICS=METRICS)
+        metrics.enable()
+        self.addCleanup(metrics.disable)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'metrics@luis.com',
+            'testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+        recipe = Recipe.objects.create(
+            user=self.user, title='Pie', time_minutes=10, price=5.00
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Sweet'))
+
+    def test_server_timing_header(self):
+        """Test sampled responses break their time down by phase"""
+        self.user.is_staff = True
+        self.user.save()
+
+        res = self.client.get(RECIPES_URL)
+
+        timing = res['Server-Timing']
+        for phase in ('db;', 'auth;', 'serializer;', 'total;'):
+            self.assertIn(phase, timing)
+        self.assertIn('queries"', timing)
+
+    def test_timings_aggregated_per_route(self):
+        for _ in range(3):
+            self.client.get(RECIPES_URL)
+
+        stats = get_registry().snapshot()['GET recipe:recipe-list']
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['timings']['total']['count'], 3)
+        self.assertGreater(stats['queries']['mean'], 0)
+        self.assertGreater(stats['timings']['serializer']['mean_ms'], 0)
+        self.assertEqual(stats['duplicate_queries'], [])
+
+    def test_server_timing_staff_only(self):
+        res = self.client.get(RECIPES_URL)
+
+        self.assertFalse(res.has_header('Server-Timing'))
+        self.assertEqual(
+            get_registry().snapshot()['GET recipe:recipe-list']['requests'], 1
+        )
+
+    @override_settings(REQUEST_METRICS=dict(METRICS, SERVER_TIMING=False))
+    def test_server_timing_disabled(self):
+        self.user.is_staff = True
+        self.user.save()
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertFalse(res.has_header('Server-Timing'))
+
+    @override_settings(REQUEST_METRICS=dict(METRICS, SAMPLE_RATE=0))
+    def test_unsampled_requests_not_recorded(self):
+        res = self.client.get(RECIPES_URL)
+
+        self.assertFalse(res.has_header('Server-Timing'))
+        self.assertEqual(get_registry().snapshot(), {})
+
+    def test_repeated_statements_flagged(self):
+        """Test a statement repeated within one request is reported"""
+        def view(request):
+            for tag in Tag.objects.all():
+                list(Recipe.objects.filter(tags=tag))
+            list(Recipe.objects.filter(tags__name='x'))
+            return HttpResponse()
+
+        for i in range(3):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+        middleware = RequestMetricsMiddleware(view)
+
+        with self.assertLogs('core.metrics', 'WARNING') as logs:
+            middleware(RequestFactory().get('/loop'))
+
+        stats = get_registry().snapshot()['GET (unresolved)']
+        self.assertEqual(len(stats['duplicate_queries']), 1)
+        self.assertEqual(stats['duplicate_queries'][0]['count'], 4)
+        self.assertIn('N+1', logs.output[0])
+
+    def test_routes_bounded(self):
+        middleware = RequestMetricsMiddleware(lambda request: HttpResponse())
+        for method in ('get', 'post', 'put', 'patch', 'delete'):
+            middleware(getattr(RequestFactory(), method)('/'))
+
+        routes = get_registry().snapshot()
+        self.assertEqual(len(routes), 4)
+        self.assertEqual(routes['(other)']['requests'], 2)
+
+    def test_metrics_endpoint_staff_only(self):
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_metrics_endpoint(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('GET recipe:recipe-list', res.data['routes'])
+
+        self.client.delete(METRICS_URL)
+        self.assertEqual(
+            list(get_registry().snapshot()), ['DELETE metrics']
+        )
+
+
+class HistogramTests(TestCase):
+
+    def test_quantiles_from_buckets(self):
+        histogram = Histogram()
+        for ms in [0.5] * 90 + [40] * 9 + [3000]:
+            histogram.observe(ms)
+
+        self.assertEqual(histogram.quantile(0.5), 1)
+        self.assertEqual(histogram.quantile(0.95), 50)
+        self.assertEqual(histogram.quantile(1.0), 3000)
+        self.assertEqual(histogram.snapshot()['buckets']['le_5000'], 1)
+
+    def test_timed_without_request_is_noop(self):
+        with timed('serializer'):
+            pass
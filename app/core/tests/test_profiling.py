@@ -0,0 +1,101 @@
+import os
+import pstats
+import shutil
+import tempfile
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.profiling import StackSampler, get_profiler
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class ProfilingTests(TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+        profiling = override_settings(PROFILING={
+            'ENABLED': True,
+            'MODE': 'cprofile',
+            'ACTIONS': ['RecipeViewSet.list'],
+            'SAMPLE_RATE': 1.0,
+            'HEADER_TOKEN': 'secret',
+            'OUTPUT_DIR': self.output_dir,
+            'FLUSH_EVERY': 2,
+        })
+        profiling.enable()
+        self.addCleanup(profiling.disable)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'profile@luis.com',
+            'testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_selected_action_profiled_and_aggregated(self):
+        """Test profiles of an action are merged into one pstats file"""
+        path = os.path.join(self.output_dir, 'RecipeViewSet.list.pstats')
+        self.client.get(RECIPES_URL)
+        self.assertFalse(os.path.exists(path))
+
+        self.client.get(RECIPES_URL)
+
+        stats = pstats.Stats(path)
+        functions = {name for _, _, name in stats.stats}
+        self.assertIn('get_queryset', functions)
+        self.client.get(TAGS_URL)
+        get_profiler().dump()
+        self.assertEqual(os.listdir(self.output_dir), [
+            'RecipeViewSet.list.pstats'
+        ])
+
+    def test_header_triggers_profile(self):
+        with self.settings(PROFILING=dict(
+            ENABLED=True, SAMPLE_RATE=0, HEADER_TOKEN='secret',
+            OUTPUT_DIR=self.output_dir, FLUSH_EVERY=1,
+        )):
+            self.client.get(TAGS_URL)
+            self.client.get(TAGS_URL, HTTP_X_PROFILE='wrong')
+            self.assertEqual(os.listdir(self.output_dir), [])
+
+            self.client.get(TAGS_URL, HTTP_X_PROFILE='secret')
+
+            self.assertEqual(
+                os.listdir(self.output_dir), ['TagViewSet.list.pstats']
+            )
+
+    def test_disabled_profiler(self):
+        with self.settings(PROFILING={'ENABLED': False}):
+            self.assertIsNone(get_profiler())
+
+
+class StackSamplerTests(TestCase):
+
+    def test_stacks_of_watched_thread_counted(self):
+        sampler = StackSampler(interval=0.001)
+
+        def busy_loop():
+            deadline = time.monotonic() + 0.1
+            while time.monotonic() < deadline:
+                pass
+
+        sampler.watch(threading.get_ident(), 'busy')
+        try:
+            busy_loop()
+        finally:
+            sampler.unwatch(threading.get_ident())
+
+        stacks = sampler.stacks['busy']
+        self.assertGreater(sum(stacks.values()), 0)
+        self.assertTrue(any(
+            stack.endswith('test_profiling.py:busy_loop') for stack in stacks
+        ))
@@ -0,0 +1,26 @@
+from rest_framework import permissions, status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.metrics import get_options, get_registry
+from user.authentication import CachedTokenAuthentication
+
+
+class RequestMetricsView(APIView):
+    """Per-route request timings collected by RequestMetricsMiddleware"""
+    authentication_classes = (
+        CachedTokenAuthentication, SessionAuthentication
+    )
+    permission_classes = (permissions.IsAdminUser,)
+    pagination_class = None
+
+    def get(self, request):
+        return Response({
+            'sample_rate': get_options()['SAMPLE_RATE'],
+            'routes': get_registry().snapshot(),
+        })
+
+    def delete(self, request):
+        get_registry().clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
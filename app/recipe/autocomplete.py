@@ -0,0 +1,82 @@
+import heapq
+import re
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+from django.contrib.auth import get_user_model
+
+WORD_START = re.compile(r'\b\w')
+MAX_COMPLETIONS = 50
+# Indexes kept per process, least recently used dropped first
+MAX_INDEXES = 256
+
+
+class PrefixIndex:
+    """A user's tag or ingredient names, completed by word prefix
+
+    Every word of a name is a sorted key, so ``oil`` completes ``Olive
+    oil``; a prefix is the range of keys found by bisection, and its best
+    matches are the ones used by most recipes.
+    """
+
+    def __init__(self, rows):
+        # Best first: most used, then alphabetical
+        self.items = sorted(
+            rows, key=lambda row: (-row[2], row[1].casefold(), row[0])
+        )
+        keys = sorted(
+            (name[match.start():], rank)
+            for rank, name in enumerate(
+                row[1].casefold() for row in self.items
+            )
+            for match in WORD_START.finditer(name)
+        )
+        self.keys = [key for key, _ in keys]
+        self.ranks = [rank for _, rank in keys]
+
+    def complete(self, prefix, limit):
+        """The ``limit`` best (id, name, usage) rows matching prefix"""
+        prefix = prefix.casefold()
+        if not prefix:
+            return self.items[:limit]
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + '\U0010ffff', start)
+        ranks = set(self.ranks[start:end])
+        return [self.items[rank] for rank in heapq.nsmallest(limit, ranks)]
+
+
+_indexes = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_prefix_index(user, queryset):
+    """The index of the user's rows of queryset, rebuilt after any change
+
+    ``queryset`` yields (id, name, usage) rows. Every write to the user's
+    recipes, tags or ingredients moves their change sequence, so one
+    primary key lookup tells whether the cached index is current.
+    """
+    sequence = get_user_model().objects.filter(pk=user.pk) \
+        .values_list('change_sequence', flat=True).first()
+    key = (user.pk, queryset.model._meta.model_name)
+    with _lock:
+        cached = _indexes.get(key)
+        if cached is not None and cached[0] == sequence:
+            _indexes.move_to_end(key)
+            return cached[1]
+
+    index = PrefixIndex(list(queryset))
+    with _lock:
+        _indexes[key] = (sequence, index)
+        _indexes.move_to_end(key)
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def forget_user(user_id):
+    """Drop a user's indexes, so a reused id never sees them"""
+    with _lock:
+        for key in [key for key in _indexes if key[0] == user_id]:
+            del _indexes[key]
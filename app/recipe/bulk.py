@@ -0,0 +1,300 @@
+from django.db import connection, transaction
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from recipe.caching import invalidate_user_responses
+from recipe.conditional import log_changes, touch_linked, touch_rows
+from recipe.fields import does_not_exist
+
+BATCH_SIZE = 1000
+
+
+class BulkModelMixin:
+    """Create, update and delete many of the user's objects per request
+
+    POST creates a list of items, PATCH updates a list of items carrying
+    their ``id`` and DELETE removes a list of ids.  Related ids of the whole
+    batch are resolved with one query per relation and rows are written
+    with batched inserts.  Invalid items are reported by index and skipped,
+    unless ``?atomic=1`` asks for the batch to be all or nothing.
+    """
+    bulk_serializer_class = None
+    bulk_max_items = 5000
+    # Many-to-many fields written through the batched through-table insert
+    bulk_relations = ()
+    # Relations the response serializer reads, loaded once per batch
+    bulk_prefetch = ()
+    # Fields unique per user, checked for the whole batch in one query
+    bulk_unique_fields = ()
+    # Whether rows linked to updated objects render their fields
+    bulk_touch_linked = False
+
+    def get_bulk_serializer(self, *args, **kwargs):
+        serializer_class = (
+            self.bulk_serializer_class or self.get_serializer_class()
+        )
+        kwargs['context'] = dict(self.get_serializer_context(), bulk=True)
+        return serializer_class(*args, **kwargs)
+
+    @action(methods=['POST', 'PATCH', 'DELETE'], detail=False,
+            url_path='bulk')
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError(
+                {'non_field_errors': ['Expected a non-empty list of items.']}
+            )
+        if len(items) > self.bulk_max_items:
+            raise ValidationError({'non_field_errors': [
+                f'At most {self.bulk_max_items} items per request.'
+            ]})
+
+        handler = {
+            'POST': self.bulk_create,
+            'PATCH': self.bulk_update,
+            'DELETE': self.bulk_destroy,
+        }[request.method]
+        return handler(items, bool(request.query_params.get('atomic')))
+
+    def bulk_create(self, items, atomic):
+        valid, errors = self._validate_items(enumerate(items))
+        if errors and (atomic or not valid):
+            return self._error_response(errors)
+
+        model = self.get_queryset().model
+        objects = [
+            model(user=self.request.user, **self._columns(serializer))
+            for _, serializer in valid
+        ]
+        with transaction.atomic():
+            self._insert(model, objects)
+            self._link(objects, [s.validated_data for _, s in valid])
+            # Batched writes bypass the model signals that normally do this
+            self._log(model, objects)
+            invalidate_user_responses(self.request.user.pk)
+
+        return self._written_response(
+            'created', objects, errors, status.HTTP_201_CREATED
+        )
+
+    def bulk_update(self, items, atomic):
+        ids, errors = self._item_ids(
+            item.get('id') if isinstance(item, dict) else None
+            for item in items
+        )
+        instances = self.get_queryset().in_bulk(list(ids.values()))
+        for index, pk in ids.items():
+            if pk not in instances:
+                errors.append(self._not_found(index, pk))
+
+        valid, invalid = self._validate_items(
+            (index, items[index], instances[pk])
+            for index, pk in ids.items() if pk in instances
+        )
+        errors.extend(invalid)
+        if errors and (atomic or not valid):
+            return self._error_response(errors)
+
+        # bulk_update skips auto_now, so the timestamp is set here
+        objects, fields = [], {'updated_at'}
+        now = timezone.now()
+        for _, serializer in valid:
+            columns = self._columns(serializer)
+            for name, value in columns.items():
+                setattr(serializer.instance, name, value)
+            serializer.instance.updated_at = now
+            fields.update(columns)
+            objects.append(serializer.instance)
+
+        model = self.get_queryset().model
+        with transaction.atomic():
+            model.objects.bulk_update(
+                objects, sorted(fields), batch_size=BATCH_SIZE
+            )
+            if self.bulk_touch_linked:
+                touch_linked(model, [obj.pk for obj in objects])
+            self._link(
+                objects, [s.validated_data for _, s in valid], replace=True
+            )
+            self._log(model, objects)
+            invalidate_user_responses(self.request.user.pk)
+
+        return self._written_response(
+            'updated', objects, errors, status.HTTP_200_OK
+        )
+
+    def bulk_destroy(self, items, atomic):
+        ids, errors = self._item_ids(items)
+        queryset = self.get_queryset().filter(id__in=ids.values())
+        found = set(queryset.values_list('id', flat=True))
+        for index, pk in ids.items():
+            if pk not in found:
+                errors.append(self._not_found(index, pk))
+        if errors and (atomic or not found):
+            return self._error_response(errors)
+
+        with transaction.atomic():
+            queryset.filter(id__in=found).delete()
+            invalidate_user_responses(self.request.user.pk)
+
+        data = {'deleted': sorted(found)}
+        if errors:
+            data['errors'] = self._sorted(errors)
+            return Response(data, status=status.HTTP_207_MULTI_STATUS)
+        return Response(data, status=status.HTTP_200_OK)
+
+    def _validate_items(self, entries):
+        """Validate every item, resolving related ids for the whole batch"""
+        valid, errors = [], []
+        for entry in entries:
+            index, data = entry[:2]
+            instance = entry[2] if len(entry) > 2 else None
+            serializer = self.get_bulk_serializer(
+                instance, data=data, partial=instance is not None
+            )
+            if serializer.is_valid():
+                valid.append((index, serializer))
+            else:
+                errors.append({'index': index, 'errors': serializer.errors})
+
+        for name in self.bulk_relations:
+            requested = {
+                pk for _, serializer in valid
+                for pk in serializer.validated_data.get(name, ())
+            }
+            found = self._related_ids(name, requested)
+            for index, serializer in list(valid):
+                missing = sorted(
+                    set(serializer.validated_data.get(name, ())) - found
+                )
+                if missing:
+                    valid.remove((index, serializer))
+                    errors.append({'index': index, 'errors': {
+                        name: [does_not_exist(missing)]
+                    }})
+
+        for name in self.bulk_unique_fields:
+            taken = self._taken_values(name, [
+                serializer.validated_data[name] for _, serializer in valid
+                if name in serializer.validated_data
+            ])
+            for index, serializer in list(valid):
+                value = serializer.validated_data.get(name)
+                if value is None:
+                    continue
+                # New items own nothing yet; key them apart from real ids
+                owner = (
+                    serializer.instance.pk if serializer.instance
+                    else ('new', index)
+                )
+                if taken.setdefault(value, owner) != owner:
+                    valid.remove((index, serializer))
+                    errors.append({'index': index, 'errors': {
+                        name: ['You already use this name.']
+                    }})
+        return valid, errors
+
+    def _taken_values(self, name, values):
+        """Map the values already used by the user's objects to their ids"""
+        if not values:
+            return {}
+        return dict(self.get_queryset().model.objects.filter(
+            user=self.request.user, **{name + '__in': values}
+        ).values_list(name, 'id'))
+
+    def _related_ids(self, name, ids):
+        """The subset of ``ids`` naming the user's related objects"""
+        if not ids:
+            return set()
+        related = self.get_queryset().model._meta.get_field(name)
+        return set(related.related_model.objects.filter(
+            user=self.request.user, id__in=ids
+        ).values_list('id', flat=True))
+
+    def _item_ids(self, values):
+        """Map item index to the integer id it names"""
+        ids, errors, seen = {}, [], set()
+        for index, value in enumerate(values):
+            if isinstance(value, bool) or not isinstance(value, int):
+                errors.append({'index': index, 'errors': {
+                    'id': ['A valid integer is required.']
+                }})
+            elif value in seen:
+                errors.append({'index': index, 'errors': {
+                    'id': ['Duplicate id in batch.']
+                }})
+            else:
+                seen.add(value)
+                ids[index] = value
+        return ids, errors
+
+    def _columns(self, serializer):
+        return {
+            name: value for name, value in serializer.validated_data.items()
+            if name not in self.bulk_relations
+        }
+
+    def _insert(self, model, objects):
+        if connection.features.can_return_rows_from_bulk_insert:
+            model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+        else:
+            # Without RETURNING the new primary keys are unknown, and the
+            # through rows below need them.
+            for obj in objects:
+                obj.save(force_insert=True)
+
+    def _log(self, model, objects):
+        log_changes(model, [(obj.pk, obj.user_id) for obj in objects])
+
+    def _link(self, objects, validated, replace=False):
+        """Write the many-to-many rows of the batch, one insert per relation"""
+        model = self.get_queryset().model
+        for name in self.bulk_relations:
+            field = model._meta.get_field(name)
+            through = field.remote_field.through
+            source = field.m2m_field_name() + '_id'
+            target = field.m2m_reverse_field_name() + '_id'
+            pairs = [
+                (obj, data[name])
+                for obj, data in zip(objects, validated) if name in data
+            ]
+            linked = {pk for _, pks in pairs for pk in pks}
+            if replace and pairs:
+                previous = through.objects.filter(**{
+                    source + '__in': [obj.pk for obj, _ in pairs]
+                })
+                linked.update(previous.values_list(target, flat=True))
+                previous.delete()
+            through.objects.bulk_create([
+                through(**{source: obj.pk, target: pk})
+                for obj, pks in pairs for pk in dict.fromkeys(pks)
+            ], batch_size=BATCH_SIZE)
+            if linked:
+                # Their usage changed, as m2m_changed would have recorded
+                touch_rows(field.related_model, [
+                    (pk, self.request.user.pk) for pk in linked
+                ])
+
+    def _not_found(self, index, pk):
+        return {'index': index, 'errors': {'id': [does_not_exist([pk])]}}
+
+    def _sorted(self, errors):
+        return sorted(errors, key=lambda error: error['index'])
+
+    def _error_response(self, errors):
+        return Response(
+            {'errors': self._sorted(errors)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    def _written_response(self, key, objects, errors, success_status):
+        prefetch_related_objects(objects, *self.bulk_prefetch)
+        data = {key: self.get_serializer(objects, many=True).data}
+        if errors:
+            data['errors'] = self._sorted(errors)
+            return Response(data, status=status.HTTP_207_MULTI_STATUS)
+        return Response(data, status=success_status)
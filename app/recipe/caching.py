@@ -0,0 +1,153 @@
+import hashlib
+import uuid
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.cache import get_conditional_response
+from rest_framework.response import Response
+
+DEFAULTS = {
+    'ENABLED': False,
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 300,
+    'ALLOW_PROCESS_LOCAL': False,
+}
+
+# Backends whose entries other processes never see, so a write served by
+# one worker would leave stale responses cached in the others
+PROCESS_LOCAL_BACKENDS = (DummyCache, LocMemCache)
+
+# Validators set by ConditionalGetMixin, stored with the cached data
+CACHED_HEADERS = ('ETag', 'Last-Modified')
+
+
+class ResponseCache:
+    """Serialized API responses per user, invalidated by a version token
+
+    Every key embeds the user's current version; changing any of the user's
+    recipes, tags or ingredients replaces the version, which orphans all of
+    their cached responses at once. Versions are random tokens rather than
+    counters so an evicted version can never resurrect old entries.
+    """
+
+    def __init__(self, cache_alias, timeout):
+        self.cache = caches[cache_alias]
+        self.timeout = timeout
+
+    def _version_key(self, user_id):
+        return f'recipe-api:version:{user_id}'
+
+    def version(self, user_id):
+        key = self._version_key(user_id)
+        version = self.cache.get(key)
+        if version is None:
+            self.cache.add(key, uuid.uuid4().hex, None)
+            version = self.cache.get(key)
+        return version
+
+    def bump(self, user_id):
+        self.cache.set(self._version_key(user_id), uuid.uuid4().hex, None)
+
+    def key(self, request, view_name):
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        digest = hashlib.sha1(
+            f'{request.get_host()}{request.path}?{query}'.encode()
+        ).hexdigest()
+        user_id = request.user.pk
+        return (
+            f'recipe-api:response:{user_id}:{self.version(user_id)}:'
+            f'{view_name}:{digest}'
+        )
+
+    def get(self, key):
+        """The cached ``(data, headers)`` of a response, or None"""
+        return self.cache.get(key)
+
+    def set(self, key, response):
+        headers = {
+            name: response[name] for name in CACHED_HEADERS
+            if response.has_header(name)
+        }
+        self.cache.set(key, (response.data, headers), self.timeout)
+
+
+_response_cache = None
+
+
+def get_response_cache():
+    """The cache configured by RESPONSE_CACHE, or None when disabled"""
+    global _response_cache
+    if _response_cache is None:
+        options = dict(DEFAULTS, **getattr(settings, 'RESPONSE_CACHE', {}))
+        if not options['ENABLED']:
+            return None
+        response_cache = ResponseCache(
+            options['CACHE_ALIAS'], options['TIMEOUT']
+        )
+        if isinstance(response_cache.cache, PROCESS_LOCAL_BACKENDS) and \
+                not options['ALLOW_PROCESS_LOCAL']:
+            raise ImproperlyConfigured(
+                f"RESPONSE_CACHE needs a cache shared by every process; "
+                f"{options['CACHE_ALIAS']!r} is local to this one"
+            )
+        _response_cache = response_cache
+    return _response_cache
+
+
+@receiver(setting_changed)
+def reset_response_cache(setting, **kwargs):
+    global _response_cache
+    if setting in ('RESPONSE_CACHE', 'CACHES'):
+        _response_cache = None
+
+
+def invalidate_user_responses(user_id):
+    """Drop the user's cached responses now and again once committed
+
+    The second bump covers readers that cached rows the open transaction
+    was still changing.
+    """
+    cache = get_response_cache()
+    if cache is None or user_id is None:
+        return
+    cache.bump(user_id)
+    transaction.on_commit(lambda: cache.bump(user_id))
+
+
+class CachedResponseMixin:
+    """Serve the read actions of a viewset from the response cache"""
+    cached_actions = ('list', 'retrieve')
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        cache = get_response_cache()
+        if cache is None or self.action not in self.cached_actions:
+            return handler(request, *args, **kwargs)
+
+        key = cache.key(request, f'{self.basename}-{self.action}')
+        entry = cache.get(key)
+        if entry is not None:
+            data, headers = entry
+            response = Response(data, headers=headers)
+            return get_conditional_response(
+                request, etag=headers.get('ETag'), response=response
+            )
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
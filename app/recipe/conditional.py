@@ -0,0 +1,223 @@
+import hashlib
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.permissions import SAFE_METHODS
+
+from core.models import ChangeLogEntry
+
+_batch = threading.local()
+
+
+class ChangeBatch:
+    """Rows touched and logged inside batched_changes(), written at its end"""
+
+    def __init__(self):
+        # {model: {pk: user_id}}
+        self.touched = defaultdict(dict)
+        # {(model, user_id, pk): deleted}, in the order of the changes
+        self.logged = {}
+
+    def touch(self, model, rows):
+        self.touched[model].update(rows)
+        self.log(model, rows)
+
+    def log(self, model, rows, deleted=False):
+        for pk, user_id in rows:
+            key = (model, user_id, pk)
+            # The latest change decides, so a deletion is logged last
+            self.logged.pop(key, None)
+            self.logged[key] = deleted
+
+    def write(self):
+        for model, rows in self.touched.items():
+            model.objects.filter(pk__in=list(rows)).update(
+                updated_at=timezone.now()
+            )
+        groups = defaultdict(list)
+        for (model, user_id, pk), deleted in self.logged.items():
+            groups[model, user_id, deleted].append(pk)
+        for (model, user_id, deleted), pks in groups.items():
+            ChangeLogEntry.objects.record(
+                user_id, model._meta.model_name, pks, deleted=deleted
+            )
+
+
+@contextmanager
+def batched_changes():
+    """Touch and log each row changed inside the block once, as it exits
+
+    Saving a recipe with its tags and ingredients touches the recipe again
+    per relation; batched, a write allocates its sequence numbers and sends
+    changes_recorded once per user and kind. The block is atomic; nested
+    blocks join the outermost one.
+    """
+    if getattr(_batch, 'current', None) is not None:
+        yield _batch.current
+        return
+    batch = _batch.current = ChangeBatch()
+    try:
+        with transaction.atomic():
+            yield batch
+            if not transaction.get_rollback():
+                batch.write()
+    finally:
+        _batch.current = None
+
+
+def log_changes(model, rows, deleted=False):
+    """Record (pk, user_id) rows of ``model`` in their users' change logs"""
+    batch = getattr(_batch, 'current', None)
+    if batch is not None:
+        batch.log(model, rows, deleted=deleted)
+        return
+    by_user = defaultdict(list)
+    for pk, user_id in rows:
+        by_user[user_id].append(pk)
+    for user_id, pks in by_user.items():
+        ChangeLogEntry.objects.record(
+            user_id, model._meta.model_name, pks, deleted=deleted
+        )
+
+
+def touch(queryset):
+    """Mark rows as changed when something they render changed elsewhere
+
+    Their ``updated_at`` moves and they are logged for delta sync.
+    """
+    return touch_rows(
+        queryset.model, list(queryset.values_list('pk', 'user_id'))
+    )
+
+
+def touch_rows(model, rows):
+    """Like touch(), for (pk, user_id) rows already known"""
+    if not rows:
+        return 0
+    batch = getattr(_batch, 'current', None)
+    if batch is not None:
+        batch.touch(model, rows)
+        return len(rows)
+    model.objects.filter(pk__in=[pk for pk, _ in rows]).update(
+        updated_at=timezone.now()
+    )
+    log_changes(model, rows)
+    return len(rows)
+
+
+def touch_linked(model, pks):
+    """Touch the rows linked to ``pks`` through ``model``'s many-to-manys
+
+    Recipes render the names of their tags and ingredients, and tags and
+    ingredients are listed by whether and how often they are used.
+    """
+    for field in model._meta.get_fields():
+        if not field.many_to_many:
+            continue
+        lookup = (
+            field.field.name if field.auto_created
+            else field.related_query_name()
+        )
+        touch(field.related_model.objects.filter(**{f'{lookup}__in': pks}))
+
+
+class BatchedChangesMixin:
+    """Run write requests in batched_changes()
+
+    A response carrying a handled exception rolls its writes back, as
+    ATOMIC_REQUESTS would.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        with batched_changes():
+            response = super().dispatch(request, *args, **kwargs)
+            if getattr(response, 'exception', False):
+                transaction.set_rollback(True)
+        return response
+
+
+class ConditionalGetMixin:
+    """Send ETag/Last-Modified and answer matching If-None-Match with 304
+
+    The validators come from one aggregate over the rows the action would
+    return, their latest ``updated_at`` and their count, so additions,
+    edits and deletions all change the ETag and a 304 never serializes
+    anything.  If-Modified-Since alone is not honoured: a deletion leaves
+    the latest ``updated_at`` of a list unchanged.
+    """
+    conditional_actions = ('list', 'retrieve')
+
+    def get_validator_queryset(self):
+        """The rows the current action renders"""
+        return self.filter_queryset(self.get_queryset())
+
+    def get_validators(self):
+        """(etag, last modified) of the current action
+
+        Both are None for a missing object; an empty list has an ETag but
+        no Last-Modified.
+        """
+        queryset = self.get_validator_queryset()
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            try:
+                queryset = queryset.filter(
+                    **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+                )
+            except (TypeError, ValueError, ValidationError):
+                # A malformed lookup, answered 404 by get_object
+                return None, None
+        state = queryset.order_by().aggregate(
+            last=Max('updated_at'), count=Count('pk')
+        )
+        if self.action == 'retrieve' and not state['count']:
+            # Left to the action to answer 404
+            return None, None
+
+        digest = hashlib.sha1(':'.join([
+            str(self.request.user.pk),
+            self.request.get_full_path(),
+            state['last'].isoformat() if state['last'] else '',
+            str(state['count']),
+        ]).encode()).hexdigest()
+        return quote_etag(digest), state['last']
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        if self.action not in self.conditional_actions:
+            return handler(request, *args, **kwargs)
+
+        etag, last_modified = self.get_validators()
+        if etag is None:
+            return handler(request, *args, **kwargs)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(
+                    last_modified.timestamp()
+                )
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
@@ -0,0 +1,33 @@
+from django.db.models import Count, F, Q
+
+from core.models import Recipe
+from recipe.filters import related_exists
+
+MAX_ON_HAND = 200
+MAX_COOK_RESULTS = 100
+
+
+def rank_by_coverage(recipes, ingredient_ids, limit):
+    """The recipes covering most of the ingredients, with their coverage
+
+    One aggregate over the recipe-ingredient links: for every recipe using
+    at least one of the ingredients it counts the ones it uses and all its
+    ingredients, so the best ``limit`` come back as (recipe id, matched,
+    total) rows.  Fewest missing ingredients break ties in matches.
+    """
+    through = Recipe.ingredients.through
+    candidates = recipes.filter(
+        related_exists(through, 'ingredient_id', ingredient_ids)
+    ).order_by().values('id')
+    return list(
+        through.objects.filter(
+            recipe_id__in=candidates
+        ).values('recipe_id').annotate(
+            matched=Count('pk', filter=Q(ingredient_id__in=ingredient_ids)),
+            total=Count('*'),
+        ).annotate(
+            missing=F('total') - F('matched')
+        ).order_by(
+            '-matched', 'missing', '-recipe_id'
+        ).values_list('recipe_id', 'matched', 'total')[:limit]
+    )
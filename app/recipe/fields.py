@@ -0,0 +1,137 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.relations import MANY_RELATION_KWARGS, ManyRelatedField
+
+
+class BatchedManyRelatedField(ManyRelatedField):
+    """Many related primary keys resolved with one query for the list
+
+    When the child allows it, items may also be ``{"name": ...}`` objects.
+    Names are looked up with one more query; the ones not found come back
+    as unsaved instances for ``save_named_objects`` to insert.
+    """
+    default_error_messages = {
+        'does_not_exist': _(
+            'Invalid pk {pk_values} - objects do not exist.'
+        ),
+        'invalid_name': _('Invalid name {name}.'),
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        queryset = self.child_relation.get_queryset()
+        pk_field = queryset.model._meta.pk
+        pks, names = [], []
+        for item in data:
+            if self.child_relation.create_by_name and isinstance(item, dict):
+                names.append(self.validate_name(item.get('name')))
+                continue
+            if isinstance(item, bool) or not isinstance(item, (str, int)):
+                self.child_relation.fail(
+                    'incorrect_type', data_type=type(item).__name__
+                )
+            try:
+                pks.append(pk_field.to_python(item))
+            except DjangoValidationError:
+                self.child_relation.fail(
+                    'incorrect_type', data_type=type(item).__name__
+                )
+
+        pks = list(dict.fromkeys(pks))
+        objects = queryset.in_bulk(pks) if pks else {}
+        missing = [pk for pk in pks if pk not in objects]
+        if missing:
+            self.fail('does_not_exist', pk_values=', '.join(
+                f'"{pk}"' for pk in missing
+            ))
+        resolved = [objects[pk] for pk in pks]
+        if names:
+            resolved.extend(self.resolve_names(queryset, names))
+        return list({
+            obj.pk if obj.pk is not None else obj.name: obj
+            for obj in resolved
+        }.values())
+
+    def validate_name(self, name):
+        model = self.child_relation.get_queryset().model
+        field = serializers.CharField(
+            max_length=model._meta.get_field('name').max_length
+        )
+        try:
+            return field.run_validation(name)
+        except serializers.ValidationError:
+            self.fail('invalid_name', name=repr(name))
+
+    def resolve_names(self, queryset, names):
+        """Existing objects for ``names``, new unsaved ones for the rest"""
+        names = list(dict.fromkeys(names))
+        existing = {
+            obj.name: obj for obj in queryset.filter(name__in=names)
+        }
+        user = self.context['request'].user
+        return [
+            existing.get(name) or queryset.model(user=user, name=name)
+            for name in names
+        ]
+
+
+def does_not_exist(pks):
+    """BatchedManyRelatedField's error for primary keys with no object"""
+    message = BatchedManyRelatedField.default_error_messages['does_not_exist']
+    return ErrorDetail(
+        message.format(pk_values=', '.join(f'"{pk}"' for pk in pks)),
+        code='does_not_exist'
+    )
+
+
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key of one of the requesting user's objects
+
+    With ``many=True`` the submitted ids are looked up together instead of
+    one query per id, and ``create_by_name`` lets items name objects that
+    are created if missing.
+    """
+
+    def __init__(self, **kwargs):
+        self.create_by_name = kwargs.pop('create_by_name', False)
+        super().__init__(**kwargs)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BatchedManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is None or not request.user.is_authenticated:
+            return queryset.none()
+        return queryset.filter(user=request.user)
+
+
+def save_named_objects(objects):
+    """Insert the unsaved objects among ``objects`` and return all saved
+
+    Concurrent requests may insert the same names; conflicts on the
+    ``(user, name)`` constraint are ignored and every name re-read.
+    """
+    new = [obj for obj in objects if obj.pk is None]
+    if not new:
+        return objects
+    model, user = type(new[0]), new[0].user
+    model.objects.bulk_create(new, ignore_conflicts=True)
+    saved = {
+        obj.name: obj for obj in model.objects.filter(
+            user=user, name__in=[obj.name for obj in new]
+        )
+    }
+    return [obj if obj.pk is not None else saved[obj.name] for obj in objects]
@@ -0,0 +1,137 @@
+from django.db.models import Count, Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from core.models import Recipe
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_MODES = (MATCH_ANY, MATCH_ALL)
+
+# query param -> (through model, column holding the related id)
+RELATED_FILTERS = {
+    'tags': (Recipe.tags.through, 'tag_id'),
+    'ingredients': (Recipe.ingredients.through, 'ingredient_id'),
+}
+
+# query param prefix -> field validating the `_min`/`_max` bounds
+RANGE_FILTERS = {
+    'time_minutes': serializers.IntegerField(min_value=0),
+    'price': serializers.DecimalField(
+        max_digits=None, decimal_places=None, min_value=0
+    ),
+}
+
+# ?ordering= -> recipe ordering; ties are broken by id in the direction of
+# the sort key, so one (user, key, id) index serves both directions
+RECIPE_ORDERINGS = {
+    '-id': ('-id',),
+    'id': ('id',),
+    'time_minutes': ('time_minutes', 'id'),
+    '-time_minutes': ('-time_minutes', '-id'),
+    'price': ('price', 'id'),
+    '-price': ('-price', '-id'),
+}
+DEFAULT_RECIPE_ORDERING = '-id'
+
+
+def params_to_ints(param, value):
+    """Convert a comma separated list of ids into a list of integers"""
+    try:
+        return sorted({int(str_id) for str_id in value.split(',')})
+    except ValueError:
+        raise ValidationError({
+            param: 'Expected a comma separated list of ids.'
+        })
+
+
+def related_exists(through, column, ids, mode=MATCH_ANY):
+    """Semi-join matching recipes linked to any or all of the given ids
+
+    The through table is probed with a correlated EXISTS, so a recipe
+    appears once no matter how many of the ids it matches and no DISTINCT
+    is needed.
+    """
+    links = through.objects.filter(
+        recipe_id=OuterRef('pk'), **{f'{column}__in': ids}
+    )
+    if mode == MATCH_ALL:
+        links = links.values('recipe_id').annotate(
+            matched=Count('*')
+        ).filter(matched=len(ids))
+    return Exists(links)
+
+
+def linked_exists(through, column):
+    """Semi-join matching tags/ingredients assigned to at least one recipe"""
+    return Exists(through.objects.filter(**{column: OuterRef('pk')}))
+
+
+def linked_count(through, column):
+    """Correlated count of the recipes a tag/ingredient is assigned to"""
+    counts = through.objects.filter(
+        **{column: OuterRef('pk')}
+    ).order_by().values(column).annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(counts), 0)
+
+
+def range_bounds(field, params):
+    """Validated `{field}_min`/`{field}_max` params, None when missing"""
+    bounds = []
+    for suffix in ('min', 'max'):
+        param = f'{field}_{suffix}'
+        value = params.get(param)
+        if value in (None, ''):
+            bounds.append(None)
+            continue
+        try:
+            bounds.append(RANGE_FILTERS[field].run_validation(value))
+        except ValidationError as exc:
+            raise ValidationError({param: exc.detail})
+    low, high = bounds
+    if low is not None and high is not None and low > high:
+        raise ValidationError({
+            f'{field}_max': f'Must not be less than {field}_min.'
+        })
+    return low, high
+
+
+def recipe_ordering(params):
+    """The order_by() fields for `?ordering=`, from a fixed whitelist"""
+    ordering = params.get('ordering') or DEFAULT_RECIPE_ORDERING
+    if ordering not in RECIPE_ORDERINGS:
+        raise ValidationError({
+            'ordering': f'Expected one of: {", ".join(RECIPE_ORDERINGS)}.'
+        })
+    return RECIPE_ORDERINGS[ordering]
+
+
+def filter_recipes(queryset, params):
+    """Apply the related and range filters from the request query params
+
+    `?tags=1,2` keeps recipes with any of the tags; adding `tags_mode=all`
+    keeps only recipes with every one of them. `ingredients` works the same.
+    `?time_minutes_max=30` or `?price_min=5&price_max=10` bound the recipes'
+    time and price, inclusively.
+    """
+    for param, (through, column) in RELATED_FILTERS.items():
+        value = params.get(param)
+        if not value:
+            continue
+        mode = params.get(f'{param}_mode', MATCH_ANY)
+        if mode not in MATCH_MODES:
+            raise ValidationError({
+                f'{param}_mode': f'Expected one of: {", ".join(MATCH_MODES)}.'
+            })
+        ids = params_to_ints(param, value)
+        queryset = queryset.filter(related_exists(through, column, ids, mode))
+
+    for field in RANGE_FILTERS:
+        low, high = range_bounds(field, params)
+        if low is not None:
+            queryset = queryset.filter(**{f'{field}__gte': low})
+        if high is not None:
+            queryset = queryset.filter(**{f'{field}__lte': high})
+
+    return queryset
@@ -0,0 +1,205 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, features
+from rest_framework import serializers
+
+from core.models import (
+    Recipe, RecipeImageVariant, recipe_image_variant_prefix
+)
+from core.storage import content_storage
+from core.tasks import run_in_background
+from recipe.caching import invalidate_user_responses
+from recipe.conditional import touch
+
+# Accepted formats and the extensions an upload of each may carry; the
+# first one is the extension it is stored under
+FORMAT_EXTENSIONS = {
+    'JPEG': ('jpg', 'jpeg'),
+    'PNG': ('png',),
+    'WEBP': ('webp',),
+    'GIF': ('gif',),
+}
+ALLOWED_FORMATS = tuple(FORMAT_EXTENSIONS)
+MAX_PIXELS = 50000000
+
+# Longest edge of each resized variant
+VARIANT_SIZES = {
+    RecipeImageVariant.THUMBNAIL: 200,
+    RecipeImageVariant.MEDIUM: 800,
+    RecipeImageVariant.FULL: 2000,
+}
+# EXIF Orientation values and the transposition displaying each upright
+ORIENTATION_TAG = 0x0112
+ORIENTATION_TRANSPOSES = {
+    2: Image.FLIP_LEFT_RIGHT,
+    3: Image.ROTATE_180,
+    4: Image.FLIP_TOP_BOTTOM,
+    5: Image.TRANSPOSE,
+    6: Image.ROTATE_270,
+    7: Image.TRANSVERSE,
+    8: Image.ROTATE_90,
+}
+VARIANT_EXTENSIONS = {
+    RecipeImageVariant.THUMBNAIL: 'jpg',
+    RecipeImageVariant.MEDIUM: 'jpg',
+    RecipeImageVariant.FULL: 'jpg',
+    RecipeImageVariant.WEBP: 'webp',
+}
+
+
+def validate_image_header(file):
+    """Reject anything that is not a reasonably sized image
+
+    Only the header is parsed, the pixel data is not decoded. The file's
+    extension must name the detected format, and is normalised to it, so
+    a stored image is never named, and served, as something else.
+    """
+    try:
+        image = Image.open(file)
+        fmt, (width, height) = image.format, image.size
+    except Exception:
+        raise serializers.ValidationError('Upload a valid image.')
+    finally:
+        file.seek(0)
+
+    if fmt not in ALLOWED_FORMATS:
+        raise serializers.ValidationError(
+            f'Unsupported image format {fmt}.'
+        )
+    if width * height > MAX_PIXELS:
+        raise serializers.ValidationError('Image dimensions are too large.')
+
+    stem, _, ext = (file.name or '').rpartition('.')
+    if not stem or ext.lower() not in FORMAT_EXTENSIONS[fmt]:
+        raise serializers.ValidationError(
+            f'File extension does not match the {fmt} image format.',
+            code='invalid_extension'
+        )
+    file.name = f'{stem}.{FORMAT_EXTENSIONS[fmt][0]}'
+    return file
+
+
+def _encode(image, fmt, **params):
+    buffer = BytesIO()
+    image.save(buffer, format=fmt, **params)
+    return ContentFile(buffer.getvalue())
+
+
+def _upright(image):
+    """The image turned as its EXIF Orientation tag says to display it
+
+    Pillow 5.3 has no ImageOps.exif_transpose; _getexif is only provided
+    by the formats carrying EXIF.
+    """
+    getexif = getattr(image, '_getexif', None)
+    exif = getexif() if getexif is not None else None
+    method = ORIENTATION_TRANSPOSES.get((exif or {}).get(ORIENTATION_TAG))
+    return image if method is None else image.transpose(method)
+
+
+def render_variants(source):
+    """Yield (name, content, width, height) for every variant
+
+    Variants are re-encoded without EXIF, so the orientation tag is applied
+    to the pixels first.
+    """
+    with Image.open(source) as original:
+        original.load()
+        image = _upright(original).convert('RGB')
+
+    full = None
+    for name, size in VARIANT_SIZES.items():
+        variant = image.copy()
+        variant.thumbnail((size, size), Image.LANCZOS)
+        content = _encode(variant, 'JPEG', quality=85, optimize=True)
+        yield name, content, variant.width, variant.height
+        full = variant
+
+    if features.check('webp'):
+        content = _encode(full, 'WEBP', quality=80)
+        yield RecipeImageVariant.WEBP, content, full.width, full.height
+
+
+def _reuse_variants(recipe):
+    """Copy variants another recipe already rendered from the same image"""
+    prefix = recipe_image_variant_prefix(recipe)
+    names = [
+        f'{prefix}{name}.{ext}' for name, ext in VARIANT_EXTENSIONS.items()
+    ]
+    variants = {}
+    for variant in RecipeImageVariant.objects.filter(image__in=names):
+        variants.setdefault(variant.name, RecipeImageVariant(
+            recipe=recipe,
+            name=variant.name,
+            image=variant.image.name,
+            width=variant.width,
+            height=variant.height,
+        ))
+    if not set(VARIANT_SIZES) <= set(variants):
+        return []
+    return list(variants.values())
+
+
+def process_recipe_image(recipe_id, image_name):
+    """Generate and record the variants of a recipe's current image"""
+    recipe = Recipe.objects.filter(pk=recipe_id, image=image_name).first()
+    if recipe is None:
+        # Deleted or replaced before we got to it
+        return
+
+    variants = _reuse_variants(recipe)
+    if not variants:
+        with recipe.image.open('rb') as source:
+            rendered = list(render_variants(source))
+        for name, content, width, height in rendered:
+            variant = RecipeImageVariant(
+                recipe=recipe, name=name, width=width, height=height
+            )
+            variant.image.save(
+                f'{name}.{VARIANT_EXTENSIONS[name]}', content, save=False
+            )
+            variants.append(variant)
+
+    previous = list(
+        recipe.image_variants.values_list('image', flat=True)
+    )
+    with transaction.atomic():
+        recipe.image_variants.all().delete()
+        RecipeImageVariant.objects.bulk_create(variants)
+        touch(Recipe.objects.filter(pk=recipe.pk))
+        invalidate_user_responses(recipe.user_id)
+    release_image_files(previous)
+
+
+def schedule_image_processing(recipe):
+    run_in_background(process_recipe_image, recipe.pk, recipe.image.name)
+
+
+def release_image_files(names):
+    """Delete stored images that no recipe or variant refers to any more
+
+    Files are shared between recipes uploading the same content, so the
+    rows pointing at a name are its reference count. Files saved within
+    RECIPE_IMAGE_RELEASE_GRACE seconds may belong to an upload that has
+    not committed yet; they are left to gc_recipe_images.
+    """
+    names = set(filter(None, names))
+    if not names:
+        return
+    referenced = set(
+        Recipe.objects.filter(image__in=names).values_list('image', flat=True)
+    ).union(
+        RecipeImageVariant.objects.filter(image__in=names)
+        .values_list('image', flat=True)
+    )
+    grace = getattr(settings, 'RECIPE_IMAGE_RELEASE_GRACE', 3600)
+    for name in names - referenced:
+        content_storage.release(name, grace)
+
+
+def release_image_files_on_commit(names):
+    names = list(names)
+    transaction.on_commit(lambda: release_image_files(names))
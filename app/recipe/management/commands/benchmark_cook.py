@@ -0,0 +1,88 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Recipe
+from core.seeding import seed_user_dataset
+from recipe.cooking import rank_by_coverage
+from recipe.filters import related_exists
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the ingredient coverage ranking"""
+
+    help = ('Time ranking recipes by the ingredients on hand on a seeded '
+            'dataset, for several numbers of ingredients')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--ingredients', type=int, default=500)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument(
+            '--on-hand', type=int, nargs='+', default=[5, 10, 25, 50]
+        )
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--keep', action='store_true',
+            help='Commit the seeded data instead of rolling it back'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                'benchmark-cook@example.com'
+            )
+            self.stdout.write('seeding...')
+            _, links = seed_user_dataset(
+                user,
+                recipes=options['recipes'],
+                tags=0,
+                ingredients=options['ingredients'],
+                tags_per_recipe=0,
+                ingredients_per_recipe=options['ingredients_per_recipe'],
+            )
+            self.stdout.write(f'{links} recipe-ingredient rows')
+
+            ingredient_ids = list(
+                user.ingredient_set.values_list('id', flat=True)
+            )
+            rng = random.Random(0)
+            for on_hand in options['on_hand']:
+                if on_hand > len(ingredient_ids):
+                    continue
+                self.run_case(
+                    user, rng.sample(ingredient_ids, on_hand),
+                    options['limit'], options['repeat']
+                )
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+    def run_case(self, user, ingredient_ids, limit, repeat):
+        recipes = Recipe.objects.filter(user=user)
+        candidates = recipes.filter(related_exists(
+            Recipe.ingredients.through, 'ingredient_id', ingredient_ids
+        )).count()
+        ranking = rank_by_coverage(recipes, ingredient_ids, limit)
+        elapsed = self.time(
+            lambda: rank_by_coverage(recipes, ingredient_ids, limit), repeat
+        )
+        best = f'{ranking[0][1]}/{ranking[0][2]}' if ranking else '-'
+        self.stdout.write(
+            f'on hand={len(ingredient_ids):<4} candidates={candidates:<8} '
+            f'best={best:<6} top {limit}={elapsed:8.1f}ms'
+        )
+
+    def time(self, func, repeat):
+        """Median wall time of func in milliseconds"""
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
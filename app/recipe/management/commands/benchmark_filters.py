@@ -0,0 +1,84 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Recipe
+from core.seeding import seed_user_dataset
+from recipe.filters import MATCH_ALL, MATCH_ANY, related_exists
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the recipe tag filters on seeded data"""
+
+    help = 'Compare JOIN and EXISTS recipe tag filters on a seeded dataset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=200000)
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--tags-per-recipe', type=int, default=5)
+        parser.add_argument('--filter-tags', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--keep', action='store_true',
+            help='Commit the seeded data instead of rolling it back'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                'benchmark-filters@example.com'
+            )
+            self.stdout.write('seeding...')
+            links, _ = seed_user_dataset(
+                user,
+                recipes=options['recipes'],
+                tags=options['tags'],
+                ingredients=0,
+                tags_per_recipe=options['tags_per_recipe'],
+                ingredients_per_recipe=0,
+            )
+            self.stdout.write(f'{links} recipe-tag rows')
+
+            tag_ids = list(
+                user.tag_set.order_by('id')
+                .values_list('id', flat=True)[:options['filter_tags']]
+            )
+            self.run_cases(user, tag_ids, options['repeat'])
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+    def run_cases(self, user, tag_ids, repeat):
+        through = Recipe.tags.through
+        recipes = Recipe.objects.filter(user=user)
+        cases = {
+            'join': recipes.filter(tags__id__in=tag_ids),
+            'join + distinct': recipes.filter(tags__id__in=tag_ids).distinct(),
+            'exists any': recipes.filter(
+                related_exists(through, 'tag_id', tag_ids, MATCH_ANY)
+            ),
+            'exists all': recipes.filter(
+                related_exists(through, 'tag_id', tag_ids, MATCH_ALL)
+            ),
+        }
+        for name, queryset in cases.items():
+            ids = queryset.values_list('id', flat=True)
+            rows = len(list(ids))
+            full = self.time(lambda: list(ids), repeat)
+            page = self.time(lambda: list(ids.order_by('-id')[:25]), repeat)
+            self.stdout.write(
+                f'{name:<16} rows={rows:<8} '
+                f'full={full:8.1f}ms first page={page:8.1f}ms'
+            )
+
+    def time(self, func, repeat):
+        """Median wall time of func in milliseconds"""
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
@@ -0,0 +1,29 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from recipe.similarity import rebuild_similarities
+
+
+class Command(BaseCommand):
+    """Django command to build the similar recipes index from scratch"""
+
+    help = ('Recompute every recipe\'s most similar recipes, for all users '
+            'or the given ones; changes keep the index up to date after')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', default=[], dest='emails',
+            help='Email of a user to rebuild (repeatable)'
+        )
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.order_by('id')
+        if options['emails']:
+            users = users.filter(email__in=options['emails'])
+        for user_id, email in users.values_list('id', 'email'):
+            start = time.perf_counter()
+            rebuild_similarities(user_id)
+            elapsed = (time.perf_counter() - start) * 1000
+            self.stdout.write(f'{email}: {elapsed:.1f}ms')
@@ -0,0 +1,125 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.seeding import seed_dataset, seed_users
+
+SEQ_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+class Command(BaseCommand):
+    """Django command to check the recipe API's queries use indexes"""
+
+    help = ('EXPLAIN ANALYZE the SQL of each recipe endpoint on seeded data '
+            'and fail if a sequential scan appears')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--tags', type=int, default=100)
+        parser.add_argument('--ingredients', type=int, default=300)
+        parser.add_argument(
+            '--allow-table', action='append', default=[],
+            help='Table whose sequential scans are accepted (repeatable)'
+        )
+        parser.add_argument(
+            '--keep', action='store_true',
+            help='Commit the seeded data instead of rolling it back'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('EXPLAIN ANALYZE plans need PostgreSQL')
+
+        with transaction.atomic():
+            self.stdout.write('seeding...')
+            users = seed_users(options['users'], None, prefix='explain')
+            seed_dataset(
+                users,
+                recipes=options['recipes'],
+                tags=options['tags'],
+                ingredients=options['ingredients'],
+            )
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+            scans = self.check_endpoints(users[0], set(options['allow_table']))
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+        if scans:
+            raise CommandError(f'{scans} queries use sequential scans')
+        self.stdout.write(self.style.SUCCESS('No sequential scans'))
+
+    def endpoints(self, user):
+        tags = ','.join(
+            str(pk) for pk in user.tag_set.values_list('id', flat=True)[:3]
+        )
+        ingredients = ','.join(
+            str(pk)
+            for pk in user.ingredient_set.values_list('id', flat=True)[:3]
+        )
+        recipe = Recipe.objects.filter(user=user).order_by('-id').first()
+        recipes_url = reverse('recipe:recipe-list')
+        tags_url = reverse('recipe:tag-list')
+        ingredients_url = reverse('recipe:ingredient-list')
+        return [
+            ('recipe list', recipes_url, {}),
+            ('recipes with any tag', recipes_url, {'tags': tags}),
+            ('recipes with all tags', recipes_url,
+             {'tags': tags, 'tags_mode': 'all'}),
+            ('recipes with ingredients', recipes_url,
+             {'ingredients': ingredients}),
+            ('recipe search', recipes_url, {'search': 'recipe 1'}),
+            ('quick recipes by time', recipes_url,
+             {'time_minutes_max': 30, 'ordering': 'time_minutes'}),
+            ('recipes by price', recipes_url,
+             {'price_min': 5, 'price_max': 20, 'ordering': '-price'}),
+            ('recipe detail',
+             reverse('recipe:recipe-detail', args=[recipe.id]), {}),
+            ('tag list', tags_url, {}),
+            ('assigned tags', tags_url, {'assigned_only': 1}),
+            ('tag recipe counts', tags_url, {'recipe_count': 1}),
+            ('ingredient list', ingredients_url, {}),
+            ('assigned ingredients', ingredients_url, {'assigned_only': 1}),
+            ('sync', reverse('recipe:sync'), {'cursor': 0}),
+        ]
+
+    def check_endpoints(self, user, allowed):
+        """Explain every SELECT the endpoints run; count the scanning ones"""
+        client = APIClient(HTTP_HOST='localhost')
+        client.force_authenticate(user=user)
+        failures = 0
+        for label, url, params in self.endpoints(user):
+            with CaptureQueriesContext(connection) as queries:
+                res = client.get(url, params)
+            if res.status_code != 200:
+                raise CommandError(f'{label}: HTTP {res.status_code}')
+
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                plan = self.explain(sql)
+                tables = set(SEQ_SCAN.findall(plan)) - allowed
+                if tables:
+                    failures += 1
+                    names = ', '.join(sorted(tables))
+                    self.stdout.write(self.style.ERROR(
+                        f'{label}: sequential scan on {names}'
+                    ))
+                    self.stdout.write(f'{sql}\n{plan}\n')
+                else:
+                    self.stdout.write(f'{label}: ok')
+        return failures
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN ANALYZE ' + sql)
+            return '\n'.join(row[0] for row in cursor.fetchall())
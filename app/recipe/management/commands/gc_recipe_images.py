@@ -0,0 +1,75 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe, RecipeImageVariant
+from core.storage import content_storage
+from recipe.uploads import UPLOAD_DIR
+
+
+class Command(BaseCommand):
+    """Django command to delete recipe images nothing refers to any more"""
+
+    help = 'Delete stored recipe images no recipe or variant refers to'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='Only delete files not modified for this many seconds, '
+                 'leaving uploads that are still in flight alone'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        min_age, dry_run = options['min_age'], options['dry_run']
+        removed = freed = 0
+        batch = []
+        for name in self.stored_files():
+            batch.append(name)
+            if len(batch) >= options['batch_size']:
+                count, size = self.collect(batch, min_age, dry_run)
+                removed, freed, batch = removed + count, freed + size, []
+        count, size = self.collect(batch, min_age, dry_run)
+        removed, freed = removed + count, freed + size
+
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {removed} orphaned files ({freed} bytes)'
+        ))
+
+    def stored_files(self):
+        """Storage names of every file under the recipe upload directory"""
+        root = content_storage.path('')
+        for directory, _, files in os.walk(content_storage.path(UPLOAD_DIR)):
+            for filename in files:
+                if filename.startswith('.release-'):
+                    # Being released by content_storage.release
+                    continue
+                path = os.path.join(directory, filename)
+                yield os.path.relpath(path, root).replace(os.sep, '/')
+
+    def collect(self, names, min_age, dry_run):
+        referenced = set(
+            Recipe.objects.filter(image__in=names)
+            .values_list('image', flat=True)
+        )
+        referenced.update(
+            RecipeImageVariant.objects.filter(image__in=names)
+            .values_list('image', flat=True)
+        )
+        cutoff = time.time() - min_age
+        removed = freed = 0
+        for name in names:
+            path = content_storage.path(name)
+            try:
+                stat_result = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if name in referenced or stat_result.st_mtime > cutoff:
+                continue
+            if dry_run or content_storage.release(name, min_age):
+                removed += 1
+                freed += stat_result.st_size
+        return removed, freed
@@ -0,0 +1,112 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset pagination over the newest recipes first"""
+    ordering = '-id'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class RecipeAttrCursorPagination(RecipeCursorPagination):
+    """Keyset pagination for tags and ingredients, sorted by name"""
+    ordering = ('-name', 'id')
+
+
+class RecipeKeysetPagination(RecipeCursorPagination):
+    """Keyset pagination over the view's ordering of recipes
+
+    DRF's cursor keeps only the first sort key and skips rows sharing it
+    with an offset, which grows with every page of, say, 30 minute recipes.
+    Here the cursor holds every sort key of the row it stops at (the
+    ordering ends with the id, so they are unique) and the next page starts
+    with a row comparison on all of them, as cheap at any depth as the
+    first page.
+    """
+    separator = '|'
+
+    def get_ordering(self, request, queryset, view):
+        return tuple(view.get_ordering())
+
+    def _get_position_from_instance(self, instance, ordering):
+        return self.separator.join(
+            str(getattr(instance, order.lstrip('-'))) for order in ordering
+        )
+
+    def after(self, position, reverse):
+        """Rows following position in the ordering, or preceding it"""
+        values = position.split(self.separator)
+        if len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        after, equal = Q(), {}
+        for order, value in zip(self.ordering, values):
+            attr = order.lstrip('-')
+            lookup = 'lt' if order.startswith('-') != reverse else 'gt'
+            after |= Q(**equal, **{f'{attr}__{lookup}': value})
+            equal[attr] = value
+        if len(values) > 1:
+            # A plain bound on the leading key for the index range scan
+            first = self.ordering[0]
+            lookup = 'lte' if first.startswith('-') != reverse else 'gte'
+            after &= Q(**{f'{first.lstrip("-")}__{lookup}': values[0]})
+        return after
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, position = False, None
+        else:
+            reverse, position = self.cursor.reverse, self.cursor.position
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [
+                order[1:] if order.startswith('-') else f'-{order}'
+                for order in ordering
+            ]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.after(position, reverse))
+            except (DjangoValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # Positions are unique, so no cursor needs an offset
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following = None
+        if len(results) > len(self.page):
+            following = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.next_position = position
+            self.has_previous = following is not None
+            self.previous_position = following
+        else:
+            self.has_next = following is not None
+            self.next_position = following
+            self.has_previous = position is not None
+            self.previous_position = position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+
+class RecipeSearchPagination(PageNumberPagination):
+    """Numbered pages of search results, best match first"""
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,197 @@
+import re
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.lookups import PostgresSimpleLookup
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector
+)
+from django.db import connection
+from django.db.models import (
+    Case, F, FloatField, Func, OuterRef, Q, Subquery, TextField, Value, When
+)
+from django.db.models.functions import Coalesce, Concat
+
+from core.models import Ingredient, Recipe, Tag
+
+# Text search configuration of Recipe.search_vector; the migration building
+# the column uses the same one
+SEARCH_CONFIG = 'english'
+MAX_SEARCH_LENGTH = 200
+
+
+@TextField.register_lookup
+class TrigramWordSimilar(PostgresSimpleLookup):
+    """``text %> query``: the query is word-similar to part of the text"""
+    lookup_name = 'trigram_word_similar'
+    operator = '%%>'
+
+
+class WordSimilarity(Func):
+    function = 'WORD_SIMILARITY'
+    output_field = FloatField()
+
+
+def _names(model):
+    """Space separated names of a recipe's tags or ingredients"""
+    names = model.objects.filter(recipe=OuterRef('pk')).order_by() \
+        .values('recipe').annotate(names=StringAgg('name', ' ')) \
+        .values('names')
+    return Coalesce(Subquery(names, output_field=TextField()), Value(''))
+
+
+class PostgresSearchBackend:
+    """Full-text and trigram search over columns kept in the database
+
+    ``search_vector`` weighs the title above tag and ingredient names and
+    is matched with plainto_tsquery; ``search_text`` holds the same words
+    for pg_trgm, so misspelt words still match when every word of the
+    query is similar to one of the recipe's.  Both are GIN indexed.
+    """
+    BATCH_SIZE = 1000
+
+    def search(self, queryset, text):
+        terms = words(text)
+        if not terms:
+            return queryset.none()
+        query = SearchQuery(text, config=SEARCH_CONFIG)
+        similar = Q()
+        for term in terms:
+            similar &= Q(search_text__trigram_word_similar=term)
+        return queryset.filter(Q(search_vector=query) | similar).annotate(
+            search_rank=SearchRank(F('search_vector'), query) +
+            WordSimilarity(Value(text), F('search_text'))
+        ).order_by('-search_rank', '-id')
+
+    def refresh(self, recipe_ids):
+        """Rebuild the search columns of the recipes, a batch per statement"""
+        names = Concat(
+            _names(Tag), Value(' '), _names(Ingredient),
+            output_field=TextField()
+        )
+        recipe_ids = list(recipe_ids)
+        for start in range(0, len(recipe_ids), self.BATCH_SIZE):
+            batch = recipe_ids[start:start + self.BATCH_SIZE]
+            Recipe.objects.filter(pk__in=batch).update(
+                search_text=Concat(
+                    'title', Value(' '), names, output_field=TextField()
+                ),
+                search_vector=(
+                    SearchVector('title', weight='A', config=SEARCH_CONFIG) +
+                    SearchVector(names, weight='B', config=SEARCH_CONFIG)
+                ),
+            )
+
+
+WORD = re.compile(r'\w+')
+TITLE_WEIGHT = 1.0
+NAMES_WEIGHT = 0.4
+# pg_trgm.word_similarity_threshold's default
+WORD_SIMILARITY_THRESHOLD = 0.6
+
+
+def words(text):
+    return WORD.findall(text.lower())
+
+
+def trigrams(word):
+    """The word's trigrams in order, padded as pg_trgm pads them"""
+    padded = f'  {word} '
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def word_similarity(term, word):
+    """pg_trgm's word_similarity(term, word)
+
+    The best, over every run of the word's consecutive trigrams, of the
+    trigrams shared with the term over those in either.
+    """
+    term_trigrams = set(trigrams(term))
+    word_trigrams = trigrams(word)
+    best = 0
+    for start, first in enumerate(word_trigrams):
+        if first not in term_trigrams:
+            continue
+        extent = set()
+        for trigram in word_trigrams[start:]:
+            extent.add(trigram)
+            shared = len(extent & term_trigrams)
+            best = max(best, shared / (
+                len(term_trigrams) + len(extent) - shared
+            ))
+    return best
+
+
+class InMemorySearchBackend:
+    """Rank recipes in Python, for databases without tsvector or pg_trgm
+
+    An index of the candidate recipes' words is built per search.  It
+    follows the PostgreSQL backend: a recipe matches when it contains every
+    word of the query, or when each of the query's words is similar enough
+    to one of its own, and title words weigh more than tag and ingredient
+    names.
+    """
+
+    def documents(self, queryset):
+        """{recipe id: [(set of words, weight)]} for the recipes"""
+        documents = {
+            pk: [(set(words(title)), TITLE_WEIGHT)]
+            for pk, title in queryset.order_by().values_list('id', 'title')
+        }
+        for relation in ('tags', 'ingredients'):
+            field = Recipe._meta.get_field(relation)
+            target = field.m2m_reverse_field_name()
+            links = field.remote_field.through.objects.filter(
+                recipe__in=queryset.order_by().values('id')
+            ).values_list('recipe_id', f'{target}__name')
+            for recipe_id, name in links:
+                documents[recipe_id].append((set(words(name)), NAMES_WEIGHT))
+        return documents
+
+    def score(self, terms, document):
+        """Rank of a document for the query terms, None if it does not match
+        """
+        matched = similar = True
+        rank = similarity = 0
+        for term in terms:
+            weights = [weight for found, weight in document if term in found]
+            matched = matched and bool(weights)
+            rank += max(weights, default=0)
+            best = max((
+                word_similarity(term, word)
+                for found, _ in document for word in found
+            ), default=0)
+            similar = similar and best >= WORD_SIMILARITY_THRESHOLD
+            similarity += best
+        if not matched and not similar:
+            return None
+        return (rank + similarity) / len(terms)
+
+    def search(self, queryset, text):
+        terms = words(text)
+        if not terms:
+            return queryset.none()
+        ranks = {}
+        for pk, document in self.documents(queryset).items():
+            rank = self.score(terms, document)
+            if rank is not None:
+                ranks[pk] = rank
+        if not ranks:
+            return queryset.none()
+        return queryset.filter(pk__in=ranks).annotate(search_rank=Case(
+            *[When(pk=pk, then=Value(rank)) for pk, rank in ranks.items()],
+            output_field=FloatField()
+        )).order_by('-search_rank', '-id')
+
+    def refresh(self, recipe_ids):
+        pass
+
+
+def get_search_backend():
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return InMemorySearchBackend()
+
+
+def search_recipes(queryset, text):
+    """The recipes of queryset matching text, best match first"""
+    return get_search_backend().search(queryset, text)
@@ -1,45 +1,140 @@
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
+from core.metrics import TimedSerializerMixin
 from core.models import Tag, Ingredient, Recipe
+from recipe.fields import UserPrimaryKeyRelatedField, save_named_objects
+from recipe.images import validate_image_header
+
+
+class UniqueNameMixin:
+    """Refuse a name the requesting user already uses for this model"""
+    duplicate_name_message = 'You already use this name.'
+
+    def validate_name(self, value):
+        # Bulk requests check the names of the whole batch at once
+        if self.context.get('bulk'):
+            return value
+        request = self.context.get('request')
+        queryset = self.Meta.model.objects.filter(
+            user=request.user, name=value
+        )
+        if self.instance is not None:
+            queryset = queryset.exclude(pk=self.instance.pk)
+        if queryset.exists():
+            raise serializers.ValidationError(self.duplicate_name_message)
+        return value
+
+    def create(self, validated_data):
+        return self._save_unique_name(super().create, validated_data)
+
+    def update(self, instance, validated_data):
+        return self._save_unique_name(
+            super().update, instance, validated_data
+        )
+
+    def _save_unique_name(self, save, *args):
+        # Concurrent requests can both pass validate_name; the (user, name)
+        # constraint then rejects all but the first
+        try:
+            with transaction.atomic():
+                return save(*args)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {'name': [self.duplicate_name_message]}
+            )
+
+class TagSerializer(TimedSerializerMixin, UniqueNameMixin,
+                    serializers.ModelSerializer):
+    # Only rendered when the queryset is annotated (?recipe_count=1)
+    recipe_count = serializers.IntegerField(read_only=True)
 
-class TagSerializer(serializers.ModelSerializer):
-    
     class Meta:
         model = Tag
-        fields = ('id', 'name')
+        fields = ('id', 'name', 'recipe_count')
         read_only_fields = ('id',)
 
-class IngredientSerializer(serializers.ModelSerializer):
-    
+class IngredientSerializer(TimedSerializerMixin, UniqueNameMixin,
+                           serializers.ModelSerializer):
+    # Only rendered when the queryset is annotated (?recipe_count=1)
+    recipe_count = serializers.IntegerField(read_only=True)
+
     class Meta:
         model = Ingredient
-        fields = ('id', 'name')
+        fields = ('id', 'name', 'recipe_count')
         read_only_fields = ('id',)
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     
-    ingredients = serializers.PrimaryKeyRelatedField(
+    # Items are ids or {"name": ...}; unknown names are created
+    ingredients = UserPrimaryKeyRelatedField(
         many=True,
-        queryset=Ingredient.objects.all()
+        queryset=Ingredient.objects.all(),
+        create_by_name=True
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
         many=True,
-        queryset=Tag.objects.all()
+        queryset=Tag.objects.all(),
+        create_by_name=True
     )
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'title', 'ingredients', 'tags', 'time_minutes',
-                    'price', 'link')
+                    'price', 'link', 'image_variants')
 
         read_only_fields = ('id',)
 
+    def create(self, validated_data):
+        self.save_named_related(validated_data)
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        self.save_named_related(validated_data)
+        return super().update(instance, validated_data)
+
+    def save_named_related(self, validated_data):
+        for name in ('tags', 'ingredients'):
+            if name in validated_data:
+                validated_data[name] = save_named_objects(
+                    validated_data[name]
+                )
+
+    def get_image_variants(self, obj):
+        """URLs of the processed image variants, keyed by variant name"""
+        request = self.context.get('request')
+        urls = {}
+        for variant in obj.image_variants.all():
+            url = variant.image.url
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[variant.name] = url
+        return urls
+
+
+class RecipeBulkSerializer(RecipeSerializer):
+    """Recipe items of a bulk request; related ids are resolved per batch"""
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False
+    )
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False
+    )
+
 class RecipeDetailSerializer(RecipeSerializer):
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+class RecipeImageSerializer(TimedSerializerMixin,
+                            serializers.ModelSerializer):
+    image = serializers.FileField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'image')
-        read_only_fields = ('id',)
\ No newline at end of file
+        read_only_fields = ('id',)
+
+    def validate_image(self, value):
+        return validate_image_header(value)
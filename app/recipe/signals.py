@@ -0,0 +1,116 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete
+)
+from django.dispatch import receiver
+
+from core.models import (
+    ChangeLogEntry, Ingredient, Recipe, Tag, changes_recorded
+)
+from core.tasks import run_in_background
+from recipe.autocomplete import forget_user
+from recipe.caching import invalidate_user_responses
+from recipe.conditional import log_changes, touch, touch_linked
+from recipe.images import release_image_files_on_commit
+from recipe.search import get_search_backend
+from recipe.similarity import refresh_similarities
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """Free the recipe's image files once the deletion is committed"""
+    names = list(instance.image_variants.values_list('image', flat=True))
+    names.append(instance.image.name)
+    release_image_files_on_commit(names)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def owned_object_changed(sender, instance, **kwargs):
+    invalidate_user_responses(instance.user_id)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def log_saved(sender, instance, **kwargs):
+    log_changes(sender, [(instance.pk, instance.user_id)])
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def log_deleted(sender, instance, **kwargs):
+    """Leave a tombstone for clients to sync the deletion from"""
+    log_changes(sender, [(instance.pk, instance.user_id)], deleted=True)
+
+
+@receiver(changes_recorded, sender=ChangeLogEntry)
+def recipes_changed(sender, kind, object_ids, deleted, **kwargs):
+    """Reindex the title, tag and ingredient names of changed recipes"""
+    if kind == ChangeLogEntry.RECIPE and not deleted:
+        get_search_backend().refresh(object_ids)
+
+
+@receiver(changes_recorded, sender=ChangeLogEntry)
+def similar_recipes_changed(sender, user_id, kind, object_ids, **kwargs):
+    """Refresh the similar recipes index once the changes are committed"""
+    if kind == ChangeLogEntry.RECIPE:
+        run_in_background(refresh_similarities, user_id, object_ids)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def recipe_attr_saved(sender, instance, created, **kwargs):
+    """Recipes render the names of their tags and ingredients"""
+    if not created:
+        touch_linked(sender, [instance.pk])
+
+
+@receiver(pre_delete, sender=Recipe)
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def linked_object_deleted(sender, instance, **kwargs):
+    """Touch the other side before the cascade drops the links"""
+    touch_linked(sender, [instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_links_changed(sender, instance, action, model, pk_set, **kwargs):
+    column = f'{type(instance)._meta.model_name}_id'
+    other = f'{model._meta.model_name}_id'
+    if action == 'pre_clear':
+        # post_clear is sent without the ids that were unlinked
+        instance.__dict__.setdefault('_cleared_links', {})[sender] = set(
+            sender.objects.filter(**{column: instance.pk})
+            .values_list(other, flat=True)
+        )
+        return
+    if action == 'post_clear':
+        pk_set = instance.__dict__.get('_cleared_links', {}).pop(sender, ())
+    if not action.startswith('post_') or not pk_set:
+        return
+
+    touch(type(instance).objects.filter(pk=instance.pk))
+    touch(model.objects.filter(pk__in=pk_set))
+    invalidate_user_responses(instance.user_id)
+
+
+@receiver(post_save, sender=get_user_model())
+def user_created(sender, instance, created, **kwargs):
+    """Start new users on a fresh version, in case their id is reused"""
+    if created:
+        invalidate_user_responses(instance.pk)
+        forget_user(instance.pk)
+
+
+@receiver(post_delete, sender=get_user_model())
+def user_deleted(sender, instance, **kwargs):
+    """Drop the change log, including tombstones of the cascade"""
+    ChangeLogEntry.objects.filter(user_id=instance.pk).delete()
+    forget_user(instance.pk)
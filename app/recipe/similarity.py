@@ -0,0 +1,218 @@
+import numpy as np
+from django.db import connections, transaction
+from django.db.models import Count, Min
+from scipy import sparse
+
+from core.models import Recipe, RecipeSimilarity
+
+# Similar recipes kept per recipe
+TOP_K = 20
+# Rows multiplied at once; bounds the memory of a block of scores
+BLOCK_SIZE = 500
+BATCH_SIZE = 1000
+# Changed recipes refreshed one by one; more and the index is rebuilt
+MAX_INCREMENTAL = 200
+# First key of the PostgreSQL advisory locks serializing a user's refreshes
+LOCK_CLASS = 0x5e1f
+
+
+def _batches(values, size=BATCH_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class SimilarityMatrix:
+    """A user's recipes by their tags and ingredients, as a sparse matrix
+
+    Each row is a recipe and each column a tag or an ingredient, so the
+    product of rows with the transpose counts what recipes share, and the
+    Jaccard similarity of two recipes is that count over the size of the
+    union of their sets.
+    """
+
+    def __init__(self, user_id):
+        self.recipe_ids = np.array(
+            Recipe.objects.filter(user_id=user_id).order_by('id')
+            .values_list('id', flat=True),
+            dtype=np.int64
+        )
+        rows, columns, width = [], [], 0
+        for relation in ('tags', 'ingredients'):
+            field = Recipe._meta.get_field(relation)
+            links = np.array(
+                field.remote_field.through.objects
+                .filter(recipe__user_id=user_id)
+                .values_list('recipe_id', field.m2m_reverse_name()),
+                dtype=np.int64
+            ).reshape(-1, 2)
+            # Recipes created since their ids were read are left out
+            links = links[np.isin(links[:, 0], self.recipe_ids)]
+            targets, target_columns = np.unique(
+                links[:, 1], return_inverse=True
+            )
+            rows.append(np.searchsorted(self.recipe_ids, links[:, 0]))
+            columns.append(target_columns.ravel() + width)
+            width += len(targets)
+        rows, columns = np.concatenate(rows), np.concatenate(columns)
+        self.matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float64), (rows, columns)),
+            shape=(len(self.recipe_ids), width)
+        )
+        self.sizes = np.diff(self.matrix.indptr)
+
+    def rows(self, recipe_ids):
+        """Row numbers of the recipes that still exist"""
+        recipe_ids = np.array(sorted(set(recipe_ids)), dtype=np.int64)
+        recipe_ids = recipe_ids[np.isin(recipe_ids, self.recipe_ids)]
+        return np.searchsorted(self.recipe_ids, recipe_ids)
+
+    def scores(self, rows):
+        """Sparse Jaccard similarities of the rows to every recipe
+
+        Only recipes sharing a tag or an ingredient with a row are stored,
+        and a recipe is never similar to itself.
+        """
+        scores = (self.matrix[rows] @ self.matrix.T).tocsr()
+        owners = np.repeat(rows, np.diff(scores.indptr))
+        shared = scores.data
+        scores.data = shared / (
+            self.sizes[owners] + self.sizes[scores.indices] - shared
+        )
+        scores.data[scores.indices == owners] = 0
+        scores.eliminate_zeros()
+        return scores
+
+    def top(self, rows):
+        """{recipe id: [(similar id, score)]} of the TOP_K best per row
+
+        Equal scores are ordered newest first.
+        """
+        best = {}
+        for start in range(0, len(rows), BLOCK_SIZE):
+            block = rows[start:start + BLOCK_SIZE]
+            scores = self.scores(block)
+            for i, row in enumerate(block):
+                begin, end = scores.indptr[i], scores.indptr[i + 1]
+                data = scores.data[begin:end]
+                similar = self.recipe_ids[scores.indices[begin:end]]
+                if len(data) > TOP_K:
+                    keep = data >= np.partition(data, -TOP_K)[-TOP_K]
+                    data, similar = data[keep], similar[keep]
+                order = np.lexsort((-similar, -data))[:TOP_K]
+                best[int(self.recipe_ids[row])] = [
+                    (int(similar[j]), float(data[j])) for j in order
+                ]
+        return best
+
+
+def _floors(recipe_ids):
+    """{recipe id: (lowest kept score, number kept)} of the recipes"""
+    floors = {}
+    for batch in _batches(recipe_ids):
+        floors.update(
+            (row['recipe_id'], (row['floor'], row['kept']))
+            for row in RecipeSimilarity.objects.filter(recipe_id__in=batch)
+            .values('recipe_id').annotate(floor=Min('score'), kept=Count('*'))
+            .order_by()
+        )
+    return floors
+
+
+def _store(best):
+    """Replace the kept similar recipes of every recipe in best"""
+    for batch in _batches(best):
+        RecipeSimilarity.objects.filter(recipe_id__in=batch).delete()
+    rows = [
+        RecipeSimilarity(recipe_id=recipe_id, similar_id=similar, score=score)
+        for recipe_id, similar_recipes in best.items()
+        for similar, score in similar_recipes
+    ]
+    if not rows:
+        # PostgreSQL's bulk_batch_size of no rows is 0, which bulk_create
+        # refuses
+        return
+    ops = connections[RecipeSimilarity.objects.db].ops
+    RecipeSimilarity.objects.bulk_create(rows, batch_size=min(
+        BATCH_SIZE, ops.bulk_batch_size(RecipeSimilarity._meta.fields, rows)
+    ))
+
+
+def _lock_user(user_id):
+    """Let one refresh of a user's index run at a time
+
+    An advisory lock held until the transaction ends, not the user row,
+    which every write updates to allocate its change log sequence. SQLite
+    serializes writers by itself.
+    """
+    connection = connections[RecipeSimilarity.objects.db]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_advisory_xact_lock(%s, %s)', [LOCK_CLASS, user_id]
+            )
+
+
+def _rebuild(matrix, user_id):
+    RecipeSimilarity.objects.filter(recipe__user_id=user_id).delete()
+    _store(matrix.top(np.arange(len(matrix.recipe_ids))))
+
+
+def rebuild_similarities(user_id):
+    """Recompute the similar recipes of every one of the user's recipes"""
+    with transaction.atomic():
+        _lock_user(user_id)
+        _rebuild(SimilarityMatrix(user_id), user_id)
+
+
+def refresh_similarities(user_id, recipe_ids):
+    """Bring the index up to date after the recipes changed or went away
+
+    The changed recipes get new lists. Another recipe's list changes only
+    if it holds a changed recipe, whose score may have moved, or if a
+    changed recipe now scores at least the lowest score it keeps, as equal
+    scores are ordered newest first; only those lists are recomputed, from
+    one sparse product of the changed rows.
+    Past MAX_INCREMENTAL changed recipes the whole index is rebuilt.
+    """
+    recipe_ids = set(recipe_ids)
+    with transaction.atomic():
+        _lock_user(user_id)
+        matrix = SimilarityMatrix(user_id)
+        rows = matrix.rows(recipe_ids)
+        if len(rows) > MAX_INCREMENTAL:
+            _rebuild(matrix, user_id)
+            return
+
+        scores = matrix.scores(rows)
+        changed = {int(recipe_id): i for i, recipe_id in enumerate(
+            matrix.recipe_ids[rows]
+        )}
+        affected = set(changed)
+        for batch in _batches(recipe_ids):
+            for recipe_id, similar, score in RecipeSimilarity.objects.filter(
+                similar_id__in=batch
+            ).values_list('recipe_id', 'similar_id', 'score'):
+                current = 0
+                if similar in changed:
+                    current = scores[
+                        changed[similar], matrix.rows([recipe_id])[0]
+                    ]
+                if current != score:
+                    affected.add(recipe_id)
+
+        best = np.zeros(len(matrix.recipe_ids))
+        if len(rows):
+            best = scores.max(axis=0).toarray().ravel()
+        candidates = {
+            int(recipe_id): score for recipe_id, score in
+            zip(matrix.recipe_ids[best > 0], best[best > 0])
+            if recipe_id not in affected
+        }
+        floors = _floors(candidates)
+        affected.update(
+            recipe_id for recipe_id, score in candidates.items()
+            if recipe_id not in floors or floors[recipe_id][1] < TOP_K or
+            score >= floors[recipe_id][0]
+        )
+        _store(matrix.top(matrix.rows(affected)))
@@ -0,0 +1,119 @@
+import time
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.autocomplete import PrefixIndex
+
+TAGS_AUTOCOMPLETE_URL = reverse('recipe:tag-autocomplete')
+INGREDIENTS_AUTOCOMPLETE_URL = reverse('recipe:ingredient-autocomplete')
+
+
+class AutocompleteApiTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'autocomplete@luis.com',
+            'testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.recipes = [
+            Recipe.objects.create(
+                user=self.user, title=f'Recipe {i}', time_minutes=10,
+                price=5.00
+            )
+            for i in range(3)
+        ]
+
+    def ingredient(self, name, used_by=0):
+        ingredient = Ingredient.objects.create(user=self.user, name=name)
+        for recipe in self.recipes[:used_by]:
+            recipe.ingredients.add(ingredient)
+        return ingredient
+
+    def complete(self, prefix, url=INGREDIENTS_AUTOCOMPLETE_URL, **params):
+        res = self.client.get(url, {'prefix': prefix, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in res.data]
+
+    def test_prefix_of_any_word_most_used_first(self):
+        self.ingredient('Olive oil', used_by=1)
+        self.ingredient('Oregano', used_by=3)
+        self.ingredient('Onion')
+        self.ingredient('Garlic', used_by=2)
+
+        self.assertEqual(
+            self.complete('o'), ['Oregano', 'Olive oil', 'Onion']
+        )
+        self.assertEqual(self.complete('OIL'), ['Olive oil'])
+        self.assertEqual(self.complete('olive o'), ['Olive oil'])
+        self.assertEqual(self.complete('', limit=1), ['Oregano'])
+
+    def test_usage_counts_returned(self):
+        garlic = self.ingredient('Garlic', used_by=2)
+
+        res = self.client.get(INGREDIENTS_AUTOCOMPLETE_URL, {'prefix': 'g'})
+
+        self.assertEqual(res.data, [
+            {'id': garlic.id, 'name': 'Garlic', 'recipe_count': 2}
+        ])
+
+    def test_writes_rebuild_the_index(self):
+        onion = self.ingredient('Onion')
+        self.ingredient('Oregano', used_by=1)
+        self.assertEqual(self.complete('o'), ['Oregano', 'Onion'])
+
+        for recipe in self.recipes:
+            recipe.ingredients.add(onion)
+        self.ingredient('Okra')
+
+        self.assertEqual(self.complete('o'), ['Onion', 'Oregano', 'Okra'])
+
+    def test_cached_index_costs_one_lookup(self):
+        self.ingredient('Onion')
+        self.complete('o')
+
+        with self.assertNumQueries(1):
+            self.complete('on')
+
+    def test_scoped_to_user_and_kind(self):
+        other = get_user_model().objects.create_user(
+            'other@luis.com',
+            'testpass'
+        )
+        Tag.objects.create(user=other, name='Spicy')
+        Tag.objects.create(user=self.user, name='Sweet')
+        self.ingredient('Sugar')
+
+        self.assertEqual(self.complete('s', TAGS_AUTOCOMPLETE_URL), ['Sweet'])
+
+    def test_limit_validated(self):
+        res = self.client.get(
+            TAGS_AUTOCOMPLETE_URL, {'prefix': 'a', 'limit': 500}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PrefixIndexTests(TestCase):
+
+    def test_large_index_completes_quickly(self):
+        index = PrefixIndex([
+            (i, f'Ingredient {i} extra virgin', i % 97) for i in range(20000)
+        ])
+
+        began = time.perf_counter()
+        for prefix in ('i', 'ingredient 1', 'virg', ''):
+            matches = index.complete(prefix, 10)
+        elapsed = time.perf_counter() - began
+
+        self.assertEqual(len(matches), 10)
+        self.assertTrue(all(usage == 96 for _, _, usage in matches))
+        self.assertEqual(index.complete('ingredient 19999', 10)[0][0], 19999)
+        self.assertLess(elapsed, 0.5)
@@ -0,0 +1,198 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe, Tag, Ingredient
+
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+
+
+def recipe_payload(title, **params):
+    payload = {'title': title, 'time_minutes': 10, 'price': '5.00'}
+    payload.update(params)
+    return payload
+
+
+class RecipeBulkApiTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'bulk@luis.com',
+            'testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(3)
+        ]
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='Salt'
+        )
+
+    def post(self, items, url=RECIPES_BULK_URL):
+        return self.client.post(url, items, format='json')
+
+    def test_bulk_create_recipes(self):
+        """Test a batch of recipes is created with its related rows"""
+        tag_ids = [tag.id for tag in self.tags]
+        items = [
+            recipe_payload(
+                f'Recipe {i}',
+                tags=tag_ids,
+                ingredients=[self.ingredient.id]
+            )
+            for i in range(5)
+        ]
+
+        res = self.post(items)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['created']), 5)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 5)
+        for data in res.data['created']:
+            self.assertEqual(sorted(data['tags']), sorted(tag_ids))
+            self.assertEqual(data['ingredients'], [self.ingredient.id])
+
+    def test_bulk_create_related_lookups_batched(self):
+        """Test related ids are checked once per batch, not per item"""
+        items = [
+            recipe_payload(f'Recipe {i}', tags=[tag.id for tag in self.tags])
+            for i in range(20)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            self.post(items)
+        sql = [query['sql'] for query in queries.captured_queries]
+        tag_lookups = [
+            query for query in sql
+            if query.startswith('SELECT') and 'FROM "core_tag"' in query
+        ]
+        # One to validate the batch, one to render the response
+        self.assertEqual(len(tag_lookups), 2)
+        links = [
+            query for query in sql
+            if query.startswith('INSERT INTO "core_recipe_tags"')
+        ]
+        self.assertEqual(len(links), 1)
+
+    def test_bulk_create_reports_item_errors(self):
+        """Test invalid items are reported and valid ones still created"""
+        other_user = get_user_model().objects.create_user(
+            'other@luis.com', 'testpass'
+        )
+        foreign = Tag.objects.create(user=other_user, name='Foreign')
+        items = [
+            recipe_payload('Good'),
+            {'title': 'No time'},
+            recipe_payload('Foreign tag', tags=[foreign.id]),
+        ]
+
+        res = self.post(items)
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(len(res.data['created']), 1)
+        self.assertEqual(
+            [error['index'] for error in res.data['errors']], [1, 2]
+        )
+        self.assertEqual(res.data['errors'][1]['errors'], {
+            'tags': [f'Invalid pk "{foreign.id}" - objects do not exist.']
+        })
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_atomic_bulk_create_aborts_batch(self):
+        items = [recipe_payload('Good'), {'title': 'No time'}]
+
+        res = self.client.post(
+            RECIPES_BULK_URL + '?atomic=1', items, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['errors'][0]['index'], 1)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_requires_list(self):
+        res = self.post(recipe_payload('Single'))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update_recipes(self):
+        first = Recipe.objects.create(
+            user=self.user, title='First', time_minutes=5, price=1
+        )
+        first.tags.add(self.tags[0])
+        second = Recipe.objects.create(
+            user=self.user, title='Second', time_minutes=5, price=1
+        )
+        items = [
+            {'id': first.id, 'tags': [self.tags[1].id]},
+            {'id': second.id, 'title': 'Renamed'},
+            {'id': 0, 'title': 'Missing'},
+        ]
+
+        res = self.client.patch(RECIPES_BULK_URL, items, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(res.data['errors'], [{'index': 2, 'errors': {
+            'id': ['Invalid pk "0" - objects do not exist.']
+        }}])
+        self.assertEqual(
+            res.data['errors'][0]['errors']['id'][0].code, 'does_not_exist'
+        )
+        self.assertEqual(list(first.tags.all()), [self.tags[1]])
+        second.refresh_from_db()
+        self.assertEqual(second.title, 'Renamed')
+
+    def test_bulk_delete_only_own_recipes(self):
+        other_user = get_user_model().objects.create_user(
+            'other@luis.com', 'testpass'
+        )
+        mine = Recipe.objects.create(
+            user=self.user, title='Mine', time_minutes=5, price=1
+        )
+        theirs = Recipe.objects.create(
+            user=other_user, title='Theirs', time_minutes=5, price=1
+        )
+
+        res = self.client.delete(
+            RECIPES_BULK_URL, [mine.id, theirs.id], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(res.data['deleted'], [mine.id])
+        self.assertFalse(Recipe.objects.filter(id=mine.id).exists())
+        self.assertTrue(Recipe.objects.filter(id=theirs.id).exists())
+
+    def test_bulk_create_tags(self):
+        res = self.post(
+            [{'name': 'Breakfast'}, {'name': 'Dinner'}, {'name': ''}],
+            url=TAGS_BULK_URL
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            sorted(tag['name'] for tag in res.data['created']),
+            ['Breakfast', 'Dinner']
+        )
+        self.assertTrue(
+            Tag.objects.filter(user=self.user, name='Dinner').exists()
+        )
+
+    def test_bulk_create_tags_rejects_duplicate_names(self):
+        res = self.post(
+            [{'name': 'Tag 0'}, {'name': 'Lunch'}, {'name': 'Lunch'}],
+            url=TAGS_BULK_URL
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [error['index'] for error in res.data['errors']], [0, 2]
+        )
+        self.assertEqual(
+            Tag.objects.filter(user=self.user, name='Lunch').count(), 1
+        )
@@ -0,0 +1,146 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse('recipe:recipe-list')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        # Validators are checked against the database, not cached copies
+        no_cache = override_settings(RESPONSE_CACHE={'ENABLED': False})
+        no_cache.enable()
+        self.addCleanup(no_cache.disable)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'conditional@luis.com',
+            'testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Pie', time_minutes=10, price=5.00
+        )
+        self.tag = Tag.objects.create(user=self.user, name='Sweet')
+
+    def etag(self, url, params=None):
+        return self.client.get(url, params)['ETag']
+
+    def test_matching_etag_answered_with_aggregate_only(self):
+        res = self.client.get(RECIPES_URL)
+        self.assertTrue(res.has_header('Last-Modified'))
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+
+    def test_stale_etag_gets_full_response(self):
+        res = self.client.get(
+            detail_url(self.recipe.id), HTTP_IF_NONE_MATCH='"stale"'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Pie')
+
+    def test_missing_recipe_not_answered_with_304(self):
+        res = self.client.get(detail_url(0), HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_malformed_recipe_id_not_found(self):
+        """Test a non-numeric id is a 404, not a server error"""
+        res = self.client.get(detail_url('abc'))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_links_and_renames_change_recipe_etag(self):
+        url = detail_url(self.recipe.id)
+        etags = [self.etag(url)]
+
+        self.recipe.tags.add(self.tag)
+        etags.append(self.etag(url))
+        self.tag.name = 'Savoury'
+        self.tag.save()
+        etags.append(self.etag(url))
+        self.recipe.tags.clear()
+        etags.append(self.etag(url))
+
+        self.assertEqual(len(set(etags)), 4)
+
+    def test_usage_changes_tag_list_etag(self):
+        params = {'assigned_only': 1}
+        etag = self.etag(TAGS_URL, params)
+
+        self.recipe.tags.add(self.tag)
+        linked = self.etag(TAGS_URL, params)
+        self.assertNotEqual(linked, etag)
+
+        self.recipe.delete()
+        self.assertNotEqual(self.etag(TAGS_URL, params), linked)
+
+    def test_deletion_changes_list_etag(self):
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=10, price=5.00
+        )
+        etag = self.etag(RECIPES_URL)
+
+        self.recipe.delete()
+
+        self.assertNotEqual(self.etag(RECIPES_URL), etag)
+
+    def test_bulk_update_changes_etag(self):
+        url = detail_url(self.recipe.id)
+        etag = self.etag(url)
+
+        self.client.patch(RECIPES_BULK_URL, [
+            {'id': self.recipe.id, 'tags': [self.tag.id]}
+        ], format='json')
+
+        self.assertNotEqual(self.etag(url), etag)
+        self.tag.refresh_from_db()
+        self.assertGreater(self.tag.updated_at, self.recipe.updated_at)
+
+
+class CachedConditionalGetTests(TestCase):
+
+    def setUp(self):
+        cache = override_settings(RESPONSE_CACHE={
+            'ENABLED': True, 'ALLOW_PROCESS_LOCAL': True
+        })
+        cache.enable()
+        self.addCleanup(cache.disable)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'conditional@luis.com',
+            'testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+        Recipe.objects.create(
+            user=self.user, title='Pie', time_minutes=10, price=5.00
+        )
+
+    def test_cached_validators_answer_without_queries(self):
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+            fresh = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(fresh['ETag'], etag)
+        self.assertTrue(fresh.has_header('Last-Modified'))
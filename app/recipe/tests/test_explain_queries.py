@@ -0,0 +1,54 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from core.seeding import seed_user_dataset
+from recipe.management.commands.explain_queries import Command
+
+INDEX_PLAN = 'Index Scan using core_recipe_user_id_idx on core_recipe'
+SEQ_PLAN = 'Seq Scan on core_recipe_tags  (cost=0.00..1.10 rows=10)'
+
+
+@override_settings(ALLOWED_HOSTS=['localhost'])
+class ExplainQueriesTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'explain@luis.com',
+            'testpass'
+        )
+        seed_user_dataset(self.user, recipes=5, tags=4, ingredients=4)
+        self.out = StringIO()
+        self.command = Command(stdout=self.out)
+
+    def test_requires_postgres(self):
+        if connection.vendor == 'postgresql':
+            self.skipTest('runs against PostgreSQL')
+        with self.assertRaises(CommandError):
+            call_command('explain_queries', stdout=StringIO())
+
+    def test_every_endpoint_explained(self):
+        with patch.object(Command, 'explain', return_value=INDEX_PLAN):
+            scans = self.command.check_endpoints(self.user, set())
+
+        self.assertEqual(scans, 0)
+        self.assertEqual(len(self.command.endpoints(self.user)), 14)
+        self.assertNotIn('sequential scan', self.out.getvalue())
+
+    def test_sequential_scans_reported(self):
+        with patch.object(Command, 'explain', return_value=SEQ_PLAN):
+            scans = self.command.check_endpoints(self.user, set())
+            allowed = self.command.check_endpoints(
+                self.user, {'core_recipe_tags'}
+            )
+
+        self.assertGreater(scans, 0)
+        self.assertEqual(allowed, 0)
+        self.assertIn(
+            'sequential scan on core_recipe_tags', self.out.getvalue()
+        )
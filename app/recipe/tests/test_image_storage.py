@@ -0,0 +1,195 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe, RecipeImageVariant
+from core.storage import content_storage
+
+
+def image_bytes(color='orange'):
+    buffer = BytesIO()
+    Image.new('RGB', (400, 300), color).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+class ImageStorageMixin:
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media = override_settings(
+            MEDIA_ROOT=self.media_root, BACKGROUND_TASKS_EAGER=True
+        )
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'storage@luis.com',
+            'testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def create_recipe(self, title='Pie'):
+        return Recipe.objects.create(
+            user=self.user, title=title, time_minutes=10, price=5.00
+        )
+
+    def upload(self, recipe, content):
+        self.client.post(
+            reverse('recipe:recipe-upload-image', args=[recipe.id]),
+            {'image': SimpleUploadedFile('photo.JPG', content)},
+            format='multipart'
+        )
+        recipe.refresh_from_db()
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(directory, name), self.media_root)
+            for directory, _, names in os.walk(self.media_root)
+            for name in names
+        )
+
+
+class ContentAddressedStorageTests(ImageStorageMixin, TestCase):
+
+    def test_image_named_after_content(self):
+        content = image_bytes()
+        recipe = self.create_recipe()
+
+        self.upload(recipe, content)
+
+        digest = hashlib.sha256(content).hexdigest()
+        self.assertEqual(recipe.image.name, f'uploads/recipe/{digest}.jpg')
+        # SQLite does not enforce column lengths
+        max_length = RecipeImageVariant._meta.get_field('image').max_length
+        for name in recipe.image_variants.values_list('image', flat=True):
+            self.assertLessEqual(len(name), max_length)
+
+    def test_duplicate_upload_shares_files(self):
+        """Test the same photo on two recipes is stored and rendered once"""
+        content = image_bytes()
+        first, second = self.create_recipe(), self.create_recipe('Tart')
+        self.upload(first, content)
+        stored = self.stored_files()
+
+        with patch('recipe.images.render_variants') as render:
+            self.upload(second, content)
+
+        render.assert_not_called()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(self.stored_files(), stored)
+        self.assertEqual(
+            set(second.image_variants.values_list('image', flat=True)),
+            set(first.image_variants.values_list('image', flat=True)),
+        )
+
+    def test_gc_removes_only_orphans(self):
+        recipe = self.create_recipe()
+        self.upload(recipe, image_bytes())
+        orphan = content_storage.save(
+            'uploads/recipe/orphan.jpg', SimpleUploadedFile('x', b'x')
+        )
+        referenced = self.stored_files()
+        referenced.remove(orphan)
+
+        out = StringIO()
+        call_command('gc_recipe_images', min_age=0, stdout=out)
+
+        self.assertIn('Removed 1 orphaned files', out.getvalue())
+        self.assertEqual(self.stored_files(), referenced)
+
+    def test_gc_leaves_recent_files(self):
+        content_storage.save(
+            'uploads/recipe/orphan.jpg', SimpleUploadedFile('x', b'x')
+        )
+
+        call_command('gc_recipe_images', stdout=StringIO())
+
+        self.assertEqual(self.stored_files(), ['uploads/recipe/orphan.jpg'])
+
+    def test_duplicate_save_refreshes_mtime(self):
+        """Test reusing a stored file makes it recent again"""
+        name = content_storage.save(
+            'uploads/recipe/shared.jpg', SimpleUploadedFile('x', b'x')
+        )
+        path = content_storage.path(name)
+        os.utime(path, (0, 0))
+
+        content_storage.save(name, SimpleUploadedFile('x', b'x'))
+
+        self.assertGreater(os.path.getmtime(path), time.time() - 60)
+
+
+class ImageReleaseTests(ImageStorageMixin, TransactionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        grace = override_settings(RECIPE_IMAGE_RELEASE_GRACE=0)
+        grace.enable()
+        self.addCleanup(grace.disable)
+
+    def test_files_released_with_last_reference(self):
+        """Test shared files outlive all but the last recipe using them"""
+        content = image_bytes()
+        first, second = self.create_recipe(), self.create_recipe('Tart')
+        self.upload(first, content)
+        self.upload(second, content)
+        stored = self.stored_files()
+
+        first.delete()
+        self.assertEqual(self.stored_files(), stored)
+
+        second.delete()
+        self.assertEqual(self.stored_files(), [])
+        self.assertFalse(RecipeImageVariant.objects.exists())
+
+    def test_replaced_image_released(self):
+        recipe = self.create_recipe()
+        self.upload(recipe, image_bytes('orange'))
+        old_name = recipe.image.name
+
+        self.upload(recipe, image_bytes('blue'))
+
+        self.assertFalse(content_storage.exists(old_name))
+        self.assertEqual(len(self.stored_files()), 5)
+
+    @override_settings(RECIPE_IMAGE_RELEASE_GRACE=3600)
+    def test_recent_files_left_to_gc(self):
+        """Test a file another upload may have just reused is kept"""
+        recipe = self.create_recipe()
+        self.upload(recipe, image_bytes())
+        stored = self.stored_files()
+
+        recipe.delete()
+
+        self.assertEqual(self.stored_files(), stored)
+        call_command('gc_recipe_images', min_age=0, stdout=StringIO())
+        self.assertEqual(self.stored_files(), [])
+
+    def test_release_keeps_recent_files(self):
+        name = content_storage.save(
+            'uploads/recipe/shared.jpg', SimpleUploadedFile('x', b'x')
+        )
+
+        self.assertFalse(content_storage.release(name, 3600))
+        self.assertTrue(content_storage.exists(name))
+
+        os.utime(content_storage.path(name), (0, 0))
+        self.assertTrue(content_storage.release(name, 3600))
+        self.assertEqual(self.stored_files(), [])
+        self.assertFalse(content_storage.release(name, 3600))
@@ -54,8 +54,8 @@ class PrivateIngredientApiTest(TestCase):
     res = self.client.get(INGREDIENTS_URL)
 
     self.assertEqual(res.status_code, status.HTTP_200_OK)
-    self.assertEqual(len(res.data),1)
-    self.assertEqual(res.data[0]['name'],ingredient.name)
+    self.assertEqual(len(res.data['results']),1)
+    self.assertEqual(res.data['results'][0]['name'],ingredient.name)
 
    
   def test_create_ingredient_successful(self):
@@ -97,8 +97,29 @@ class PrivateIngredientApiTest(TestCase):
 
     serializer1 = IngredientSerializer(ingredient1)
     serializer2 = IngredientSerializer(ingredient2)
-    self.assertIn(serializer1.data, res.data)
-    self.assertNotIn(serializer2.data, res.data)
+    self.assertIn(serializer1.data, res.data['results'])
+    self.assertNotIn(serializer2.data, res.data['results'])
+
+  def test_retrieve_ingredients_with_recipe_count(self):
+    """Test ingredients report how many recipes use them"""
+    ingredient = Ingredient.objects.create(user=self.user, name='Eggs')
+    for title in ('Eggs benedict', 'Green eggs on toast'):
+      recipe = Recipe.objects.create(
+          title=title,
+          time_minutes=20,
+          price=5.00,
+          user=self.user
+      )
+      recipe.ingredients.add(ingredient)
+
+    with self.assertNumQueries(2):
+      res = self.client.get(
+        INGREDIENTS_URL, {'assigned_only': 1, 'recipe_count': 1}
+      )
+
+    self.assertEqual(res.data['results'], [
+      {'id': ingredient.id, 'name': 'Eggs', 'recipe_count': 2},
+    ])
 
 def test_retrieve_ingredient_assigned_unique(self):
     """Test filtering ingredients by assigned returns unique items"""
@@ -120,4 +141,4 @@ def test_retrieve_ingredient_assigned_unique(self):
 
     res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
 
-    self.assertEqual(len(res.data), 1)
\ No newline at end of file
+    self.assertEqual(len(res.data['results']), 1)
\ No newline at end of file
@@ -0,0 +1,74 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class PaginationApiTests(TestCase):
+    """Test cursor pagination on the list endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'pages@luis.com',
+            'testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def walk(self, url, page_size):
+        """Follow next cursors and return every page of results"""
+        pages = []
+        res = self.client.get(url, {'page_size': page_size})
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(res.data['results'])
+            if not res.data['next']:
+                return pages
+            res = self.client.get(res.data['next'])
+
+    def test_recipes_paginated_newest_first(self):
+        """Test walking recipe pages returns every recipe once"""
+        recipes = [
+            Recipe.objects.create(
+                user=self.user, title=f'R{i}', time_minutes=5, price=1.00
+            )
+            for i in range(7)
+        ]
+
+        pages = self.walk(RECIPES_URL, 3)
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        ids = [item['id'] for page in pages for item in page]
+        self.assertEqual(ids, [recipe.id for recipe in reversed(recipes)])
+
+    def test_tags_paginated_by_name(self):
+        """Test tag pages are ordered by name"""
+        for name in ['b', 'a', 'c', 'e', 'd']:
+            Tag.objects.create(user=self.user, name=name)
+
+        pages = self.walk(TAGS_URL, 2)
+
+        names = [item['name'] for page in pages for item in page]
+        ids = [item['id'] for page in pages for item in page]
+        self.assertEqual(names, ['e', 'd', 'c', 'b', 'a'])
+        self.assertEqual(len(set(ids)), 5)
+
+    def test_page_size_capped(self):
+        """Test clients cannot request more than the maximum page size"""
+        Recipe.objects.bulk_create([
+            Recipe(user=self.user, title=f'R{i}', time_minutes=5, price=1.00)
+            for i in range(105)
+        ])
+
+        res = self.client.get(RECIPES_URL, {'page_size': 1000})
+
+        self.assertEqual(len(res.data['results']), 100)
+        self.assertIsNotNone(res.data['next'])
+        self.assertNotIn('count', res.data)
@@ -69,7 +69,7 @@ class PrivateRecipeApiTest(TestCase):
     serializer = RecipeSerializer(recipes, many=True)
 
     self.assertEqual(res.status_code, status.HTTP_200_OK)
-    self.assertEqual(res.data, serializer.data)
+    self.assertEqual(res.data['results'], serializer.data)
   
   def test_recipe_limited_to_user(self):
     user2=get_user_model().objects.create_user(
@@ -85,8 +85,8 @@ class PrivateRecipeApiTest(TestCase):
     serializer = RecipeSerializer(recipes, many=True)
 
     self.assertEqual(res.status_code, status.HTTP_200_OK)
-    self.assertEqual(len(res.data), 1)
-    self.assertEqual(res.data, serializer.data)
+    self.assertEqual(len(res.data['results']), 1)
+    self.assertEqual(res.data['results'], serializer.data)
 
   def test_viwe_recipe_detail(self):
     recipe = sample_recipe(user=self.user)
@@ -233,9 +233,9 @@ def test_filter_recipes_by_tags(self):
     serializer1 = RecipeSerializer(recipe1)
     serializer2 = RecipeSerializer(recipe2)
     serializer3 = RecipeSerializer(recipe3)
-    self.assertIn(serializer1.data, res.data)
-    self.assertIn(serializer2.data, res.data)
-    self.assertNotIn(serializer3.data, res.data)
+    self.assertIn(serializer1.data, res.data['results'])
+    self.assertIn(serializer2.data, res.data['results'])
+    self.assertNotIn(serializer3.data, res.data['results'])
 
 def test_filter_recipes_by_ingredients(self):
     """Test returning recipes with specific ingredients"""
@@ -255,6 +255,6 @@ def test_filter_recipes_by_ingredients(self):
     serializer1 = RecipeSerializer(recipe1)
     serializer2 = RecipeSerializer(recipe2)
     serializer3 = RecipeSerializer(recipe3)
-    self.assertIn(serializer1.data, res.data)
-    self.assertIn(serializer2.data, res.data)
-    self.assertNotIn(serializer3.data, res.data)
+    self.assertIn(serializer1.data, res.data['results'])
+    self.assertIn(serializer2.data, res.data['results'])
+    self.assertNotIn(serializer3.data, res.data['results'])
@@ -0,0 +1,146 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Ingredient, Recipe, Tag
+
+COOK_URL = reverse('recipe:recipe-cook')
+
+
+class CookApiTests(TestCase):
+    """Test ranking recipes by the ingredients on hand"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'cook@luis.com',
+            'testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.ingredients = {
+            name: Ingredient.objects.create(user=self.user, name=name)
+            for name in ['egg', 'flour', 'milk', 'sugar', 'salt', 'butter']
+        }
+
+    def recipe(self, title, ingredients, minutes=10):
+        recipe = Recipe.objects.create(
+            user=self.user, title=title, time_minutes=minutes, price=5.00
+        )
+        recipe.ingredients.add(
+            *[self.ingredients[name] for name in ingredients]
+        )
+        return recipe
+
+    def cook(self, names, **params):
+        ids = ','.join(str(self.ingredients[name].id) for name in names)
+        res = self.client.get(COOK_URL, {'ingredients': ids, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_ranked_by_matches_then_missing(self):
+        """Test most matched first, fewest missing breaking ties"""
+        self.recipe('Pancakes', ['egg', 'flour', 'milk', 'sugar'])
+        self.recipe('Omelette', ['egg', 'milk', 'salt'])
+        self.recipe('Crepes', ['egg', 'flour', 'milk'])
+        self.recipe('Shortbread', ['flour', 'sugar', 'butter'])
+        self.recipe('Brine', ['salt'])
+
+        data = self.cook(['egg', 'flour', 'milk'])
+
+        self.assertEqual(
+            [(item['title'], item['matched'], item['missing'])
+             for item in data],
+            [('Crepes', 3, 0), ('Pancakes', 3, 1), ('Omelette', 2, 1),
+             ('Shortbread', 1, 2)]
+        )
+        self.assertEqual(data[0]['coverage'], 1)
+        self.assertEqual(data[1]['coverage'], 0.75)
+
+    def test_limit_and_other_filters(self):
+        """Test the top results only, within the other list filters"""
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        self.recipe('Pancakes', ['egg', 'flour', 'milk'], minutes=20)
+        self.recipe('Omelette', ['egg', 'milk'], minutes=5)
+        self.recipe('Scramble', ['egg'], minutes=5).tags.add(quick)
+
+        self.assertEqual(
+            [item['title'] for item in self.cook(['egg', 'milk'], limit=1)],
+            ['Omelette']
+        )
+        self.assertEqual(
+            [item['title'] for item in
+             self.cook(['egg', 'milk'], time_minutes_max=10)],
+            ['Omelette', 'Scramble']
+        )
+        self.assertEqual(
+            [item['title'] for item in self.cook(['egg'], tags=quick.id)],
+            ['Scramble']
+        )
+
+    def test_scoped_to_user(self):
+        """Test other users' recipes are never ranked"""
+        other = get_user_model().objects.create_user(
+            'other@luis.com',
+            'testpass'
+        )
+        theirs = Recipe.objects.create(
+            user=other, title='Theirs', time_minutes=5, price=1.00
+        )
+        theirs.ingredients.add(self.ingredients['egg'])
+
+        self.assertEqual(self.cook(['egg']), [])
+
+    def test_query_count_independent_of_results(self):
+        """Test one ranking query plus one batch load per relation"""
+        for i in range(10):
+            self.recipe(f'R{i}', ['egg', 'flour'])
+        ids = f"{self.ingredients['egg'].id},{self.ingredients['flour'].id}"
+
+        with self.assertNumQueries(5):
+            res = self.client.get(COOK_URL, {'ingredients': ids})
+
+        self.assertEqual(len(res.data), 10)
+
+    def test_recipes_deleted_after_ranking_skipped(self):
+        pancakes = self.recipe('Pancakes', ['egg', 'flour'])
+        ranking = [(pancakes.id + 1, 2, 2), (pancakes.id, 2, 2)]
+
+        with mock.patch('recipe.views.rank_by_coverage',
+                        return_value=ranking):
+            data = self.cook(['egg', 'flour'])
+
+        self.assertEqual([item['title'] for item in data], ['Pancakes'])
+
+    def test_invalid_params(self):
+        """Test missing ingredients and bad limits are rejected"""
+        for params, param in [
+            ({}, 'ingredients'),
+            ({'ingredients': '1,x'}, 'ingredients'),
+            ({'ingredients': '1', 'limit': 0}, 'limit'),
+            ({'ingredients': '1', 'limit': 101}, 'limit'),
+        ]:
+            res = self.client.get(COOK_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(param, res.data)
+
+
+class BenchmarkCookCommandTests(TestCase):
+
+    def test_benchmark_cook_rolls_back(self):
+        """Test the benchmark reports each case and leaves no data"""
+        out = StringIO()
+        call_command(
+            'benchmark_cook', recipes=50, ingredients=20, repeat=1, stdout=out
+        )
+
+        self.assertIn('400 recipe-ingredient rows', out.getvalue())
+        self.assertIn('on hand=10', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
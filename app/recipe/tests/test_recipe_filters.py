@@ -0,0 +1,240 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe, Tag, Ingredient
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def sample_recipe(user, title):
+    return Recipe.objects.create(
+        user=user, title=title, time_minutes=10, price=5.00
+    )
+
+
+class RecipeFilterApiTests(TestCase):
+    """Test filtering recipes by tags and ingredients"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'filters@luis.com',
+            'testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.quick = Tag.objects.create(user=self.user, name='Quick')
+        self.both = sample_recipe(self.user, 'Salad')
+        self.both.tags.add(self.vegan, self.quick)
+        self.vegan_only = sample_recipe(self.user, 'Curry')
+        self.vegan_only.tags.add(self.vegan)
+        self.untagged = sample_recipe(self.user, 'Steak')
+
+    def result_ids(self, params):
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in res.data['results']]
+
+    def test_filter_any_tags_has_no_duplicates(self):
+        """Test a recipe matching several tags is returned once"""
+        ids = self.result_ids({
+            'tags': f'{self.vegan.id},{self.quick.id}'
+        })
+
+        self.assertEqual(ids, [self.vegan_only.id, self.both.id])
+
+    def test_filter_all_tags(self):
+        """Test tags_mode=all keeps recipes carrying every tag"""
+        ids = self.result_ids({
+            'tags': f'{self.vegan.id},{self.quick.id},{self.vegan.id}',
+            'tags_mode': 'all',
+        })
+
+        self.assertEqual(ids, [self.both.id])
+
+    def test_filter_tags_and_ingredients_combined(self):
+        """Test tag and ingredient filters are intersected"""
+        tofu = Ingredient.objects.create(user=self.user, name='Tofu')
+        self.vegan_only.ingredients.add(tofu)
+        self.untagged.ingredients.add(tofu)
+
+        ids = self.result_ids({
+            'tags': str(self.vegan.id),
+            'ingredients': str(tofu.id),
+            'ingredients_mode': 'all',
+        })
+
+        self.assertEqual(ids, [self.vegan_only.id])
+
+    def test_filter_invalid_ids(self):
+        """Test non numeric ids are rejected"""
+        res = self.client.get(RECIPES_URL, {'tags': '1,abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data)
+
+    def test_filter_invalid_mode(self):
+        """Test unknown match modes are rejected"""
+        res = self.client.get(
+            RECIPES_URL, {'tags': str(self.vegan.id), 'tags_mode': 'some'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags_mode', res.data)
+
+
+class RecipeRangeOrderingApiTests(TestCase):
+    """Test range filters and sorting of the recipe list"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'ranges@luis.com',
+            'testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.recipes = [
+            Recipe.objects.create(
+                user=self.user, title=f'R{i}', time_minutes=minutes,
+                price=price
+            )
+            for i, (minutes, price) in enumerate([
+                (45, '12.00'), (20, '4.50'), (30, '8.00'), (20, '10.00'),
+                (60, '4.50'),
+            ])
+        ]
+
+    def result_ids(self, params):
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in res.data['results']]
+
+    def ids(self, *indexes):
+        return [self.recipes[i].id for i in indexes]
+
+    def test_range_filters_inclusive(self):
+        """Test time and price bounds keep recipes within them"""
+        self.assertEqual(
+            self.result_ids({'time_minutes_max': 30}), self.ids(3, 2, 1)
+        )
+        self.assertEqual(
+            self.result_ids({'price_min': '4.5', 'price_max': 10}),
+            self.ids(4, 3, 2, 1)
+        )
+
+    def test_range_composes_with_tags(self):
+        """Test range filters intersect the related filters"""
+        tag = Tag.objects.create(user=self.user, name='Quick')
+        self.recipes[0].tags.add(tag)
+        self.recipes[1].tags.add(tag)
+
+        ids = self.result_ids({'tags': str(tag.id), 'time_minutes_max': 30})
+
+        self.assertEqual(ids, self.ids(1))
+
+    def test_invalid_ranges_rejected(self):
+        """Test malformed, negative and inverted bounds are rejected"""
+        for params, param in [
+            ({'price_max': 'cheap'}, 'price_max'),
+            ({'time_minutes_min': -1}, 'time_minutes_min'),
+            ({'time_minutes_min': 30, 'time_minutes_max': 10},
+             'time_minutes_max'),
+        ]:
+            res = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(param, res.data)
+
+    def test_ordering_ties_broken_by_id(self):
+        """Test sorting by time or price, equal values in id order"""
+        self.assertEqual(
+            self.result_ids({'ordering': 'time_minutes'}),
+            self.ids(1, 3, 2, 0, 4)
+        )
+        self.assertEqual(
+            self.result_ids({'ordering': '-price'}), self.ids(0, 3, 2, 4, 1)
+        )
+
+    def test_unknown_ordering_rejected(self):
+        """Test only whitelisted orderings are accepted"""
+        res = self.client.get(RECIPES_URL, {'ordering': 'title'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ordering', res.data)
+
+    def test_sorted_pages_walk_both_ways(self):
+        """Test next and previous cursors over many equal sort keys"""
+        Recipe.objects.bulk_create([
+            Recipe(user=self.user, title=f'S{i}', time_minutes=20, price=1)
+            for i in range(20)
+        ])
+        expected = list(
+            Recipe.objects.filter(user=self.user)
+            .order_by('time_minutes', 'id').values_list('id', flat=True)
+        )
+
+        pages = []
+        res = self.client.get(
+            RECIPES_URL, {'ordering': 'time_minutes', 'page_size': 4}
+        )
+        while True:
+            pages.append([item['id'] for item in res.data['results']])
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual([i for page in pages for i in page], expected)
+        res = self.client.get(res.data['previous'])
+        self.assertEqual(
+            [item['id'] for item in res.data['results']], pages[-2]
+        )
+
+    def test_deep_page_needs_no_offset(self):
+        """Test a cursor page is a keyset query without OFFSET"""
+        res = self.client.get(
+            RECIPES_URL, {'ordering': '-price', 'page_size': 2}
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(res.data['next'])
+
+        page_sql = [
+            query['sql'] for query in queries.captured_queries
+            if 'LIMIT 3' in query['sql']
+        ]
+        self.assertEqual(len(page_sql), 1)
+        self.assertNotIn('OFFSET', page_sql[0])
+
+    def test_invalid_cursor(self):
+        """Test a cursor from another ordering is rejected"""
+        res = self.client.get(
+            RECIPES_URL, {'ordering': 'price', 'page_size': 2}
+        )
+        cursor = res.data['next'].split('cursor=')[1].split('&')[0]
+
+        res = self.client.get(RECIPES_URL, {'cursor': cursor})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BenchmarkFiltersCommandTests(TestCase):
+
+    def test_benchmark_filters_rolls_back(self):
+        """Test the benchmark reports each case and leaves no data"""
+        out = StringIO()
+        call_command(
+            'benchmark_filters', recipes=50, tags=10, repeat=1, stdout=out
+        )
+
+        self.assertIn('250 recipe-tag rows', out.getvalue())
+        self.assertIn('exists all', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
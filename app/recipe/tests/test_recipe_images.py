@@ -0,0 +1,157 @@
+import os
+import shutil
+import struct
+import tempfile
+from io import BytesIO
+
+from PIL import Image
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe, RecipeImageVariant
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def image_upload_url(recipe_id):
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def sample_image(size=(1200, 900), fmt='JPEG', name='photo.jpg'):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'orange').save(buffer, format=fmt)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class RecipeImagePipelineTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(
+            MEDIA_ROOT=media_root, BACKGROUND_TASKS_EAGER=True,
+            RECIPE_IMAGE_RELEASE_GRACE=0
+        )
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'images@luis.com',
+            'testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Pie', time_minutes=10, price=5.00
+        )
+
+    def upload(self, image):
+        return self.client.post(
+            image_upload_url(self.recipe.id), {'image': image},
+            format='multipart'
+        )
+
+    def test_upload_generates_variants(self):
+        """Test resized and WebP variants are recorded for an upload"""
+        res = self.upload(sample_image())
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        variants = {
+            variant.name: variant
+            for variant in self.recipe.image_variants.all()
+        }
+        self.assertEqual(set(variants), {
+            RecipeImageVariant.THUMBNAIL,
+            RecipeImageVariant.MEDIUM,
+            RecipeImageVariant.FULL,
+            RecipeImageVariant.WEBP,
+        })
+        thumbnail = variants[RecipeImageVariant.THUMBNAIL]
+        self.assertEqual((thumbnail.width, thumbnail.height), (200, 150))
+        self.assertEqual(variants[RecipeImageVariant.FULL].width, 1200)
+        with Image.open(variants[RecipeImageVariant.WEBP].image.path) as img:
+            self.assertEqual(img.format, 'WEBP')
+
+    def test_variants_follow_exif_orientation(self):
+        """Test a landscape photo tagged to display rotated renders upright"""
+        # A little-endian TIFF block with one entry, Orientation = 6 (rotate
+        # 90 degrees clockwise to display)
+        exif = (
+            b'Exif\x00\x00II*\x00' + struct.pack('<IH', 8, 1) +
+            struct.pack('<HHIHH', 0x0112, 3, 1, 6, 0) + struct.pack('<I', 0)
+        )
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 900), 'orange').save(
+            buffer, format='JPEG', exif=exif
+        )
+
+        self.upload(SimpleUploadedFile('photo.jpg', buffer.getvalue()))
+
+        full = self.recipe.image_variants.get(name=RecipeImageVariant.FULL)
+        self.assertEqual((full.width, full.height), (900, 1200))
+
+    def test_list_exposes_variant_urls(self):
+        self.upload(sample_image())
+
+        res = self.client.get(RECIPES_URL)
+
+        urls = res.data['results'][0]['image_variants']
+        self.assertTrue(urls['thumbnail'].startswith('http://testserver/'))
+        self.assertIn('medium', urls)
+
+    def test_replacing_image_replaces_variants(self):
+        self.upload(sample_image())
+        old_paths = [
+            variant.image.path for variant in self.recipe.image_variants.all()
+        ]
+
+        self.upload(sample_image(size=(100, 100)))
+
+        self.assertEqual(self.recipe.image_variants.count(), 4)
+        for path in old_paths:
+            self.assertFalse(os.path.exists(path))
+
+    def test_unsupported_format_rejected(self):
+        """Test the header check refuses formats outside the allowed list"""
+        res = self.upload(sample_image(fmt='BMP', name='photo.bmp'))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_mismatched_extension_rejected(self):
+        """Test an image named as another type is refused"""
+        for name in ('evil.html', 'photo.jpg', 'photo'):
+            res = self.upload(sample_image(fmt='PNG', name=name))
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(res.data['image'][0].code, 'invalid_extension')
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_extension_normalised(self):
+        """Test the stored name carries the detected format's extension"""
+        res = self.upload(sample_image(name='photo.JPEG'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image.name.endswith('.jpg'))
+
+    def test_corrupt_image_rejected(self):
+        res = self.upload(SimpleUploadedFile('photo.jpg', b'not an image'))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(BACKGROUND_TASKS_EAGER=False)
+    def test_processing_deferred_off_request(self):
+        """Test variants are not rendered on the request thread"""
+        res = self.upload(sample_image())
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(self.recipe.image_variants.exists())
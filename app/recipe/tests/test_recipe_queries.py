@@ -0,0 +1,205 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe, Tag, Ingredient
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class RecipeQueryCountTests(TestCase):
+    """Test the recipe endpoints run a constant number of queries"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'queries@luis.com',
+            'testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+
+    def create_recipes(self, count):
+        for i in range(count):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=10,
+                price=5.00
+            )
+            recipe.tags.add(
+                self.tag,
+                Tag.objects.create(user=self.user, name=f'Tag {recipe.id}')
+            )
+            recipe.ingredients.add(
+                Ingredient.objects.create(
+                    user=self.user, name=f'Ing {recipe.id}'
+                )
+            )
+
+    def test_list_query_count_is_constant(self):
+        """Test listing recipes batch-loads related rows"""
+        self.create_recipes(2)
+        with self.assertNumQueries(5):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.create_recipes(10)
+        with self.assertNumQueries(5):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_retrieve_query_count_is_constant(self):
+        """Test retrieving a recipe loads nested objects in batches"""
+        self.create_recipes(1)
+        recipe = Recipe.objects.get()
+        recipe.tags.add(*[
+            Tag.objects.create(user=self.user, name=f'Extra {i}')
+            for i in range(10)
+        ])
+
+        with self.assertNumQueries(5):
+            res = self.client.get(detail_url(recipe.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 12)
+
+    def test_filtered_list_query_count_is_constant(self):
+        """Test filtering recipes by tag runs a constant number of queries"""
+        self.create_recipes(2)
+        with self.assertNumQueries(5):
+            self.client.get(RECIPES_URL, {'tags': str(self.tag.id)})
+
+        self.create_recipes(10)
+        with self.assertNumQueries(5):
+            res = self.client.get(RECIPES_URL, {'tags': str(self.tag.id)})
+        self.assertEqual(len(res.data['results']), 12)
+
+
+class RecipeWriteQueryCountTests(TestCase):
+    """Test recipe writes validate related ids in one query per field"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'writes@luis.com',
+            'testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.ingredients = [
+            Ingredient.objects.create(user=self.user, name=f'Ing {i}')
+            for i in range(40)
+        ]
+        self.tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(5)
+        ]
+
+    def payload(self, ingredients, tags):
+        return {
+            'title': 'Stew',
+            'time_minutes': 60,
+            'price': '9.00',
+            'ingredients': [ingredient.id for ingredient in ingredients],
+            'tags': [tag.id for tag in tags],
+        }
+
+    def count_queries(self, method, url, payload):
+        with CaptureQueriesContext(connection) as queries:
+            res = method(url, payload, format='json')
+        self.assertLess(res.status_code, 300, res.data)
+        return len(queries)
+
+    def test_create_query_count_independent_of_ids(self):
+        few = self.count_queries(
+            self.client.post, RECIPES_URL,
+            self.payload(self.ingredients[:2], self.tags[:1])
+        )
+        many = self.count_queries(
+            self.client.post, RECIPES_URL,
+            self.payload(self.ingredients, self.tags)
+        )
+
+        self.assertEqual(few, many)
+
+    def test_update_query_count_independent_of_ids(self):
+        recipe = Recipe.objects.create(
+            user=self.user, title='Stew', time_minutes=60, price=9
+        )
+        url = detail_url(recipe.id)
+        few = self.count_queries(
+            self.client.put, url,
+            self.payload(self.ingredients[:2], self.tags[:1])
+        )
+        many = self.count_queries(
+            self.client.put, url,
+            self.payload(self.ingredients, self.tags)
+        )
+
+        self.assertEqual(few, many)
+        self.assertEqual(recipe.ingredients.count(), 40)
+
+    def test_related_ids_scoped_to_user(self):
+        """Test other users' ids are rejected together in one error"""
+        other_user = get_user_model().objects.create_user(
+            'other@luis.com',
+            'testpass'
+        )
+        foreign = [
+            Ingredient.objects.create(user=other_user, name=f'Other {i}')
+            for i in range(2)
+        ]
+
+        res = self.client.post(
+            RECIPES_URL,
+            self.payload(self.ingredients[:1] + foreign, []),
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data['ingredients']), 1)
+        for ingredient in foreign:
+            self.assertIn(f'"{ingredient.id}"', res.data['ingredients'][0])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_create_with_names(self):
+        """Test named tags and ingredients are reused or created inline"""
+        payload = self.payload(self.ingredients[:1], [])
+        payload['ingredients'] += [{'name': 'Ing 1'}, {'name': 'Saffron'}]
+        payload['tags'] = [{'name': 'Tag 0'}, {'name': 'Spicy'}]
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(
+            sorted(recipe.ingredients.values_list('name', flat=True)),
+            ['Ing 0', 'Ing 1', 'Saffron']
+        )
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)),
+            ['Spicy', 'Tag 0']
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 6)
+
+    def test_create_with_names_query_count_independent_of_names(self):
+        def payload(count):
+            data = self.payload([], [])
+            data['title'] = f'Stew {count}'
+            data['ingredients'] = [
+                {'name': f'New {count} {i}'} for i in range(count)
+            ]
+            return data
+
+        few = self.count_queries(self.client.post, RECIPES_URL, payload(2))
+        many = self.count_queries(self.client.post, RECIPES_URL, payload(30))
+
+        self.assertEqual(few, many)
@@ -0,0 +1,182 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.search import PostgresSearchBackend, word_similarity
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class RecipeSearchApiTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'search@luis.com',
+            'testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def recipe(self, title, tags=(), ingredients=()):
+        recipe = Recipe.objects.create(
+            user=self.user, title=title, time_minutes=10, price=5.00
+        )
+        recipe.tags.add(*[
+            Tag.objects.get_or_create(user=self.user, name=name)[0]
+            for name in tags
+        ])
+        recipe.ingredients.add(*[
+            Ingredient.objects.get_or_create(user=self.user, name=name)[0]
+            for name in ingredients
+        ])
+        return recipe
+
+    def search(self, text, **params):
+        res = self.client.get(RECIPES_URL, {'search': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['title'] for recipe in res.data['results']]
+
+    def test_search_titles_tags_and_ingredients(self):
+        self.recipe('Chicken curry')
+        self.recipe('Weeknight stew', tags=['Chicken'])
+        self.recipe('Broth', ingredients=['Chicken wings'])
+        self.recipe('Lentil soup')
+
+        titles = self.search('chicken')
+
+        self.assertEqual(titles[0], 'Chicken curry')
+        self.assertCountEqual(
+            titles, ['Chicken curry', 'Weeknight stew', 'Broth']
+        )
+
+    def test_every_word_must_match(self):
+        self.recipe('Chicken curry')
+        self.recipe('Chicken soup')
+
+        self.assertEqual(self.search('chicken soup'), ['Chicken soup'])
+
+    def test_typos_still_match(self):
+        self.recipe('Chicken curry')
+        self.recipe('Lentil soup')
+
+        self.assertEqual(self.search('chickn'), ['Chicken curry'])
+
+    def test_search_scoped_to_user_and_filters(self):
+        curry = self.recipe('Chicken curry', tags=['Spicy'])
+        self.recipe('Chicken soup')
+        other = get_user_model().objects.create_user(
+            'other@luis.com',
+            'testpass'
+        )
+        Recipe.objects.create(
+            user=other, title='Chicken pie', time_minutes=10, price=5.00
+        )
+        tag = curry.tags.get()
+
+        self.assertEqual(
+            self.search('chicken', tags=tag.id), ['Chicken curry']
+        )
+
+    def test_results_paginated_by_page_number(self):
+        for i in range(3):
+            self.recipe(f'Chicken {i}')
+
+        res = self.client.get(
+            RECIPES_URL, {'search': 'chicken', 'page_size': 2}
+        )
+        self.assertEqual(res.data['count'], 3)
+        self.assertEqual(len(res.data['results']), 2)
+
+        res = self.client.get(res.data['next'])
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_search_text_follows_renames(self):
+        recipe = self.recipe('Stew', tags=['Spicy'])
+        tag = recipe.tags.get()
+        tag.name = 'Mild'
+        tag.save()
+
+        self.assertEqual(self.search('mild'), ['Stew'])
+        self.assertEqual(self.search('spicy'), [])
+
+    def test_search_too_long(self):
+        res = self.client.get(RECIPES_URL, {'search': 'x' * 201})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs tsvector and pg_trgm')
+class PostgresSearchBackendTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'postgres@luis.com',
+            'testpass'
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Chicken curry', time_minutes=10, price=5.00
+        )
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Spicy'))
+        self.recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Coconut milk')
+        )
+        self.backend = PostgresSearchBackend()
+
+    def search(self, text):
+        return list(self.backend.search(Recipe.objects.all(), text))
+
+    def test_refresh(self):
+        Recipe.objects.update(search_text='', search_vector=None)
+
+        self.backend.refresh([self.recipe.id])
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            self.recipe.search_text, 'Chicken curry Spicy Coconut milk'
+        )
+        self.assertEqual(
+            self.recipe.search_vector,
+            "'chicken':1A 'coconut':4B 'curri':2A 'milk':5B 'spici':3B"
+        )
+
+    def test_refresh_without_tags_or_ingredients(self):
+        self.recipe.tags.clear()
+        self.recipe.ingredients.clear()
+
+        self.backend.refresh([self.recipe.id])
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.search_text.strip(), 'Chicken curry')
+
+    def test_search(self):
+        self.assertEqual(self.search('coconut curry'), [self.recipe])
+        self.assertEqual(self.search('spicy chickn'), [self.recipe])
+        self.assertEqual(self.search('coconut soup'), [])
+        self.assertEqual(self.search('!!'), [])
+
+    def test_word_similarity_matches_pg_trgm(self):
+        for term, word in [
+                ('chiken', 'chicken'), ('peper', 'pepper'),
+                ('apple', 'pineapple'), ('onion', 'oniononion')]:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT word_similarity(%s, %s)', [term, word])
+                expected, = cursor.fetchone()
+            self.assertAlmostEqual(
+                word_similarity(term, word), expected, places=6
+            )
+
+
+class WordSimilarityTests(TestCase):
+
+    def test_word_similarity(self):
+        self.assertEqual(word_similarity('chicken', 'chicken'), 1)
+        self.assertAlmostEqual(word_similarity('chickn', 'chicken'), 5 / 7)
+        self.assertEqual(word_similarity('chiken', 'chicken'), 0.5)
+        self.assertEqual(word_similarity('lentil', 'chicken'), 0)
@@ -0,0 +1,289 @@
+import random
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Ingredient, Recipe, RecipeSimilarity, Tag
+from recipe.similarity import SimilarityMatrix, rebuild_similarities
+
+
+def similar_url(recipe_id):
+    return reverse('recipe:recipe-similar', args=[recipe_id])
+
+
+class SimilarRecipesApiTests(TestCase):
+    """Test the similar recipes of a recipe"""
+
+    def setUp(self):
+        eager = override_settings(BACKGROUND_TASKS_EAGER=True)
+        eager.enable()
+        self.addCleanup(eager.disable)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'similar@luis.com',
+            'testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def recipe(self, title, tags=(), ingredients=()):
+        recipe = Recipe.objects.create(
+            user=self.user, title=title, time_minutes=10, price=5.00
+        )
+        recipe.tags.add(*[
+            Tag.objects.get_or_create(user=self.user, name=name)[0]
+            for name in tags
+        ])
+        recipe.ingredients.add(*[
+            Ingredient.objects.get_or_create(user=self.user, name=name)[0]
+            for name in ingredients
+        ])
+        return recipe
+
+    def similar(self, recipe, **params):
+        res = self.client.get(similar_url(recipe.id), params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [(item['title'], item['similarity']) for item in res.data]
+
+    def test_ranked_by_jaccard_similarity(self):
+        """Test recipes sharing more of their sets rank first"""
+        curry = self.recipe('Curry', ['Spicy'], ['rice', 'chicken'])
+        self.recipe('Korma', ['Spicy'], ['rice', 'chicken'])
+        self.recipe('Fried rice', ['Quick'], ['rice'])
+        self.recipe('Salad', ['Quick'], ['lettuce'])
+
+        self.assertEqual(
+            self.similar(curry), [('Korma', 1), ('Fried rice', 0.25)]
+        )
+        self.assertEqual(self.similar(curry, limit=1), [('Korma', 1)])
+
+    def test_index_follows_link_changes(self):
+        """Test adding and removing tags or ingredients refreshes scores"""
+        curry = self.recipe('Curry', ['Spicy'], ['rice'])
+        korma = self.recipe('Korma', ['Spicy'], ['rice'])
+        salad = self.recipe('Salad', [], ['lettuce'])
+
+        korma.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='cream')
+        )
+        salad.ingredients.add(Ingredient.objects.get(name='rice'))
+
+        self.assertEqual(
+            self.similar(curry), [('Korma', 0.6667), ('Salad', 0.3333)]
+        )
+        self.assertEqual(self.similar(salad), [('Curry', 0.3333),
+                                               ('Korma', 0.25)])
+
+        korma.tags.clear()
+        korma.ingredients.clear()
+
+        self.assertEqual(self.similar(curry), [('Salad', 0.3333)])
+
+    def test_deleted_recipes_leave_the_index(self):
+        """Test a deleted recipe is no longer listed"""
+        curry = self.recipe('Curry', ['Spicy'], ['rice'])
+        korma = self.recipe('Korma', ['Spicy'], ['rice'])
+        self.recipe('Fried rice', [], ['rice'])
+
+        korma.delete()
+
+        self.assertEqual(self.similar(curry), [('Fried rice', 0.5)])
+        self.assertFalse(
+            RecipeSimilarity.objects.filter(similar_id=korma.id).exists()
+        )
+
+    def test_served_from_the_index(self):
+        """Test a request costs the same few queries however many match"""
+        curry = self.recipe('Curry', ['Spicy'], ['rice'])
+        for i in range(10):
+            self.recipe(f'Curry {i}', ['Spicy'], ['rice'])
+
+        with self.assertNumQueries(6):
+            res = self.client.get(similar_url(curry.id))
+
+        self.assertEqual(len(res.data), 10)
+
+    def test_other_users_recipes_not_found(self):
+        """Test the action is limited to the user's own recipes"""
+        other = get_user_model().objects.create_user(
+            'other@luis.com',
+            'testpass'
+        )
+        theirs = Recipe.objects.create(
+            user=other, title='Theirs', time_minutes=5, price=1.00
+        )
+
+        res = self.client.get(similar_url(theirs.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_write_refreshes_once(self):
+        """Test a create with its links schedules a single refresh"""
+        with mock.patch('recipe.signals.refresh_similarities') as refresh, \
+                mock.patch('recipe.signals.get_search_backend') as backend:
+            res = self.client.post(reverse('recipe:recipe-list'), {
+                'title': 'Curry', 'time_minutes': 20, 'price': '4.00',
+                'tags': [{'name': 'Spicy'}],
+                'ingredients': [{'name': 'rice'}, {'name': 'chicken'}],
+            }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        refresh.assert_called_once_with(self.user.id, [res.data['id']])
+        backend().refresh.assert_called_once_with([res.data['id']])
+
+    def test_limit_validated(self):
+        recipe = self.recipe('Curry')
+
+        res = self.client.get(similar_url(recipe.id), {'limit': 21})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SimilarityIndexTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'index@luis.com',
+            'testpass'
+        )
+        self.tags = [
+            Tag.objects.create(user=self.user, name=f'tag {i}')
+            for i in range(6)
+        ]
+        self.ingredients = [
+            Ingredient.objects.create(user=self.user, name=f'ingredient {i}')
+            for i in range(12)
+        ]
+
+    def random_recipe(self, rng, title):
+        recipe = Recipe.objects.create(
+            user=self.user, title=title, time_minutes=10, price=5.00
+        )
+        recipe.tags.set(rng.sample(self.tags, rng.randint(0, 2)))
+        recipe.ingredients.set(rng.sample(self.ingredients, rng.randint(1, 4)))
+        return recipe
+
+    def index(self):
+        """{recipe id: sorted kept (similar id, score)}"""
+        index = {}
+        for recipe_id, similar_id, score in RecipeSimilarity.objects \
+                .values_list('recipe_id', 'similar_id', 'score'):
+            index.setdefault(recipe_id, []).append(
+                (similar_id, round(score, 9))
+            )
+        return {key: sorted(kept) for key, kept in index.items()}
+
+    def test_scores_are_jaccard_similarities(self):
+        """Test the sparse product against the sets themselves"""
+        rng = random.Random(1)
+        recipes = [self.random_recipe(rng, f'R{i}') for i in range(15)]
+        sets = {
+            recipe.id: {('tag', pk) for pk in recipe.tags.values_list(
+                'id', flat=True
+            )} | {('ingredient', pk) for pk in recipe.ingredients.values_list(
+                'id', flat=True
+            )}
+            for recipe in recipes
+        }
+
+        matrix = SimilarityMatrix(self.user.id)
+        scores = matrix.scores(matrix.rows(sets)).toarray()
+
+        for row, recipe_id in enumerate(matrix.recipe_ids):
+            for column, other_id in enumerate(matrix.recipe_ids):
+                a, b = sets[recipe_id], sets[other_id]
+                expected = 0 if recipe_id == other_id else \
+                    len(a & b) / len(a | b)
+                self.assertAlmostEqual(scores[row, column], expected)
+
+    def test_recipe_created_while_loading_left_out(self):
+        """Test links of a recipe newer than the loaded ids are ignored"""
+        for title in ('First', 'Second'):
+            recipe = Recipe.objects.create(
+                user=self.user, title=title, time_minutes=10, price=5.00
+            )
+            recipe.ingredients.add(*self.ingredients[:2])
+        values_list = QuerySet.values_list
+
+        def create_after_ids(queryset, *fields, **kwargs):
+            values = values_list(queryset, *fields, **kwargs)
+            if queryset.model is not Recipe or fields != ('id',):
+                return values
+            values = list(values)
+            late = Recipe.objects.create(
+                user=self.user, title='Late', time_minutes=10, price=5.00
+            )
+            late.ingredients.add(self.ingredients[0])
+            return values
+
+        with mock.patch.object(QuerySet, 'values_list', create_after_ids):
+            matrix = SimilarityMatrix(self.user.id)
+
+        self.assertEqual(len(matrix.recipe_ids), 2)
+        self.assertEqual(matrix.sizes.tolist(), [2, 2])
+
+    @mock.patch('recipe.similarity.TOP_K', 3)
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_incremental_refresh_matches_a_rebuild(self):
+        """Test random edits leave the index as a full rebuild makes it"""
+        rng = random.Random(7)
+        recipes = [self.random_recipe(rng, f'R{i}') for i in range(30)]
+        for i in range(40):
+            recipe = rng.choice(recipes)
+            change = rng.randrange(4)
+            if change == 0:
+                recipe.ingredients.add(rng.choice(self.ingredients))
+            elif change == 1:
+                recipe.ingredients.remove(rng.choice(self.ingredients))
+            elif change == 2:
+                recipe.tags.set(rng.sample(self.tags, rng.randint(0, 2)))
+            else:
+                recipes.remove(recipe)
+                recipe.delete()
+                recipes.append(self.random_recipe(rng, f'New {i}'))
+        refreshed = self.index()
+
+        rebuild_similarities(self.user.id)
+
+        self.assertEqual(refreshed, self.index())
+        self.assertTrue(all(len(scores) <= 3 for scores in refreshed.values()))
+
+    @mock.patch('recipe.similarity.TOP_K', 1)
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_incremental_refresh_orders_ties_like_a_rebuild(self):
+        """Test a new recipe tying the lowest kept score displaces it"""
+        for title in ('Old', 'Recipe', 'New'):
+            recipe = Recipe.objects.create(
+                user=self.user, title=title, time_minutes=10, price=5.00
+            )
+            recipe.ingredients.add(self.ingredients[0])
+        refreshed = set(RecipeSimilarity.objects.values_list(
+            'recipe__title', 'similar__title'
+        ))
+
+        rebuild_similarities(self.user.id)
+
+        self.assertEqual(refreshed, set(RecipeSimilarity.objects.values_list(
+            'recipe__title', 'similar__title'
+        )))
+        self.assertIn(('Old', 'New'), refreshed)
+
+    def test_build_command(self):
+        """Test the command builds the index of existing recipes"""
+        rng = random.Random(3)
+        for i in range(5):
+            self.random_recipe(rng, f'R{i}')
+        self.assertFalse(RecipeSimilarity.objects.exists())
+
+        out = StringIO()
+        call_command('build_recipe_similarities', stdout=out)
+
+        self.assertIn('index@luis.com', out.getvalue())
+        self.assertTrue(RecipeSimilarity.objects.exists())
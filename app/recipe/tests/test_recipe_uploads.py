@@ -0,0 +1,167 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import tracemalloc
+from types import SimpleNamespace
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe
+from recipe.uploads import (
+    UPLOAD_DIR, RequestEntityTooLarge, StreamingImageParser
+)
+
+BOUNDARY = 'BoUnDaRy'
+MB = 2 ** 20
+
+
+class GeneratedBody:
+    """Multipart body whose file content is produced while it is read"""
+
+    def __init__(self, size, chunk=b'0123456789abcdef' * 4096):
+        self.head = (
+            f'--{BOUNDARY}\r\n'
+            'Content-Disposition: form-data; name="image"; '
+            'filename="big.jpg"\r\n'
+            'Content-Type: image/jpeg\r\n\r\n'
+        ).encode()
+        self.tail = f'\r\n--{BOUNDARY}--\r\n'.encode()
+        self.size = size
+        self.chunk = chunk
+        self.sent = 0
+        self.pending = self.head
+        self.hasher = hashlib.sha256()
+
+    def __len__(self):
+        return len(self.head) + self.size + len(self.tail)
+
+    def read(self, n=-1):
+        while len(self.pending) < n and self.sent < self.size:
+            part = self.chunk[:self.size - self.sent]
+            self.hasher.update(part)
+            self.sent += len(part)
+            self.pending += part
+            if self.sent == self.size:
+                self.pending += self.tail
+        data, self.pending = self.pending[:n], self.pending[n:]
+        return data
+
+
+def parse(body):
+    request = SimpleNamespace(META={'CONTENT_LENGTH': str(len(body))})
+    return StreamingImageParser().parse(
+        body,
+        f'multipart/form-data; boundary={BOUNDARY}',
+        {'request': request}
+    )
+
+
+class StreamingUploadTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media = override_settings(
+            MEDIA_ROOT=self.media_root, RECIPE_IMAGE_MAX_UPLOAD_SIZE=32 * MB
+        )
+        media.enable()
+        self.addCleanup(media.disable)
+        self.upload_dir = os.path.join(self.media_root, UPLOAD_DIR)
+
+    def test_upload_streamed_and_hashed(self):
+        """Test the file lands in the media directory with its digest"""
+        body = GeneratedBody(3 * MB)
+
+        upload = parse(body).files['image']
+
+        self.assertEqual(upload.size, 3 * MB)
+        self.assertEqual(upload.sha256, body.hasher.hexdigest())
+        path = upload.temporary_file_path()
+        self.assertEqual(os.path.dirname(path), self.upload_dir.rstrip('/'))
+        self.assertEqual(os.path.getsize(path), 3 * MB)
+        upload.close()
+
+    def test_oversized_upload_rejected_while_streaming(self):
+        """Test the limit holds when Content-Length understates the body"""
+        body = GeneratedBody(40 * MB)
+        request = SimpleNamespace(META={'CONTENT_LENGTH': '1'})
+
+        with self.assertRaises(RequestEntityTooLarge):
+            StreamingImageParser().parse(
+                body,
+                f'multipart/form-data; boundary={BOUNDARY}',
+                {'request': request}
+            )
+
+        self.assertLess(body.sent, 33 * MB)
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    def test_parallel_uploads_use_flat_memory(self):
+        """Test concurrent large uploads are never buffered in memory"""
+        bodies = [GeneratedBody(24 * MB) for _ in range(8)]
+        uploads = []
+
+        def run(body):
+            uploads.append(parse(body).files['image'])
+
+        tracemalloc.start()
+        try:
+            threads = [
+                threading.Thread(target=run, args=(body,)) for body in bodies
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(len(uploads), 8)
+        for upload in uploads:
+            self.assertEqual(upload.size, 24 * MB)
+            upload.close()
+        # 192MB went through; allow a few chunks per upload in flight
+        self.assertLess(peak, 8 * MB)
+
+
+class StreamingUploadApiTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(
+            MEDIA_ROOT=media_root, RECIPE_IMAGE_MAX_UPLOAD_SIZE=MB
+        )
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'uploads@luis.com',
+            'testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Pie', time_minutes=10, price=5.00
+        )
+        self.url = reverse('recipe:recipe-upload-image', args=[self.recipe.id])
+
+    def test_oversized_upload_returns_413(self):
+        big = SimpleUploadedFile('big.jpg', b'0' * (2 * MB))
+
+        res = self.client.post(self.url, {'image': big}, format='multipart')
+
+        self.assertEqual(
+            res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
@@ -0,0 +1,126 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe, Tag, Ingredient
+
+RECIPES_URL = reverse('recipe:recipe-list')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def titles(res):
+    return [recipe['title'] for recipe in res.data['results']]
+
+
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        cache = override_settings(RESPONSE_CACHE={
+            'ENABLED': True, 'ALLOW_PROCESS_LOCAL': True
+        })
+        cache.enable()
+        self.addCleanup(cache.disable)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'cache@luis.com',
+            'testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Pie', time_minutes=10, price=5.00
+        )
+
+    def test_repeated_read_served_from_cache(self):
+        self.client.get(RECIPES_URL)
+        self.client.get(detail_url(self.recipe.id))
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPES_URL)
+            detail = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(titles(res), ['Pie'])
+        self.assertEqual(detail.data['title'], 'Pie')
+
+    def test_query_params_are_part_of_the_key(self):
+        tag = Tag.objects.create(user=self.user, name='Sweet')
+        self.recipe.tags.add(tag)
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=10, price=5.00
+        )
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(RECIPES_URL, {'tags': tag.id})
+
+        self.assertEqual(titles(res), ['Pie'])
+
+    def test_writes_invalidate_cached_reads(self):
+        """Test API, ORM and many-to-many writes all drop stale reads"""
+        self.client.get(RECIPES_URL)
+        self.client.patch(detail_url(self.recipe.id), {'title': 'Tart'})
+        self.assertEqual(titles(self.client.get(RECIPES_URL)), ['Tart'])
+
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=10, price=5.00
+        )
+        self.assertEqual(
+            titles(self.client.get(RECIPES_URL)), ['Soup', 'Tart']
+        )
+
+        tag = Tag.objects.create(user=self.user, name='Sweet')
+        self.client.get(detail_url(self.recipe.id))
+        self.recipe.tags.add(tag)
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertEqual(res.data['tags'][0]['name'], 'Sweet')
+
+        self.client.get(TAGS_URL)
+        tag.delete()
+        self.assertEqual(self.client.get(TAGS_URL).data['results'], [])
+
+    def test_bulk_writes_invalidate_cached_reads(self):
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        self.client.get(detail_url(self.recipe.id))
+
+        res = self.client.patch(RECIPES_BULK_URL, [
+            {'id': self.recipe.id, 'ingredients': [ingredient.id]}
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertEqual(res.data['ingredients'][0]['name'], 'Salt')
+
+    def test_users_do_not_share_entries(self):
+        self.client.get(RECIPES_URL)
+        other = get_user_model().objects.create_user(
+            'other@luis.com',
+            'testpass'
+        )
+        Recipe.objects.create(
+            user=other, title='Soup', time_minutes=10, price=5.00
+        )
+        self.client.force_authenticate(user=other)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(titles(res), ['Soup'])
+
+    @override_settings(RESPONSE_CACHE={'ENABLED': True})
+    def test_process_local_cache_refused(self):
+        """Test locmem is refused, as other workers would serve stale data"""
+        with self.assertRaises(ImproperlyConfigured):
+            self.client.get(RECIPES_URL)
+
+    @override_settings(RESPONSE_CACHE={'ENABLED': False})
+    def test_disabled(self):
+        self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(5):
+            self.client.get(RECIPES_URL)
@@ -0,0 +1,173 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import ChangeLogEntry, Recipe, Tag, Ingredient
+from recipe.views import SyncView
+
+SYNC_URL = reverse('recipe:sync')
+RECIPES_URL = reverse('recipe:recipe-list')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def sample_recipe(user, title='Pie'):
+    return Recipe.objects.create(
+        user=user, title=title, time_minutes=10, price=5.00
+    )
+
+
+def ids(changes):
+    return [obj['id'] for obj in changes['changed']]
+
+
+class PublicSyncApiTests(TestCase):
+
+    def test_login_required(self):
+        res = APIClient().get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateSyncApiTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'sync@luis.com',
+            'testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.recipe = sample_recipe(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Sweet')
+        self.recipe.tags.add(self.tag)
+
+    def sync(self, cursor=0):
+        res = self.client.get(SYNC_URL, {'cursor': cursor})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_first_sync_returns_everything(self):
+        other = get_user_model().objects.create_user(
+            'other@luis.com',
+            'testpass'
+        )
+        sample_recipe(other, 'Not mine')
+
+        data = self.sync()
+
+        self.assertEqual(ids(data['recipes']), [self.recipe.id])
+        self.assertEqual(data['recipes']['changed'][0]['tags'], [self.tag.id])
+        self.assertEqual(ids(data['tags']), [self.tag.id])
+        self.assertEqual(data['ingredients'], {'changed': [], 'deleted': []})
+        self.assertFalse(data['has_more'])
+
+    def test_only_changes_after_cursor_returned(self):
+        cursor = self.sync()['cursor']
+        self.assertEqual(self.sync(cursor)['cursor'], cursor)
+
+        for title in ('Tart', 'Crumble', 'Flan'):
+            self.recipe.title = title
+            self.recipe.save()
+        data = self.sync(cursor)
+
+        self.assertEqual(
+            [obj['title'] for obj in data['recipes']['changed']], ['Flan']
+        )
+        self.assertEqual(data['tags']['changed'], [])
+        self.assertEqual(
+            ChangeLogEntry.objects.filter(user=self.user).count(), 2
+        )
+
+    def test_deletions_leave_tombstones(self):
+        cursor = self.sync()['cursor']
+
+        tag_id = self.tag.id
+        self.tag.delete()
+        data = self.sync(cursor)
+
+        self.assertEqual(data['tags']['deleted'], [tag_id])
+        # The recipe no longer lists the tag
+        self.assertEqual(data['recipes']['changed'][0]['tags'], [])
+
+    def test_link_changes_logged(self):
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        cursor = self.sync()['cursor']
+
+        self.client.patch(RECIPES_BULK_URL, [
+            {'id': self.recipe.id, 'ingredients': [ingredient.id]}
+        ], format='json')
+        data = self.sync(cursor)
+
+        self.assertEqual(ids(data['recipes']), [self.recipe.id])
+        self.assertEqual(ids(data['ingredients']), [ingredient.id])
+
+    def test_write_logged_once_per_kind(self):
+        """Test a create with its links allocates sequences once per kind"""
+        cursor = self.sync()['cursor']
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(RECIPES_URL, {
+                'title': 'Tart', 'time_minutes': 20, 'price': '4.00',
+                'tags': [self.tag.id, {'name': 'Baked'}],
+                'ingredients': [{'name': 'Flour'}, {'name': 'Butter'}],
+            }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        allocations = [
+            query['sql'] for query in queries
+            if 'change_sequence' in query['sql'] and
+            query['sql'].startswith('UPDATE')
+        ]
+        self.assertEqual(len(allocations), 3)
+        data = self.sync(cursor)
+        self.assertEqual(ids(data['recipes']), [res.data['id']])
+        self.assertEqual(len(ids(data['tags'])), 2)
+        self.assertEqual(len(ids(data['ingredients'])), 2)
+
+    def test_pages_follow_the_cursor(self):
+        for i in range(4):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+
+        seen, cursor = [], 0
+        with mock.patch.object(SyncView, 'page_size', 2):
+            while True:
+                data = self.sync(cursor)
+                seen += [('tag', pk) for pk in ids(data['tags'])]
+                seen += [('recipe', pk) for pk in ids(data['recipes'])]
+                cursor = data['cursor']
+                if not data['has_more']:
+                    break
+
+        self.assertEqual(len(seen), 6)
+        self.assertEqual(len(set(seen)), 6)
+
+    def test_query_count_independent_of_collection_size(self):
+        for i in range(30):
+            sample_recipe(self.user, f'Recipe {i}')
+        cursor = self.sync()['cursor']
+        self.recipe.title = 'Tart'
+        self.recipe.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self.sync(cursor)
+
+        self.assertEqual(ids(data['recipes']), [self.recipe.id])
+        # Entries, then recipes with their three relations
+        self.assertEqual(len(queries), 5)
+
+    def test_invalid_cursor(self):
+        res = self.client.get(SYNC_URL, {'cursor': 'abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_user_deletion_drops_log(self):
+        self.user.delete()
+
+        self.assertFalse(ChangeLogEntry.objects.exists())
@@ -1,13 +1,16 @@
+from unittest.mock import patch
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
+from rest_framework.exceptions import ValidationError
 from rest_framework.test import APIClient
 from rest_framework import status
 
 from core.models import Tag, Recipe
 
-from recipe.serializer import TagSerializer
+from recipe.serializer import TagSerializer, UniqueNameMixin
 
 TAGS_URL = reverse('recipe:tag-list')
 
@@ -39,7 +42,7 @@ class PrivateTagsApiTest(TestCase):
         tags = Tag.objects.all().order_by('-name')
         serializer = TagSerializer(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
     
     def test_tags_limited_to_user(self):
         user1 = get_user_model().objects.create_user(
@@ -52,8 +55,8 @@ class PrivateTagsApiTest(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data),1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']),1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
     
     def test_create_tag_successful(self):
         payload = {'name': 'Test tag'  }
@@ -71,6 +74,40 @@ class PrivateTagsApiTest(TestCase):
         
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_create_tag_duplicate_name(self):
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_create_tag_duplicate_name_race(self):
+        """A duplicate passing validation concurrently is still a 400"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        with patch.object(
+                UniqueNameMixin, 'validate_name', lambda self, value: value):
+            res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data, {'name': ['You already use this name.']})
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_update_tag_duplicate_name_race(self):
+        Tag.objects.create(user=self.user, name='Vegan')
+        tag = Tag.objects.create(user=self.user, name='Dessert')
+        serializer = TagSerializer(tag, data={'name': 'Vegan'})
+
+        with patch.object(
+                UniqueNameMixin, 'validate_name', lambda self, value: value):
+            self.assertTrue(serializer.is_valid())
+            with self.assertRaises(ValidationError):
+                serializer.save()
+
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Dessert')
+
     def test_retrieve_tags_assigned_to_recipes(self):
         """Test filtering tags by those assigned to recipes"""
         tag1 = Tag.objects.create(user=self.user, name='Breakfast')
@@ -87,8 +124,8 @@ class PrivateTagsApiTest(TestCase):
 
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrieve_tags_assigned_unique(self):
         """Test filtering tags by assigned returns unique items"""
@@ -110,4 +147,30 @@ class PrivateTagsApiTest(TestCase):
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
\ No newline at end of file
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_retrieve_tags_with_recipe_count(self):
+        """Test tags report their usage in the same query as the list"""
+        tag1 = Tag.objects.create(user=self.user, name='Breakfast')
+        tag2 = Tag.objects.create(user=self.user, name='Lunch')
+        for title in ('Pancakes', 'Porridge'):
+            recipe = Recipe.objects.create(
+                title=title,
+                time_minutes=5,
+                price=3.00,
+                user=self.user
+            )
+            recipe.tags.add(tag1)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(
+                TAGS_URL, {'assigned_only': 1, 'recipe_count': 1}
+            )
+
+        self.assertEqual(res.data['results'], [
+            {'id': tag1.id, 'name': tag1.name, 'recipe_count': 2},
+        ])
+        res = self.client.get(TAGS_URL, {'recipe_count': 1})
+        self.assertEqual(res.data['results'][0], {
+            'id': tag2.id, 'name': tag2.name, 'recipe_count': 0
+        })
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import (
+    TemporaryUploadedFile, UploadedFile
+)
+from django.core.files.uploadhandler import FileUploadHandler
+from django.http.multipartparser import (
+    MultiPartParser as DjangoMultiPartParser, MultiPartParserError
+)
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+UPLOAD_DIR = 'uploads/recipe/'
+
+# Room for the multipart boundaries and headers around the file itself
+MULTIPART_OVERHEAD = 64 * 2 ** 10
+
+
+class RequestEntityTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = _('Uploaded file is too large.')
+    default_code = 'too_large'
+
+
+def max_upload_size():
+    return getattr(settings, 'RECIPE_IMAGE_MAX_UPLOAD_SIZE', 10 * 2 ** 20)
+
+
+class StreamedUploadedFile(TemporaryUploadedFile):
+    """Upload written next to its final location in the media storage
+
+    Storage moves a file exposing temporary_file_path() into place with a
+    rename, so the bytes are written to disk exactly once.
+    """
+
+    def __init__(self, name, content_type, size, charset,
+                 content_type_extra=None, directory=None):
+        os.makedirs(directory, exist_ok=True)
+        _, ext = os.path.splitext(name)
+        file = tempfile.NamedTemporaryFile(
+            prefix='.upload-', suffix=ext, dir=directory
+        )
+        UploadedFile.__init__(
+            self, file, name, content_type, size, charset, content_type_extra
+        )
+        self.sha256 = None
+
+
+class StreamingImageUploadHandler(FileUploadHandler):
+    """Stream an upload to disk in fixed size chunks
+
+    The size limit is enforced as bytes arrive and the content is hashed
+    incrementally, so memory use does not depend on the file size.
+    """
+    chunk_size = 64 * 2 ** 10
+
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size or max_upload_size()
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        if content_length > self.max_size + MULTIPART_OVERHEAD:
+            raise RequestEntityTooLarge()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.hasher = hashlib.sha256()
+        self.file = StreamedUploadedFile(
+            self.file_name, self.content_type, 0, self.charset,
+            self.content_type_extra,
+            directory=os.path.join(settings.MEDIA_ROOT, UPLOAD_DIR)
+        )
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.file.close()
+            raise RequestEntityTooLarge()
+        self.hasher.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.sha256 = self.hasher.hexdigest()
+        return self.file
+
+    def upload_interrupted(self):
+        if getattr(self, 'file', None) is not None:
+            self.file.close()
+
+
+class StreamingImageParser(MultiPartParser):
+    """Multipart parser that streams files with StreamingImageUploadHandler"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        request = parser_context['request']
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        meta = request.META.copy()
+        meta['CONTENT_TYPE'] = media_type
+        upload_handlers = [StreamingImageUploadHandler(request)]
+
+        try:
+            parser = DjangoMultiPartParser(
+                meta, stream, upload_handlers, encoding
+            )
+            data, files = parser.parse()
+            return DataAndFiles(data, files)
+        except MultiPartParserError as exc:
+            raise ParseError('Multipart form parse error - %s' % str(exc))
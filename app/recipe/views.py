@@ -1,60 +1,270 @@
+from collections import defaultdict
+
+from django.db.models import Prefetch
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
-from core.models import Tag, Ingredient, Recipe
+from core.metrics import TimedAuthenticationMixin
+from core.profiling import ProfiledViewMixin
+from core.models import (
+    ChangeLogEntry, Tag, Ingredient, Recipe, RecipeImageVariant
+)
+from user.authentication import CachedTokenAuthentication
 from recipe import serializer
+from recipe.autocomplete import MAX_COMPLETIONS, get_prefix_index
+from recipe.bulk import BulkModelMixin
+from recipe.caching import CachedResponseMixin
+from recipe.conditional import BatchedChangesMixin, ConditionalGetMixin
+from recipe.images import (
+    release_image_files_on_commit, schedule_image_processing
+)
+from recipe.uploads import StreamingImageParser
+from recipe.cooking import MAX_COOK_RESULTS, MAX_ON_HAND, rank_by_coverage
+from recipe.filters import (
+    RELATED_FILTERS, filter_recipes, linked_count, linked_exists,
+    params_to_ints, recipe_ordering
+)
+from recipe.pagination import (
+    RecipeAttrCursorPagination, RecipeKeysetPagination,
+    RecipeSearchPagination
+)
+from recipe.search import MAX_SEARCH_LENGTH, search_recipes
+from recipe.similarity import TOP_K
 
 
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin):
-    authentication_classes = (TokenAuthentication,)
+class BaseRecipeAttrViewSet(ProfiledViewMixin, TimedAuthenticationMixin,
+                            BatchedChangesMixin, CachedResponseMixin,
+                            ConditionalGetMixin, BulkModelMixin,
+                            viewsets.GenericViewSet, mixins.ListModelMixin,
+                            mixins.CreateModelMixin):
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeAttrCursorPagination
     
-    def get_queryset(self):
+    # Recipe relation (key of RELATED_FILTERS) the model is linked through
+    recipe_relation = None
+    bulk_unique_fields = ('name',)
+    bulk_touch_linked = True
+
+    def get_validator_queryset(self):
+        """The listed rows, without the per-row usage counts"""
         assigned_only = bool(self.request.query_params.get('assigned_only'))
-        queryset = self.queryset
+        queryset = self.queryset.filter(user=self.request.user)
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
-        return queryset.filter(user=self.request.user).order_by('-name').distinct()
+            through, column = RELATED_FILTERS[self.recipe_relation]
+            queryset = queryset.filter(linked_exists(through, column))
+        return queryset
+
+    def get_queryset(self):
+        recipe_count = bool(self.request.query_params.get('recipe_count'))
+        queryset = self.get_validator_queryset()
+        if recipe_count:
+            through, column = RELATED_FILTERS[self.recipe_relation]
+            queryset = queryset.annotate(
+                recipe_count=linked_count(through, column)
+            )
+        return queryset.order_by('-name')
     
     def perform_create(self, serializer):
         return serializer.save(user=self.request.user)
 
+    @action(methods=['GET'], detail=False)
+    def autocomplete(self, request):
+        """Names starting with ``?prefix=`` (at any word), most used first
+        """
+        prefix = request.query_params.get('prefix', '').strip()
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= MAX_COMPLETIONS:
+            raise ValidationError({'limit': (
+                f'Expected a number from 1 to {MAX_COMPLETIONS}.'
+            )})
+
+        through, column = RELATED_FILTERS[self.recipe_relation]
+        index = get_prefix_index(request.user, self.queryset.filter(
+            user=request.user
+        ).annotate(
+            recipe_count=linked_count(through, column)
+        ).values_list('id', 'name', 'recipe_count'))
+        return Response([
+            {'id': pk, 'name': name, 'recipe_count': recipe_count}
+            for pk, name, recipe_count in index.complete(prefix, limit)
+        ])
+
 
 class TagViewSet(BaseRecipeAttrViewSet):
     queryset = Tag.objects.all()
     serializer_class = serializer.TagSerializer
+    recipe_relation = 'tags'
 
     
 class IngredientViewSet(BaseRecipeAttrViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = serializer.IngredientSerializer
+    recipe_relation = 'ingredients'
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ProfiledViewMixin, TimedAuthenticationMixin,
+                    BatchedChangesMixin, CachedResponseMixin,
+                    ConditionalGetMixin, BulkModelMixin,
+                    viewsets.ModelViewSet):
     serializer_class=serializer.RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    bulk_serializer_class = serializer.RecipeBulkSerializer
+    bulk_relations = ('tags', 'ingredients')
+    bulk_prefetch = ('tags', 'ingredients', 'image_variants')
+    pagination_class = RecipeKeysetPagination
 
-    def _params_to_ints(self, qs):
-        return [int(str_id) for str_id in qs.split(',')]
+    # Recipe columns serialized by the read actions; related rows are
+    # batch-loaded per page with the columns each serializer renders.
+    read_fields = ('id', 'title', 'time_minutes', 'price', 'link')
+    related_fields = {
+        'list': ('id',),
+        'retrieve': ('id', 'name'),
+    }
+
+    def _shape_queryset(self, queryset, action=None):
+        """Select only what the current action, or action, serializes"""
+        related_fields = self.related_fields.get(action or self.action)
+        if related_fields is None:
+            return queryset
+        return queryset.only(*self.read_fields).prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.only(*related_fields)),
+            Prefetch(
+                'ingredients',
+                queryset=Ingredient.objects.only(*related_fields)
+            ),
+            Prefetch(
+                'image_variants',
+                queryset=RecipeImageVariant.objects.only(
+                    'recipe_id', 'name', 'image'
+                )
+            ),
+        )
+
+    def get_search_text(self):
+        """The ``?search=`` of a list request, or None"""
+        if self.action != 'list':
+            return None
+        text = self.request.query_params.get('search', '').strip()
+        if len(text) > MAX_SEARCH_LENGTH:
+            raise ValidationError({'search': (
+                f'Ensure this value has at most {MAX_SEARCH_LENGTH} '
+                'characters.'
+            )})
+        return text or None
+
+    def get_ordering(self):
+        """The order_by() fields of the list, from ``?ordering=``"""
+        return recipe_ordering(self.request.query_params)
+
+    @property
+    def paginator(self):
+        # Ranked results have no stable key to keep a cursor on
+        if not hasattr(self, '_paginator') and self.get_search_text():
+            self._paginator = RecipeSearchPagination()
+        return super().paginator
 
     def get_queryset(self):
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
-        if tags:
-            tags_id = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tags_id)
-        if ingredients:
-            ingredients_id = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredients_id)
-
-        return queryset.filter(user=self.request.user)
+        queryset = filter_recipes(self.queryset, self.request.query_params)
+        queryset = queryset.filter(user=self.request.user)
+        text = self.get_search_text()
+        if text:
+            queryset = search_recipes(queryset, text)
+            if self.request.query_params.get('ordering'):
+                queryset = queryset.order_by(*self.get_ordering())
+        else:
+            queryset = queryset.order_by(*self.get_ordering())
+        return self._shape_queryset(queryset)
+
+    @action(methods=['GET'], detail=False)
+    def cook(self, request):
+        """Recipes using most of the ``?ingredients=`` on hand
+
+        Each comes with the number of those ingredients it uses, the number
+        it needs besides them and the share of its ingredients on hand.
+        The other list filters narrow the recipes ranked.
+        """
+        value = request.query_params.get('ingredients')
+        if not value:
+            raise ValidationError({
+                'ingredients': 'Expected a comma separated list of ids.'
+            })
+        ingredient_ids = params_to_ints('ingredients', value)
+        if len(ingredient_ids) > MAX_ON_HAND:
+            raise ValidationError({'ingredients': (
+                f'Expected at most {MAX_ON_HAND} ids.'
+            )})
+        try:
+            limit = int(request.query_params.get('limit', 20))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= MAX_COOK_RESULTS:
+            raise ValidationError({'limit': (
+                f'Expected a number from 1 to {MAX_COOK_RESULTS}.'
+            )})
+
+        ranking = rank_by_coverage(self.get_queryset(), ingredient_ids, limit)
+        recipes = self._shape_queryset(
+            Recipe.objects.filter(pk__in=[row[0] for row in ranking]), 'list'
+        ).in_bulk()
+        results = []
+        for recipe_id, matched, total in ranking:
+            # Deleted between the ranking and the load
+            if recipe_id not in recipes:
+                continue
+            data = self.get_serializer(recipes[recipe_id]).data
+            data.update(
+                matched=matched,
+                missing=total - matched,
+                coverage=round(matched / total, 4),
+            )
+            results.append(data)
+        return Response(results)
+
+    @action(methods=['GET'], detail=True)
+    def similar(self, request, pk=None):
+        """The recipes sharing most tags and ingredients with this one
+
+        Served from the index kept by recipe.similarity, each with its
+        Jaccard ``similarity``, best first.
+        """
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= TOP_K:
+            raise ValidationError({'limit': (
+                f'Expected a number from 1 to {TOP_K}.'
+            )})
+
+        recipe = self.get_object()
+        ranking = list(
+            recipe.similarities.order_by('-score', '-similar_id')
+            .values_list('similar_id', 'score')[:limit]
+        )
+        recipes = self._shape_queryset(
+            Recipe.objects.filter(pk__in=[row[0] for row in ranking]), 'list'
+        ).in_bulk()
+        results = []
+        for recipe_id, score in ranking:
+            # Deleted since the index was last refreshed
+            if recipe_id not in recipes:
+                continue
+            data = self.get_serializer(recipes[recipe_id]).data
+            data['similarity'] = round(score, 4)
+            results.append(data)
+        return Response(results)
 
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -66,9 +276,11 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         return serializer.save(user=self.request.user)
     
-    @action(methods=['POST'], detail=True, url_path='upload-image')
+    @action(methods=['POST'], detail=True, url_path='upload-image',
+            parser_classes=[StreamingImageParser])
     def upload_image(self, request, pk=None):
         recipe = self.get_object()
+        previous_image = recipe.image.name
         serializer = self.get_serializer(
             recipe,
             data=request.data
@@ -76,6 +288,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         if serializer.is_valid():
             serializer.save()
+            if previous_image != recipe.image.name:
+                release_image_files_on_commit([previous_image])
+            schedule_image_processing(recipe)
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
@@ -84,4 +299,78 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return Response(
             serializer.errors, 
             status=status.HTTP_400_BAD_REQUEST
-        )
\ No newline at end of file
+        )
+
+
+class SyncView(ProfiledViewMixin, TimedAuthenticationMixin, APIView):
+    """Recipes, tags and ingredients changed since ``?cursor=``
+
+    Each changed object appears once, in its current state, and deleted
+    ones as ids, so the cost follows the number of changes rather than the
+    size of the collection.  Start from cursor 0 and pass back the returned
+    cursor; ``has_more`` asks for another call straight away.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    page_size = 500
+    # kind -> (response key, queryset, serializer class)
+    kinds = {
+        ChangeLogEntry.RECIPE: (
+            'recipes',
+            Recipe.objects.defer(
+                'search_text', 'search_vector'
+            ).prefetch_related('tags', 'ingredients', 'image_variants'),
+            serializer.RecipeSerializer,
+        ),
+        ChangeLogEntry.TAG: (
+            'tags', Tag.objects.all(), serializer.TagSerializer
+        ),
+        ChangeLogEntry.INGREDIENT: (
+            'ingredients', Ingredient.objects.all(),
+            serializer.IngredientSerializer
+        ),
+    }
+
+    def get_cursor(self):
+        try:
+            cursor = int(self.request.query_params.get('cursor', 0))
+        except ValueError:
+            cursor = -1
+        if cursor < 0:
+            raise ValidationError({'cursor': 'Expected a sync cursor.'})
+        return cursor
+
+    def get(self, request):
+        cursor = self.get_cursor()
+        entries = list(
+            ChangeLogEntry.objects
+            .filter(user=request.user, sequence__gt=cursor)
+            .order_by('sequence')
+            .values_list('kind', 'object_id', 'deleted', 'sequence')
+            [:self.page_size + 1]
+        )
+        has_more = len(entries) > self.page_size
+        entries = entries[:self.page_size]
+
+        changed, deleted = defaultdict(list), defaultdict(list)
+        for kind, object_id, is_deleted, _ in entries:
+            (deleted if is_deleted else changed)[kind].append(object_id)
+
+        data = {
+            'cursor': entries[-1][3] if entries else cursor,
+            'has_more': has_more,
+        }
+        context = {'request': request}
+        for kind, (key, queryset, serializer_class) in self.kinds.items():
+            objects = []
+            if changed[kind]:
+                objects = queryset.filter(
+                    user=request.user, pk__in=changed[kind]
+                ).order_by('id')
+            data[key] = {
+                'changed': serializer_class(
+                    objects, many=True, context=context
+                ).data,
+                'deleted': sorted(deleted[kind]),
+            }
+        return Response(data)
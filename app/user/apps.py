@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class UsersConfig(AppConfig):
     name = 'user'
+
+    def ready(self):
+        from user import signals  # noqa: F401
@@ -0,0 +1,120 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+DEFAULTS = {
+    'MAX_ENTRIES': 10000,
+    'TTL': 60,
+    'CACHE_ALIAS': None,
+}
+
+
+class TokenCache:
+    """Bounded LRU of authenticated tokens whose entries expire after a TTL
+
+    Entries are kept pickled so every hit hands out fresh user/token
+    instances. When `cache_alias` names a Django cache, entries live there
+    instead of in process, so an invalidation reaches every process at
+    once rather than after each one's local copy expires.
+    """
+
+    def __init__(self, max_entries, ttl, cache_alias=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared = caches[cache_alias] if cache_alias else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _shared_key(self, key):
+        return f'auth-token:{key}'
+
+    def _store(self, key, payload):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        if self.shared is not None:
+            payload = self.shared.get(self._shared_key(key))
+            return None if payload is None else pickle.loads(payload)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, payload = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return pickle.loads(payload)
+                del self._entries[key]
+        return None
+
+    def set(self, key, value):
+        payload = pickle.dumps(value)
+        if self.shared is not None:
+            self.shared.set(self._shared_key(key), payload, self.ttl)
+        else:
+            self._store(key, payload)
+
+    def delete(self, key):
+        if self.shared is not None:
+            self.shared.delete(self._shared_key(key))
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_token_cache = None
+
+
+def get_token_cache():
+    """Return the process wide token cache configured by TOKEN_AUTH_CACHE"""
+    global _token_cache
+    if _token_cache is None:
+        options = dict(DEFAULTS, **getattr(settings, 'TOKEN_AUTH_CACHE', {}))
+        _token_cache = TokenCache(
+            options['MAX_ENTRIES'], options['TTL'], options['CACHE_ALIAS']
+        )
+    return _token_cache
+
+
+@receiver(setting_changed)
+def reset_token_cache(setting, **kwargs):
+    global _token_cache
+    if setting in ('TOKEN_AUTH_CACHE', 'CACHES'):
+        _token_cache = None
+
+
+def invalidate_token(key):
+    get_token_cache().delete(key)
+
+
+def invalidate_user_tokens(user):
+    """Drop the cached tokens of a user whose credentials or state changed"""
+    keys = Token.objects.filter(user_id=user.pk).values_list('key', flat=True)
+    for key in keys:
+        invalidate_token(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that skips the token query for cached keys"""
+
+    def authenticate_credentials(self, key):
+        token_cache = get_token_cache()
+        credentials = token_cache.get(key)
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            token_cache.set(key, credentials)
+        return credentials
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TieredPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 whose iteration count comes from a configured tier
+
+    PASSWORD_HASHER_TIERS maps tier names to iteration counts and
+    PASSWORD_HASHER_TIER picks the active one. Stored hashes keep their own
+    iteration count, so switching tiers only rehashes passwords on the next
+    successful login.
+    """
+
+    @property
+    def iterations(self):
+        tiers = getattr(settings, 'PASSWORD_HASHER_TIERS', {})
+        tier = getattr(settings, 'PASSWORD_HASHER_TIER', None)
+        return tiers.get(tier, PBKDF2PasswordHasher.iterations)
@@ -0,0 +1,228 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.contrib.auth import get_user_model, user_login_failed
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException, Throttled
+
+DEFAULTS = {
+    'MAX_FAILURES': 5,
+    'MAX_IP_FAILURES': 100,
+    'WINDOW': 300,
+    'NUM_PROXIES': 0,
+    'MAX_KEYS': 100000,
+    'HASH_WORKERS': 4,
+    'HASH_QUEUE': 32,
+    'HASH_TIMEOUT': 10,
+}
+
+
+class LoginUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many logins in progress, try again shortly.')
+    default_code = 'login_unavailable'
+
+
+class SlidingWindowCounter:
+    """Count events per key over the last `window` seconds"""
+
+    def __init__(self, limit, window, max_keys):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._events = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _prune(self, key, now):
+        events = self._events.get(key)
+        if events is None:
+            return None
+        while events and events[0] <= now - self.window:
+            events.popleft()
+        if not events:
+            del self._events[key]
+            return None
+        return events
+
+    def hit(self, key):
+        now = time.monotonic()
+        with self._lock:
+            events = self._prune(key, now)
+            if events is None:
+                events = self._events[key] = deque()
+            events.append(now)
+            self._events.move_to_end(key)
+            while len(self._events) > self.max_keys:
+                self._events.popitem(last=False)
+
+    def retry_after(self, key):
+        """Seconds until key drops under the limit, or 0 if it is not over"""
+        now = time.monotonic()
+        with self._lock:
+            events = self._prune(key, now)
+            if events is None or len(events) < self.limit:
+                return 0
+            return events[-self.limit] + self.window - now
+
+    def reset(self, key):
+        with self._lock:
+            self._events.pop(key, None)
+
+
+class HashingPool:
+    """Bounded worker pool that runs password hashing off request threads
+
+    At most `workers` hashes run at once and at most `queue` more wait;
+    anything beyond that is rejected instead of tying up a request thread.
+    """
+
+    def __init__(self, workers, queue, timeout):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='password-hash'
+        )
+        self._slots = threading.BoundedSemaphore(workers + queue)
+
+    def run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise LoginUnavailable()
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            raise LoginUnavailable()
+
+
+_failures = None
+_pool = None
+
+
+def get_options():
+    return dict(DEFAULTS, **getattr(settings, 'LOGIN_THROTTLE', {}))
+
+
+def get_failure_counters():
+    """Failed logins per email and per IP, each with its own limit
+
+    An IP may be shared by a whole office or carrier NAT, so it is allowed
+    far more failures than a single email.
+    """
+    global _failures
+    if _failures is None:
+        options = get_options()
+        _failures = {
+            kind: SlidingWindowCounter(
+                options[limit], options['WINDOW'], options['MAX_KEYS']
+            )
+            for kind, limit in (
+                ('email', 'MAX_FAILURES'), ('ip', 'MAX_IP_FAILURES')
+            )
+        }
+    return _failures
+
+
+def get_hashing_pool():
+    global _pool
+    if _pool is None:
+        options = get_options()
+        _pool = HashingPool(
+            options['HASH_WORKERS'],
+            options['HASH_QUEUE'],
+            options['HASH_TIMEOUT'],
+        )
+    return _pool
+
+
+@receiver(setting_changed)
+def reset_login_state(setting, **kwargs):
+    global _failures, _pool
+    if setting == 'LOGIN_THROTTLE':
+        _failures = None
+        _pool = None
+
+
+def _verify(password, encoded):
+    """Check a password, reporting whether its hash should be upgraded"""
+    upgrade = []
+    valid = check_password(password, encoded, setter=upgrade.append)
+    return valid, bool(upgrade)
+
+
+def client_ip(request):
+    """The client's address, behind NUM_PROXIES trusted proxies
+
+    Each proxy appends the address it was connected from to
+    X-Forwarded-For, so only that many entries from the right can be
+    trusted; anything before them is whatever the client sent.
+    """
+    remote_addr = request.META.get('REMOTE_ADDR')
+    num_proxies = get_options()['NUM_PROXIES']
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if not num_proxies or not forwarded:
+        return remote_addr
+    addresses = [address.strip() for address in forwarded.split(',')]
+    return addresses[-min(num_proxies, len(addresses))] or remote_addr
+
+
+def _client_keys(email, request):
+    """(counter kind, key) pairs a login attempt is counted under"""
+    keys = [('email', email.lower())]
+    ip = client_ip(request) if request is not None else None
+    if ip:
+        keys.append(('ip', ip))
+    return keys
+
+
+def authenticate_credentials(email, password, request=None):
+    """Return the active user matching the credentials, or None
+
+    Equivalent to authenticate() with the model backend, except that
+    hashing runs in the bounded pool and emails or IPs with too many recent
+    failures are refused with a 429 before any hashing is done.
+    """
+    failures = get_failure_counters()
+    keys = _client_keys(email, request)
+    wait = max(failures[kind].retry_after(key) for kind, key in keys)
+    if wait:
+        raise Throttled(wait=wait)
+
+    user_model = get_user_model()
+    try:
+        user = user_model._default_manager.get_by_natural_key(email)
+    except user_model.DoesNotExist:
+        user = None
+
+    pool = get_hashing_pool()
+    if user is None:
+        # Hash anyway so unknown emails take as long as wrong passwords
+        pool.run(make_password, password)
+        valid = upgrade = False
+    else:
+        valid, upgrade = pool.run(_verify, password, user.password)
+        valid = valid and user.is_active
+
+    if not valid:
+        for kind, key in keys:
+            failures[kind].hit(key)
+        user_login_failed.send(
+            sender=__name__, credentials={'email': email}, request=request
+        )
+        return None
+
+    failures['email'].reset(email.lower())
+    if upgrade:
+        user.set_password(password)
+        user.save(update_fields=['password'])
+    return user
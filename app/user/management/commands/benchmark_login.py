@@ -0,0 +1,59 @@
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.test import APIRequestFactory
+
+from user.views import CreateTokenAPI
+
+
+class Command(BaseCommand):
+    """Django command to measure token endpoint login throughput"""
+
+    help = 'Fire concurrent logins at the token endpoint and report throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=8)
+
+    def handle(self, *args, **options):
+        email, password = 'benchmark-login@example.com', 'benchmark-pass'
+        user = get_user_model().objects.create_user(email, password)
+        factory = APIRequestFactory()
+        view = CreateTokenAPI.as_view()
+
+        def login(_):
+            request = factory.post(
+                '/api/user/token',
+                {'email': email, 'password': password},
+                REMOTE_ADDR=f'10.0.0.{_ % 250}',
+            )
+            start = time.perf_counter()
+            response = view(request)
+            elapsed = time.perf_counter() - start
+            connection.close()
+            return response.status_code, elapsed
+
+        try:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(options['concurrency']) as executor:
+                results = list(executor.map(login, range(options['requests'])))
+            total = time.perf_counter() - start
+        finally:
+            user.delete()
+
+        latencies = sorted(elapsed * 1000 for _, elapsed in results)
+        ok = sum(1 for code, _ in results if code == 200)
+        throughput = len(results) / total
+        cores = os.cpu_count() or 1
+        self.stdout.write(
+            f'{ok}/{len(results)} ok in {total:.2f}s, '
+            f'{throughput:.1f} logins/s, '
+            f'{throughput / cores:.1f} logins/s/core ({cores} cores), '
+            f'p50={statistics.median(latencies):.1f}ms '
+            f'p95={latencies[int(len(latencies) * 0.95) - 1]:.1f}ms'
+        )
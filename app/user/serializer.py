@@ -1,9 +1,12 @@
-from django.contrib.auth import get_user_model, authenticate
+from django.contrib.auth import get_user_model
 from django.utils.translation import ugettext_lazy as _
 from rest_framework import serializers
 
+from core.metrics import TimedSerializerMixin
+from user.login import authenticate_credentials
 
-class UserSerializer(serializers.ModelSerializer):
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for the user object"""
 
     class Meta:
@@ -24,7 +27,7 @@ class UserSerializer(serializers.ModelSerializer):
 
         return user
 
-class AuthTokenSerializer(serializers.Serializer):
+class AuthTokenSerializer(TimedSerializerMixin, serializers.Serializer):
     email = serializers.CharField()
     password = serializers.CharField(
         style={'input_type':'password'},
@@ -35,10 +38,10 @@ class AuthTokenSerializer(serializers.Serializer):
         email=attrs.get('email')
         password=attrs.get('password')
 
-        user = authenticate(
-            request=self.context.get('request'),
-            username=email,
-            password=password
+        user = authenticate_credentials(
+            email,
+            password,
+            request=self.context.get('request')
         )
         if not user:
             msg = _('Não foi possivel autenticar com credenciais informadas')
@@ -0,0 +1,111 @@
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from user.authentication import TokenCache, get_token_cache
+
+ME_URL = reverse('user:me')
+
+
+class TokenCacheTests(TestCase):
+
+    def test_least_recently_used_entry_evicted(self):
+        """Test the cache never holds more than max_entries"""
+        cache = TokenCache(max_entries=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    @patch('user.authentication.time.monotonic')
+    def test_entries_expire(self, monotonic):
+        """Test entries are dropped once their TTL has passed"""
+        monotonic.return_value = 100
+        cache = TokenCache(max_entries=10, ttl=60)
+        cache.set('a', 1)
+
+        monotonic.return_value = 159
+        self.assertEqual(cache.get('a'), 1)
+        monotonic.return_value = 161
+        self.assertIsNone(cache.get('a'))
+
+    def test_shared_cache_invalidates_every_process(self):
+        """Test a deletion in one process is seen by the others at once"""
+        first = TokenCache(max_entries=10, ttl=60, cache_alias='default')
+        second = TokenCache(max_entries=10, ttl=60, cache_alias='default')
+        first.set('a', {'user': 1})
+
+        self.assertEqual(second.get('a'), {'user': 1})
+        first.delete('a')
+        self.assertIsNone(second.get('a'))
+
+
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='cache@test.com',
+            password='testpass',
+            name='name'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_lookup_cached(self):
+        """Test repeated requests skip the token query"""
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_deleted_token_invalidated(self):
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_invalidated(self):
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_invalidated(self):
+        """Test updating the profile drops the cached user"""
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'name': 'new name', 'password': 'newpass'})
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'new name')
+
+    @override_settings(TOKEN_AUTH_CACHE={'CACHE_ALIAS': 'default'})
+    def test_shared_cache_used(self):
+        """Test lookups are shared through the configured Django cache"""
+        self.client.get(ME_URL)
+        get_token_cache().clear()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,167 @@
+import threading
+import time
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from user.login import HashingPool, LoginUnavailable, SlidingWindowCounter
+
+TOKEN_URL = reverse('user:token')
+
+THROTTLE = {
+    'MAX_FAILURES': 3,
+    'MAX_IP_FAILURES': 5,
+    'WINDOW': 60,
+    'HASH_WORKERS': 2,
+    'HASH_QUEUE': 2,
+    'HASH_TIMEOUT': 10,
+}
+
+
+class TokenLoginTests(TestCase):
+
+    def setUp(self):
+        # Fresh failure counters for every test
+        throttle = override_settings(LOGIN_THROTTLE=THROTTLE)
+        throttle.enable()
+        self.addCleanup(throttle.disable)
+
+        self.client = APIClient()
+        self.payload = {'email': 'login@test.com', 'password': 'testpass'}
+        self.user = get_user_model().objects.create_user(**self.payload)
+
+    def login(self, password, email='login@test.com', **extra):
+        return self.client.post(
+            TOKEN_URL, {'email': email, 'password': password}, **extra
+        )
+
+    def test_repeated_failures_throttled(self):
+        """Test an email is refused after too many failed logins"""
+        for _ in range(3):
+            res = self.login('wrong')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.login('testpass', REMOTE_ADDR='10.0.0.2')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertNotIn('token', res.data)
+
+    def test_failures_from_ip_throttled(self):
+        """Test an IP is refused after failing logins for many emails"""
+        for i in range(4):
+            self.login('wrong', email=f'other{i}@test.com')
+
+        # Users sharing the IP get past the per-email limit
+        res = self.login('testpass')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.login('wrong', email='other4@test.com')
+        res = self.login('testpass')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(LOGIN_THROTTLE=dict(THROTTLE, NUM_PROXIES=1))
+    def test_client_ip_read_through_trusted_proxies(self):
+        """Test only the entry the proxy appended identifies the client"""
+        for i in range(5):
+            self.login(
+                'wrong', email=f'other{i}@test.com',
+                HTTP_X_FORWARDED_FOR=f'10.9.9.{i}, 10.0.0.7'
+            )
+
+        throttled = self.login('testpass', HTTP_X_FORWARDED_FOR='10.0.0.7')
+        other = self.login('testpass', HTTP_X_FORWARDED_FOR='10.0.0.8')
+
+        self.assertEqual(
+            throttled.status_code, status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        self.assertEqual(other.status_code, status.HTTP_200_OK)
+
+    def test_successful_login_resets_failures(self):
+        self.login('wrong')
+        self.login('wrong')
+        self.login('testpass', REMOTE_ADDR='10.0.0.2')
+        self.login('wrong', REMOTE_ADDR='10.0.0.3')
+
+        res = self.login('testpass', REMOTE_ADDR='10.0.0.4')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('token', res.data)
+
+    def test_inactive_user_rejected(self):
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.login('testpass')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(
+        PASSWORD_HASHER_TIERS={'fast': 1000, 'strong': 2000},
+        PASSWORD_HASHER_TIER='strong',
+    )
+    def test_password_rehashed_on_tier_change(self):
+        """Test a login upgrades hashes made with another work factor"""
+        with self.settings(PASSWORD_HASHER_TIER='fast'):
+            self.user.set_password('testpass')
+            self.user.save()
+        self.assertIn('$1000$', self.user.password)
+
+        res = self.login('testpass')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertIn('$2000$', self.user.password)
+        self.assertTrue(self.user.check_password('testpass'))
+
+
+class SlidingWindowCounterTests(TestCase):
+
+    @patch('user.login.time.monotonic')
+    def test_events_expire_from_window(self, monotonic):
+        counter = SlidingWindowCounter(limit=2, window=60, max_keys=10)
+        monotonic.return_value = 100
+        counter.hit('a')
+        monotonic.return_value = 110
+        counter.hit('a')
+
+        self.assertEqual(counter.retry_after('a'), 50)
+        monotonic.return_value = 161
+        self.assertEqual(counter.retry_after('a'), 0)
+
+    def test_key_count_bounded(self):
+        counter = SlidingWindowCounter(limit=1, window=60, max_keys=2)
+        for key in ('a', 'b', 'c'):
+            counter.hit(key)
+
+        self.assertEqual(counter.retry_after('a'), 0)
+        self.assertGreater(counter.retry_after('c'), 0)
+
+
+class HashingPoolTests(TestCase):
+
+    def test_saturated_pool_rejects_work(self):
+        """Test work beyond the workers and queue is refused, not queued"""
+        pool = HashingPool(workers=1, queue=1, timeout=5)
+        release = threading.Event()
+        threads = [
+            threading.Thread(target=pool.run, args=(release.wait,))
+            for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while pool._slots._value:
+                time.sleep(0.001)
+            with self.assertRaises(LoginUnavailable):
+                pool.run(len, 'x')
+        finally:
+            release.set()
+            for thread in threads:
+                thread.join()
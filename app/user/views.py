@@ -1,7 +1,9 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 
+from core.metrics import TimedAuthenticationMixin
+from user.authentication import CachedTokenAuthentication
 from user.serializer import UserSerializer, AuthTokenSerializer
 
 
@@ -12,9 +14,10 @@ class CreateTokenAPI(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(TimedAuthenticationMixin,
+                     generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):